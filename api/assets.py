@@ -4,9 +4,10 @@ import time
 from io import BytesIO
 from typing import List, Optional
 
-import pandas
 from fastapi import APIRouter, UploadFile, File, Query, Path, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse, StreamingResponse, Response
+from starlette.background import BackgroundTask
 from mako.testing.helpers import result_lines
 
 from api.model.assets import AssetCreateApiModel, AssetManufacturerApiModel, AssetUpdateStatusApiModel, \
@@ -15,18 +16,22 @@ from api.model.assets import AssetCreateApiModel, AssetManufacturerApiModel, Ass
 from api.model.system import OperateLogApiModel
 from api.response import ResponseModel, success_response
 from services.assets import AssetsService
+from services.assets_export import AssetsExportService
+from services.assets_import import AssetsImportService, AssetsImportJobService
 from services.custom_exception import Fail
+from services.response_cache import response_cache
 from services.system import SystemService
-from utils.constant import EXCEL_TEMP_DIR, ASSET_TEMPLATE_ASSET_SHEET, ASSET_TEMPLATE_PART_SHEET, \
-    ASSET_TEMPLATE_ASSET_TYPE, ASSET_TEMPLATE_NETWORK_SHEET
+from utils.constant import ASSET_TEMPLATE_ASSET_TYPE, ASSET_STREAM_EXPORT_MEDIA_TYPES
 from utils.datetime import format_unix_timestamp, format_d8q_timestamp
 from oslo_log import log
-import io
 
 LOG = log.getLogger(__name__)
 
 router = APIRouter()
 assert_service = AssetsService()
+assets_export_service = AssetsExportService()
+assets_import_service = AssetsImportService()
+assets_import_job_service = AssetsImportJobService()
 system_service = SystemService()
 
 # 以下是资产-网络设备的流表信息的类型相关的接口 start
@@ -44,6 +49,17 @@ async def list_assets_flows(
         traceback.print_exc()
         raise HTTPException(status_code=400, detail="asset flow query error")
 
+@router.get("/assets/flows/export.{export_format}", summary="流式导出资产网络设备流信息", description="以csv或者ndjson格式分块导出资产网络设备流信息")
+async def export_assets_flows(
+        export_format:str = Path(description="导出格式：csv、ndjson"),
+        asset_id:str = Query(None, description="资产id"),
+        ids:str = Query(None, description="网络设备流id，多个用逗号分隔")):
+    # 导出格式不支持
+    if export_format not in ASSET_STREAM_EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="export format not supported")
+    # 分块返回数据
+    return create_stream_export_response(assert_service.export_asset_flows_stream(asset_id, ids, export_format), "asset_flows", export_format)
+
 @router.post("/assets/flows", summary="创建网络设备的流转数据", description="创建网络设备的流转数据")
 async def create_asset_flow(asset_flow:AssetFlowApiModel):
     # 创建资产类型
@@ -99,8 +115,9 @@ async def list_assets_columns(
         asset_type:str = Query(None, description="资产类型")):
     # 返回数据接口
     try:
-        # 查询成功
-        result = assert_service.list_assets_columns(asset_type)
+        # 查询成功 优先使用缓存
+        result = await run_in_threadpool(response_cache.get_or_load, "asset_columns", {"asset_type": asset_type},
+                                         lambda: assert_service.list_assets_columns(asset_type))
         return result
     except Exception as e:
         return None
@@ -177,8 +194,9 @@ async def list_assets_types(
     # 接收查询参数
     # 返回数据接口
     try:
-        # 查询成功
-        result = assert_service.list_assets_types(id, asset_type_name, asset_type_name_zh, True)
+        # 查询成功 优先使用缓存
+        result = await run_in_threadpool(response_cache.get_or_load, "asset_types", {"id": id, "asset_type_name": asset_type_name, "asset_type_name_zh": asset_type_name_zh},
+                                         lambda: assert_service.list_assets_types(id, asset_type_name, asset_type_name_zh, True))
         return result
     except Exception as e:
         return None
@@ -238,92 +256,50 @@ async def download_assets_xlsx(asset_type: str, asset_ids: str):
     # 类型是空
     if asset_type is None or len(asset_type) <= 0:
         return None
-    # 把数据库中的资产数据导出资产信息数据
-    result_file_name = "asset_" + format_d8q_timestamp() + ".xlsx"
-    # 导出文件路径
-    result_file_path = EXCEL_TEMP_DIR + result_file_name
-    # 生成文件
-    # 读取excel文件内容
-    try:
-        item = AssetBatchDownloadApiModel(asset_type=asset_type, asset_ids=asset_ids)
-        # 生成文件
-        assert_service.create_asset_excel_4batch(item, result_file_path)
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-    # 文件存在则下载
-    if os.path.exists(result_file_path):
-        return FileResponse(
-            path=result_file_path,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            filename=result_file_name  # 下载时显示的文件名
-        )
-    return {"error": "File not found"}
+    # 选中的数据是空
+    if not asset_ids:
+        return {"error": "File not found"}
+    # 生成文件并下载
+    item = AssetBatchDownloadApiModel(asset_type=asset_type, asset_ids=asset_ids)
+    return await download_asset_excel(item.asset_type, asset_ids=item.asset_ids)
 
 @router.get("/assets/download", summary="下载资产信息", description="根据不同类型下载对应的资产文件")
 async def download_assets_xlsx(asset_type: str, asset_id: Optional[str]=None):
     # 类型是空
     if asset_type is None or len(asset_type) <= 0:
         return None
-    # 把数据库中的资产数据导出资产信息数据
+    # 生成文件并下载
+    return await download_asset_excel(asset_type, asset_id=asset_id)
+
+@router.post("/assets/download", summary="批量下载指定资产信息", description="根据选择好的数据下载对应的资产文件")
+async def download_assets_xlsx_4select(item:AssetBatchDownloadApiModel):
+    # 选中的数据是空
+    if item is None or item.asset_type is None or not item.asset_ids:
+        return {"error": "File not found"}
+    # 生成文件并下载
+    return await download_asset_excel(item.asset_type, asset_ids=item.asset_ids)
+
+# 把数据库中的资产数据导出成excel文件 以文件流的方式分块下载 下载的是本次请求的临时文件 下载完成后删除
+async def download_asset_excel(asset_type, asset_id=None, asset_ids=None):
+    # 下载时显示的文件名
     result_file_name = "asset_" + format_d8q_timestamp() + ".xlsx"
-    # 导出文件路径
-    result_file_path = EXCEL_TEMP_DIR + result_file_name
-    # 生成文件
-    # 读取excel文件内容
     try:
-        # 生成文件
-        assert_service.create_asset_excel(asset_type, asset_id, result_file_path)
+        # 生成文件 数据没有变化时直接使用缓存的文件
+        result_file_path = await run_in_threadpool(assets_export_service.export_asset_excel, asset_type, result_file_name, asset_id, asset_ids)
     except Exception as e:
         import traceback
         traceback.print_exc()
+        result_file_path = None
     # 文件存在则下载
-    if os.path.exists(result_file_path):
+    if result_file_path and os.path.exists(result_file_path):
         return FileResponse(
             path=result_file_path,
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            filename=result_file_name  # 下载时显示的文件名
+            filename=result_file_name,  # 下载时显示的文件名
+            background=BackgroundTask(assets_export_service.delete_export_file, result_file_path)  # 下载完成后删除 缓存文件不受影响
         )
     return {"error": "File not found"}
 
-@router.post("/assets/download", summary="批量下载指定资产信息", description="根据选择好的数据下载对应的资产文件")
-async def download_assets_xlsx_4select(item:AssetBatchDownloadApiModel):
-    # 把选中的id的字符串数据库中的资产数据导出资产信息数据
-    result_file_name = "asset_" + format_d8q_timestamp() + ".xlsx"
-    # 导出文件路径
-    result_file_path = EXCEL_TEMP_DIR + result_file_name
-    # 生成文件
-    # 读取excel文件内容
-    try:
-        if item is None or item.asset_type is None or item.asset_ids is None:
-            raise Exception
-        # 生成文件
-        assert_service.create_asset_excel_4batch(item, result_file_path)
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-    # 文件存在则下载
-    if os.path.exists(result_file_path):
-        # 打开文件并读取内容
-        file_stream = io.BytesIO()
-        with open(result_file_path, "rb") as f:
-            hex_content = f.read()
-            # print(hex_content)
-            file_stream.write(hex_content)
-            file_stream.seek(0)  # 重置指针以便后续读取
-        # 设置响应头和文件名
-        headers = {
-            'Content-Disposition': f'attachment; filename="{result_file_name}"'
-        }
-        # 返回文件流
-        return StreamingResponse(file_stream, headers=headers, media_type='application/octet-stream')
-        # return FileResponse(
-        #         path=result_file_path,
-        #         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        #         filename=result_file_name  # 下载时显示的文件名
-        #     )
-    return {"error": "File not found"}
-
 
 # @router.get("/assets", response_model=ResponseModel[dict])
 @router.get("/assets", summary="查询资产列表", description="根据各种条件分页查询资产列表数据")
@@ -347,7 +323,9 @@ async def list_assets(
         page: int = Query(1, description="页码"),
         page_size: int = Query(10, description="页数量大小"),
         sort_keys:str = Query(None, description="排序字段"),
-        sort_dirs:str = Query(None, description="排序方式"),):
+        sort_dirs:str = Query(None, description="排序方式"),
+        cursor:str = Query(None, description="分页游标，传入时使用游标分页，第一页传空字符串，后续传上一页返回的next_cursor"),
+        with_total:bool = Query(False, description="游标分页时是否查询总数"),):
     # 接收查询参数
     # 返回数据接口
     try:
@@ -386,13 +364,90 @@ async def list_assets(
             query_params['manufacture_id'] = asset_manufacture_id
         if asset_manufacture_name:
             query_params['manufacture_name'] = asset_manufacture_name
-        # 查询成功
-        result = assert_service.list_assets(query_params, page, page_size, sort_keys, sort_dirs)
+        # 缓存的查询参数
+        cache_params = {"query_params": query_params, "page": page, "page_size": page_size, "sort_keys": sort_keys,
+                        "sort_dirs": sort_dirs, "cursor": cursor, "with_total": with_total}
+        # 游标分页
+        if cursor is not None:
+            return await run_in_threadpool(response_cache.get_or_load, "assets", cache_params,
+                                           lambda: assert_service.list_assets_by_cursor(query_params, cursor, page_size, sort_keys, sort_dirs, with_total))
+        # 查询成功 优先使用缓存
+        result = await run_in_threadpool(response_cache.get_or_load, "assets", cache_params,
+                                         lambda: assert_service.list_assets(query_params, page, page_size, sort_keys, sort_dirs))
         return result
         # return success_response(result)
+    except Fail as e:
+        raise HTTPException(status_code=400, detail=e.error_message)
     except Exception as e:
         raise HTTPException(status_code=400, detail="asset not found")
 
+@router.get("/assets/export.{export_format}", summary="流式导出资产信息", description="以csv或者ndjson格式分块导出资产信息")
+async def export_assets(
+        export_format:str = Path(description="导出格式：csv、ndjson"),
+        asset_id:str = Query(None, description="资产id"),
+        asset_name:str = Query(None, description="资产名称"),
+        asset_category:str = Query(None, description="资产大类（服务器、网络设备）"),
+        asset_type:str = Query(None, description="资产类型"),
+        asset_status:str = Query(None, description="资产状态"),
+        frame_position:str = Query(None, description="机架"),
+        cabinet_position:str = Query(None, description="机柜"),
+        u_position:str = Query(None, description="u位"),
+        equipment_number:str = Query(None, description="设备型号"),
+        asset_number:str = Query(None, description="资产编号"),
+        sn_number:str = Query(None, description="序列号"),
+        department_name:str = Query(None, description="部门"),
+        user_name:str = Query(None, description="负责人"),
+        host_name:str = Query(None, description="主机名称"),
+        asset_manufacture_id:str = Query(None, description="厂商id"),
+        asset_manufacture_name:str = Query(None, description="厂商名称"),):
+    # 导出格式不支持
+    if export_format not in ASSET_STREAM_EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="export format not supported")
+    # 声明查询条件的dict
+    query_params = {}
+    # 查询条件组装
+    if asset_id:
+        query_params['asset_id'] = asset_id
+    if asset_name:
+        query_params['asset_name'] = asset_name
+    if asset_category:
+        query_params['asset_category'] = asset_category
+    if asset_type:
+        query_params['asset_type'] = asset_type
+    if asset_status:
+        query_params['asset_status'] = asset_status
+    if frame_position:
+        query_params['frame_position'] = frame_position
+    if cabinet_position:
+        query_params['cabinet_position'] = cabinet_position
+    if u_position:
+        query_params['u_position'] = u_position
+    if equipment_number:
+        query_params['equipment_number'] = equipment_number
+    if asset_number:
+        query_params['asset_number'] = asset_number
+    if sn_number:
+        query_params['sn_number'] = sn_number
+    if department_name:
+        query_params['department_name'] = department_name
+    if user_name:
+        query_params['user_name'] = user_name
+    if host_name:
+        query_params['host_name'] = host_name
+    if asset_manufacture_id:
+        query_params['manufacture_id'] = asset_manufacture_id
+    if asset_manufacture_name:
+        query_params['manufacture_name'] = asset_manufacture_name
+    # 分块返回数据
+    return create_stream_export_response(assert_service.export_assets_stream(query_params, export_format), "assets", export_format)
+
+# 流式导出的响应 数据由生成器逐批产生 使用分块传输编码返回
+def create_stream_export_response(content, file_prefix, export_format):
+    # 下载时显示的文件名
+    file_name = file_prefix + "_" + format_d8q_timestamp() + "." + export_format
+    return StreamingResponse(content, media_type=ASSET_STREAM_EXPORT_MEDIA_TYPES[export_format],
+                             headers={'Content-Disposition': f'attachment; filename="{file_name}"'})
+
 @router.get("/assets/{asset_id}", summary="查询资产详情", description="根据id查询资产详情数据")
 async def get_asset_by_id(asset_id:str,):
     # 返回数据接口
@@ -501,7 +556,8 @@ async def download_asset_template_xlsx(template_id:str):
 
 
 @router.post("/assets/upload/{asset_type}", summary="上传资产文件", description="上传资产文件创建对应数据")
-async def upload_asset_xlsx(asset_type: str, file: UploadFile = File(...)):
+async def upload_asset_xlsx(asset_type: str, file: UploadFile = File(...),
+        async_import: bool = Query(False, description="是否异步导入，异步导入时立即返回任务id，通过任务查询接口或websocket获取导入进度")):
     # 按照资产模板导入数据
     try:
         # 资产的类型不能为空
@@ -522,73 +578,12 @@ async def upload_asset_xlsx(asset_type: str, file: UploadFile = File(...)):
             raise Fail("file size cannot exceed 5MB ", error_message="文件小于5MB")
         # 读取资产的数据
         contents = await file.read()
+        # 异步导入 返回任务id
+        if async_import:
+            return {"job_id": assets_import_job_service.submit_import_job(asset_type, file.filename, contents)}
         buffer = BytesIO(contents)
-        # 服务器类型
-        if asset_type == "server":
-            # 1、资产设备sheet
-            df = pandas.read_excel(buffer, sheet_name=ASSET_TEMPLATE_ASSET_SHEET)
-            # 遍历
-            # 定义错误行号
-            server_error_index = []
-            for index, row in df.iterrows():
-                # 存入一行
-                try:
-                    assert_service.import_asset(row)
-                except Exception as e:
-                    error_index = index + 2
-                    LOG.error(f"import server failed, error row number:{error_index}" )
-                    server_error_index.append(error_index)
-            if server_error_index:
-                raise Fail("import server data error", error_message=f"导入服务器失败, sheet[asset]页错误行号:{server_error_index}")
-            # 2、资产设备sheet
-            df = pandas.read_excel(buffer, sheet_name=ASSET_TEMPLATE_PART_SHEET)
-            # 遍历
-            # 定义错误行号
-            server_part_error_index = []
-            for index, row in df.iterrows():
-                # 存入一行
-                try:
-                    assert_service.import_asset_part(row)
-                except Exception as e:
-                    error_index = index + 2
-                    LOG.error(f"import server part failed, error row number:{error_index}" )
-                    server_part_error_index.append(error_index)
-            if server_part_error_index:
-                raise Fail("import server part data error", error_message=f"导入服务器失败, sheet[part]页错误行号:{server_part_error_index}")
-        elif asset_type == "network":
-            # 1、网络设备sheet
-            df = pandas.read_excel(buffer, sheet_name=ASSET_TEMPLATE_NETWORK_SHEET)
-            # 遍历
-            # 定义错误行号
-            network_error_index = []
-            for index, row in df.iterrows():
-                # 存入一行
-                try:
-                    assert_service.import_asset_network(row)
-                except Exception as e:
-                    error_index = index + 2
-                    LOG.error(f"import network failed, error row number:{error_index}" )
-                    network_error_index.append(error_index)
-            if network_error_index:
-                raise Fail("import network data error", error_message=f"导入网络设备失败, sheet[network]页错误行号:{network_error_index}")
-        elif asset_type == "network_flow":
-            # 1、网络设备流sheet
-            df = pandas.read_excel(buffer, sheet_name=ASSET_TEMPLATE_NETWORK_SHEET)
-            # 遍历
-            # 定义错误行号
-            network_flow_error_index = []
-            for index, row in df.iterrows():
-                # 存入一行
-                try:
-                    assert_service.import_asset_network_flow(row)
-                except Exception as e:
-                    error_index = index + 2
-                    LOG.error(f"import network flow failed, error row number:{error_index}" )
-                    network_flow_error_index.append(error_index)
-            if network_flow_error_index:
-                raise Fail("import network flow data error", error_message=f"导入网络设备出入口配置失败, sheet[network]页错误行号:{network_flow_error_index}")
-        else:
-            pass
+        # 按照资产类型批量导入 存在错误行时返回错误行号 在线程池中执行避免阻塞事件循环
+        await run_in_threadpool(assets_import_service.import_assets, asset_type, buffer)
     except Fail as e:
         raise HTTPException(status_code=400, detail=e.error_message)
     except Exception as e:
@@ -599,6 +594,25 @@ async def upload_asset_xlsx(asset_type: str, file: UploadFile = File(...)):
 
 
 
+@router.get("/assets/import_jobs/{job_id}", summary="查询资产导入任务", description="根据任务id查询资产异步导入任务的状态和进度")
+async def get_asset_import_job(job_id:str):
+    # 查询任务
+    try:
+        # 查询
+        result = assets_import_job_service.get_import_job(job_id)
+        # 任务不存在或者已过期
+        if not result:
+            raise Fail("import job not exists", error_message="导入任务不存在")
+        return result
+    except Fail as e:
+        raise HTTPException(status_code=400, detail=e.error_message)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=400, detail="import job query error")
+
+
+
 # 以下是厂商的相关接口信息
 @router.post("/manufactures", summary="创建厂商", description="创建厂商数据信息")
 async def create_manufacture(manufacture:AssetManufacturerApiModel):
@@ -717,14 +731,58 @@ async def list_assets_parts(
             query_params["personal_used_flag"] = personal_used_flag
         if name:
             query_params["name"] = name
-        # 查询成功
-        result = assert_service.list_assets_parts_pages(query_params, page, page_size, sort_keys, sort_dirs)
+        # 查询成功 优先使用缓存
+        result = await run_in_threadpool(response_cache.get_or_load, "asset_parts", {"query_params": query_params, "page": page, "page_size": page_size,
+                                                                                     "sort_keys": sort_keys, "sort_dirs": sort_dirs},
+                                         lambda: assert_service.list_assets_parts_pages(query_params, page, page_size, sort_keys, sort_dirs))
         return result
     except Fail as e:
         raise HTTPException(status_code=400, detail=e.error_message)
     except Exception as e:
         raise HTTPException(status_code=400, detail="asset part not found")
 
+@router.get("/parts/export.{export_format}", summary="流式导出资产配件信息", description="以csv或者ndjson格式分块导出资产配件信息")
+async def export_assets_parts(
+        export_format: str = Path(description="导出格式：csv、ndjson"),
+        part_catalog: str = Query(None, description="配件分类：库存配件(inventory)、已用配件(used)"),
+        asset_id: str = Query(None, description="资产id"),
+        asset_name: str = Query(None, description="资产名称"),
+        part_type: str = Query(None, description="配件类型"),
+        part_config: str = Query(None, description="配件内容"),
+        part_number: str = Query(None, description="配件型号"),
+        surplus: str = Query(None, description="剩余数量"),
+        description: str = Query(None, description="描述信息"),
+        personal_used_flag: bool = Query(None, description="是否剩余"),
+        name: str = Query(None, description="配件名称"),):
+    # 导出格式不支持
+    if export_format not in ASSET_STREAM_EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="export format not supported")
+    # 查询条件
+    query_params = {}
+    # 组装
+    if part_catalog:
+        query_params["part_catalog"] = part_catalog
+    if asset_id:
+        query_params["asset_id"] = asset_id
+    if asset_name:
+        query_params["asset_name"] = asset_name
+    if part_type:
+        query_params["part_type"] = part_type
+    if part_config:
+        query_params["part_config"] = part_config
+    if part_number:
+        query_params["part_number"] = part_number
+    if surplus:
+        query_params["surplus"] = surplus
+    if description:
+        query_params["description"] = description
+    if personal_used_flag is not None:
+        query_params["personal_used_flag"] = personal_used_flag
+    if name:
+        query_params["name"] = name
+    # 分块返回数据
+    return create_stream_export_response(assert_service.export_asset_parts_stream(query_params, export_format), "asset_parts", export_format)
+
 
 @router.post("/parts", summary="创建配件", description="根据输入信息创建配件数据")
 async def create_assets_parts(asset_part:AssetPartApiModel):
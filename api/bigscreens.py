@@ -1,7 +1,14 @@
 # 大屏的api接口
-from fastapi import APIRouter, Query
+from datetime import datetime
 
+from fastapi import APIRouter, Query, HTTPException
+
+from services.bigscreen_history import BigScreenMetricsHistoryService, resolution_names
 from services.bigscreens import BigScreensService
+from services.memcached_client import memcached_client
+from services.promql_proxy import promql_proxy
+from services.syn_bigscreens import bigscreen_mq_publisher, bigscreen_mq_consumer
+from utils.datetime import EXCEL_TIMESTAMP_FORMAT
 
 router = APIRouter()
 
@@ -11,6 +18,51 @@ async def get_bigscreen_metrics(name: str, region: str = None):
     return BigScreensService.get_bigscreen_metrics(name, region)
 
 
+@router.get("/bigscreen/metrics/batch", summary="批量获取大屏指标数据", description="根据指标名称列表或者指标分类批量获取大屏指标数据，返回指标名称到数据的字典")
+async def get_bigscreen_metrics_batch(
+        names: str = Query(None, description="指标名称，多个用逗号分隔"),
+        sub_class: str = Query(None, description="指标分类"),
+        region: str = Query(None, description="区域")):
+    # 名称和分类不能都为空
+    if not names and not sub_class:
+        raise HTTPException(status_code=400, detail="names or sub_class is required")
+    # 返回数据接口
+    try:
+        metrics_names = [name.strip() for name in names.split(",") if name.strip()] if names else []
+        return BigScreensService.get_bigscreen_metrics_batch(metrics_names, sub_class, region)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=400, detail="bigscreen metrics query error")
+
+
+@router.get("/bigscreen/metrics/history", summary="获取大屏指标的历史数据", description="Time format: YYYY-MM-DD HH:mm:ss，默认查询最近7天，未指定分辨率时按照时间范围自动选择1m、5m或者1h，每个点是[时间戳(毫秒), 平均值, 最小值, 最大值]")
+async def get_bigscreen_metrics_history(
+        names: str = Query(..., description="指标名称，多个用逗号分隔"),
+        region: str = Query(None, description="区域"),
+        start_time: str = Query(None, description="开始时间"),
+        end_time: str = Query(None, description="结束时间"),
+        resolution: str = Query(None, description="分辨率：1m、5m、1h")):
+    # 参数检查
+    metrics_names = [name.strip() for name in names.split(",") if name.strip()]
+    if not metrics_names:
+        raise HTTPException(status_code=400, detail="names is required")
+    if resolution and resolution not in resolution_names.values():
+        raise HTTPException(status_code=400, detail="resolution must be one of 1m, 5m, 1h")
+    try:
+        start_time = datetime.strptime(start_time, EXCEL_TIMESTAMP_FORMAT) if start_time else None
+        end_time = datetime.strptime(end_time, EXCEL_TIMESTAMP_FORMAT) if end_time else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="time format must be YYYY-MM-DD HH:mm:ss")
+    # 返回数据接口
+    try:
+        return BigScreenMetricsHistoryService.query_history(metrics_names, region, start_time, end_time, resolution)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=400, detail="bigscreen metrics history query error")
+
+
 @router.get("/bigscreen/metrics_configs", summary="获取大屏指标配置信息")
 # TODO: name 可选参数做筛选
 async def list_bigscreen_metrics_configs():
@@ -24,14 +76,29 @@ async def list_bigscreen_metrics_configs():
         return None
 
 @router.get("/bigscreen/query", summary="获取大屏指标下钻数据", description="metrics format: DCGM_FI_DEV_MEM_CLOCK{Hostname=\"k8s-demo-gpu-11-80\"}")
-# 转发给 prometheus, 将查询到的数据返回
+# 转发给 prometheus, 将查询到的数据返回 相同的查询合并请求并短时间缓存
 async def query_bigscreen_metrics(promql: str):
-    metrics = BigScreensService.fetch_metrics_with_promql(promql)
+    metrics = await promql_proxy.query(promql)
     return metrics
 
 @router.get("/bigscreen/query_range", summary="获取一段时间内的大屏指标下钻数据", description="Time format: YYYY-MM-DD HH:mm:ss")
-# 转发给 prometheus, 将查询到的数据返回(query_range 方式)
+# 转发给 prometheus, 将查询到的数据返回(query_range 方式) 开始和结束时间按照step对齐后缓存
 async def query_range_bigscreen_metrics(promql: str, start_time: str, end_time: str = None, step: str = None):
-    metrics = BigScreensService.fetch_metrics_with_promql(promql, query_range=True, start_time=start_time, end_time=end_time, step=step)
+    metrics = await promql_proxy.query_range(promql, start_time, end_time, step)
     return metrics
 
+@router.get("/bigscreen/mq/stats", summary="获取大屏指标mq消息发送的统计", description="查询当前进程mq的连接次数、发送次数、发件箱积压的消息数以及连接和发送的延迟分布")
+async def get_bigscreen_mq_stats():
+    return bigscreen_mq_publisher.get_stats()
+
+@router.get("/bigscreen/mq/consumer/stats", summary="获取大屏指标mq消息消费的统计", description="查询当前进程mq消息的消费次数、批量写入次数、失败次数以及批量写入的延迟分布")
+async def get_bigscreen_mq_consumer_stats():
+    return bigscreen_mq_consumer.get_stats()
+
+@router.get("/bigscreen/query/stats", summary="获取大屏下钻查询的缓存统计", description="查询当前进程下钻查询的缓存命中、未命中以及合并的请求次数")
+async def get_bigscreen_query_stats():
+    return promql_proxy.get_stats()
+
+@router.get("/bigscreen/cache/stats", summary="获取大屏指标缓存的延迟统计", description="查询当前进程memcached各个操作的次数、耗时以及延迟分布")
+async def get_bigscreen_cache_stats():
+    return memcached_client.get_latency_stats()
@@ -1,10 +1,12 @@
 # 监控接口配置
 from fastapi import APIRouter, Query, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from oslo_log import log
 
 from api.model.monitor import MonitorUrlConfigApiModel
 from services.custom_exception import Fail
 from services.monitor import MonitorService
+from services.response_cache import response_cache
 
 # 日志
 LOG = log.getLogger(__name__)
@@ -35,8 +37,10 @@ async def list_monitor_urls(
             query_params['url_type'] = url_type
         if url:
             query_params['url'] = url
-        # 查询成功
-        result = monitor_service.list_monitor_urls(query_params, page, page_size, sort_keys, sort_dirs)
+        # 查询成功 优先使用缓存
+        result = await run_in_threadpool(response_cache.get_or_load, "monitor_urls", {"query_params": query_params, "page": page, "page_size": page_size,
+                                                                                      "sort_keys": sort_keys, "sort_dirs": sort_dirs},
+                                         lambda: monitor_service.list_monitor_urls(query_params, page, page_size, sort_keys, sort_dirs))
         return result
     except Exception as e:
         return None
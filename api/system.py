@@ -3,6 +3,7 @@ from fastapi import APIRouter, Query, HTTPException
 
 from api.model.system import OperateLogApiModel
 from services.bigscreens import BigScreensService
+from services.response_cache import response_cache
 from services.system import SystemService
 
 router = APIRouter()
@@ -42,4 +43,13 @@ async def create_system_log(system_log:OperateLogApiModel):
     except Exception as e:
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=400, detail="system log create error")
\ No newline at end of file
+        raise HTTPException(status_code=400, detail="system log create error")
+@router.get("/system/cache/stats", summary="获取接口响应缓存的命中统计", description="查询各个接口响应缓存的命中次数、未命中次数以及命中率")
+async def get_response_cache_stats():
+    # 查询统计
+    try:
+        return response_cache.get_stats()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=400, detail="response cache stats query error")
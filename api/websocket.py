@@ -20,8 +20,8 @@ async def websocket_endpoint(websocket: WebSocket, websocket_type: str):
     try:
         # 服务器接受客户端的WebSocket连接请求。
         await websocket_connection_manager.connect(websocket_type, websocket)
-        # # 订阅指定类型redis的频道
-        await websocket_service.subscribe_redis_channel_ws(websocket_type, websocket)
+        # # 订阅指定类型redis的频道 导入进度可以通过job_id参数只订阅某个任务
+        await websocket_service.subscribe_redis_channel_ws(websocket_type, websocket, websocket.query_params.get("job_id"))
     # 客户端断开连接，捕获WebSocketDisconnect异常
     except WebSocketDisconnect:
         websocket_connection_manager.disconnect(websocket_type, websocket)
@@ -0,0 +1,50 @@
+"""add assets lookup indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-02-14 10:12:36.418920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 资产附属表的关联字段 列表查询时外连接使用
+asset_side_table_columns = [
+    ("ops_assets_positions_info", "asset_id"),
+    ("ops_assets_contracts_info", "asset_id"),
+    ("ops_assets_belongs_info", "asset_id"),
+    ("ops_assets_customers_info", "asset_id"),
+    ("ops_assets_parts_info", "asset_id"),
+    ("ops_assets_flows_info", "asset_id"),
+    ("ops_assets_flows_info", "opposite_asset_id"),
+    ("ops_assets_manufactures_relations_info", "asset_id"),
+]
+
+# 资产基础信息的常用查询条件
+asset_basic_info_columns = ["asset_number", "sn_number", "asset_type_id"]
+
+
+def upgrade() -> None:
+    # ### 资产附属表的asset_id索引 ###
+    for table_name, column_name in asset_side_table_columns:
+        op.create_index(op.f(f"ix_{table_name}_{column_name}"), table_name, [column_name], unique=False)
+    # ### 资产基础信息的查询条件索引 ###
+    for column_name in asset_basic_info_columns:
+        op.create_index(op.f(f"ix_ops_assets_basic_info_{column_name}"), "ops_assets_basic_info", [column_name], unique=False)
+    # ### 资产大类+创建时间的联合索引 列表默认按照创建时间排序 ###
+    op.create_index("ix_ops_assets_basic_info_category_create_date", "ops_assets_basic_info", ["asset_category", "create_date"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ops_assets_basic_info_category_create_date", table_name="ops_assets_basic_info")
+    for column_name in reversed(asset_basic_info_columns):
+        op.drop_index(op.f(f"ix_ops_assets_basic_info_{column_name}"), table_name="ops_assets_basic_info")
+    for table_name, column_name in reversed(asset_side_table_columns):
+        op.drop_index(op.f(f"ix_{table_name}_{column_name}"), table_name=table_name)
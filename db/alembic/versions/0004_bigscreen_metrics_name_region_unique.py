@@ -0,0 +1,28 @@
+"""unique bigscreen metrics by name and region
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-02-20 15:06:12.537104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ### 大屏指标按照(名称, 地区)唯一 中心地区保存所有地区的指标 批量写入时按照这个索引更新 ###
+    # 先创建联合唯一索引 名称的外键仍然可以使用这个索引 再删除名称的唯一索引
+    op.create_unique_constraint("uq_ops_bigscreen_metrics_name_region", "ops_bigscreen_metrics", ["name", "region"])
+    op.drop_constraint("name", "ops_bigscreen_metrics", type_="unique")
+
+
+def downgrade() -> None:
+    op.create_unique_constraint("name", "ops_bigscreen_metrics", ["name"])
+    op.drop_constraint("uq_ops_bigscreen_metrics_name_region", "ops_bigscreen_metrics", type_="unique")
@@ -0,0 +1,42 @@
+"""create ops_bigscreen_metrics_history table
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-02-24 11:20:47.183095
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ### 大屏指标历史数据 1分钟的采样汇总成5分钟和1小时的数据 ###
+    op.create_table(
+        "ops_bigscreen_metrics_history",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False, comment='大屏指标历史数据id'),
+        sa.Column("name", sa.String(length=128), nullable=False, comment='指标名称'),
+        sa.Column("region", sa.String(length=128), nullable=False, server_default='', comment='地区（智算中心）'),
+        sa.Column("resolution", sa.Integer(), nullable=False, comment='分辨率（秒）：60、300、3600'),
+        sa.Column("bucket_time", sa.DateTime(), nullable=False, comment='时间段的开始时间'),
+        sa.Column("value_avg", sa.Float(), nullable=True, comment='平均值'),
+        sa.Column("value_min", sa.Float(), nullable=True, comment='最小值'),
+        sa.Column("value_max", sa.Float(), nullable=True, comment='最大值'),
+        sa.Column("sample_count", sa.Integer(), nullable=False, server_default='1', comment='采样次数'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint("name", "region", "resolution", "bucket_time", name="uq_ops_bigscreen_metrics_history_bucket"),
+        comment='大屏指标历史数据表'
+    )
+    op.create_index("ix_ops_bigscreen_metrics_history_resolution_bucket_time", "ops_bigscreen_metrics_history", ["resolution", "bucket_time"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ops_bigscreen_metrics_history_resolution_bucket_time", table_name="ops_bigscreen_metrics_history")
+    op.drop_table('ops_bigscreen_metrics_history')
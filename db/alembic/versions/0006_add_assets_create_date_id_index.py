@@ -0,0 +1,25 @@
+"""add assets create_date id index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-02-26 09:41:05.527310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ### 创建时间+id的联合索引 资产列表游标分页默认按照(create_date, id)定位和排序 ###
+    op.create_index("ix_ops_assets_basic_info_create_date_id", "ops_assets_basic_info", ["create_date", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ops_assets_basic_info_create_date_id", table_name="ops_assets_basic_info")
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from sqlalchemy import JSON, Column, MetaData, String, Table, Text, DateTime, Integer, Boolean
+from sqlalchemy import JSON, Column, MetaData, String, Table, Text, DateTime, Integer, Boolean, Index
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -31,16 +31,22 @@ class AssetType(Base):
 # 资产基础信息对象
 class AssetBasicInfo(Base):
     __tablename__ = "ops_assets_basic_info"
+    __table_args__ = (
+        # 资产大类+创建时间的联合索引
+        Index("ix_ops_assets_basic_info_category_create_date", "asset_category", "create_date"),
+        # 创建时间+id的联合索引 不按大类过滤时游标分页使用
+        Index("ix_ops_assets_basic_info_create_date_id", "create_date", "id"),
+    )
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
-    asset_type_id = Column(String(length=128), nullable=True)
+    asset_type_id = Column(String(length=128), nullable=True, index=True)
     asset_category = Column(String(length=128), nullable=True)
     asset_type = Column(String(length=128), nullable=True)
     name = Column(String(length=128), nullable=True)
     description = Column(String(length=255), nullable=True)
     equipment_number = Column(String(length=128), nullable=True)
-    sn_number = Column(String(length=128), nullable=True)
-    asset_number = Column(String(length=128), nullable=True)
+    sn_number = Column(String(length=128), nullable=True, index=True)
+    asset_number = Column(String(length=128), nullable=True, index=True)
     asset_status = Column(String(length=40), nullable=True)
     asset_status_description = Column(Text)
     extra = Column(Text)
@@ -53,7 +59,7 @@ class AssetPartsInfo(Base):
     __tablename__ = "ops_assets_parts_info"
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
-    asset_id = Column(String(length=128), nullable=True)
+    asset_id = Column(String(length=128), nullable=True, index=True)
     manufacturer_id = Column(String(length=128), nullable=True)
     part_type_id = Column(String(length=128), nullable=True)
     part_type = Column(String(length=128), nullable=True)
@@ -85,7 +91,7 @@ class AssetManufactureRelationInfo(Base):
     __tablename__ = "ops_assets_manufactures_relations_info"
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
-    asset_id = Column(String(length=128), nullable=True)
+    asset_id = Column(String(length=128), nullable=True, index=True)
     manufacture_id = Column(String(length=128), nullable=True)
 
 
@@ -94,7 +100,7 @@ class AssetPositionsInfo(Base):
     __tablename__ = "ops_assets_positions_info"
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
-    asset_id = Column(String(length=128), nullable=True)
+    asset_id = Column(String(length=128), nullable=True, index=True)
     frame_position = Column(String(length=128), nullable=True)
     cabinet_position = Column(String(length=128), nullable=True)
     u_position = Column(String(length=128), nullable=True)
@@ -106,7 +112,7 @@ class AssetContractsInfo(Base):
     __tablename__ = "ops_assets_contracts_info"
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
-    asset_id = Column(String(length=128), nullable=True)
+    asset_id = Column(String(length=128), nullable=True, index=True)
     contract_number = Column(String(length=128), nullable=True)
     purchase_date = Column(DateTime)
     batch_number = Column(String(length=10), nullable=True)
@@ -118,7 +124,7 @@ class AssetBelongsInfo(Base):
     __tablename__ = "ops_assets_belongs_info"
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
-    asset_id = Column(String(length=128), nullable=True)
+    asset_id = Column(String(length=128), nullable=True, index=True)
     department_id = Column(String(length=128), nullable=True)
     department_name = Column(String(length=128), nullable=True)
     user_id = Column(String(length=128), nullable=True)
@@ -132,7 +138,7 @@ class AssetCustomersInfo(Base):
     __tablename__ = "ops_assets_customers_info"
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
-    asset_id = Column(String(length=128), nullable=True)
+    asset_id = Column(String(length=128), nullable=True, index=True)
     customer_id = Column(String(length=128), nullable=True)
     customer_name = Column(String(length=128), nullable=True)
     rental_duration = Column(Integer, nullable=True)
@@ -149,10 +155,10 @@ class AssetFlowsInfo(Base):
     __tablename__ = "ops_assets_flows_info"
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
-    asset_id = Column(String(length=128), nullable=True)
+    asset_id = Column(String(length=128), nullable=True, index=True)
     port = Column(String(length=128), nullable=True)
     label = Column(String(length=255), nullable=True)
-    opposite_asset_id = Column(String(length=128), nullable=True)
+    opposite_asset_id = Column(String(length=128), nullable=True, index=True)
     opposite_port = Column(String(length=128), nullable=True)
     opposite_label = Column(String(length=255), nullable=True)
     create_date = Column(DateTime, nullable=True)
@@ -2,8 +2,10 @@
 
 from __future__ import annotations
 
+import uuid
+
 from sqlalchemy.orm import sessionmaker, aliased
-from sqlalchemy import create_engine, func
+from sqlalchemy import create_engine, func, and_, or_, exists, select
 from typing_extensions import assert_type
 
 from db.engines.mysql import get_session
@@ -30,101 +32,108 @@ asset_part_dir_dic= {"asset_name":AssetBasicInfo.name,"name":AssetPartsInfo.name
 
 class AssetSQL:
 
+    # 资产列表的查询语句 包含外连接和查询条件
+    @classmethod
+    def build_asset_query(cls, session, query_params):
+        query = session.query(AssetBasicInfo.id.label("id"),
+                              AssetBasicInfo.name.label("name"),
+                              AssetBasicInfo.asset_type_id.label("asset_type_id"),
+                              AssetBasicInfo.asset_category.label("asset_category"),
+                              AssetBasicInfo.asset_type.label("asset_type"),
+                              AssetBasicInfo.equipment_number.label("equipment_number"),
+                              AssetBasicInfo.sn_number.label("sn_number"),
+                              AssetBasicInfo.asset_number.label("asset_number"),
+                              AssetBasicInfo.asset_status.label("asset_status"),
+                              AssetBasicInfo.asset_status_description.label("asset_status_description"),
+                              AssetBasicInfo.description.label("description"),
+                              AssetBasicInfo.extra.label("extra"),
+                              AssetBasicInfo.extend_column_extra.label("extend_column_extra"),
+                              AssetType.asset_type_name_zh.label("asset_type_name_zh"),
+                              AssetManufacturesInfo.id.label("manufacture_id"),
+                              AssetManufacturesInfo.name.label("manufacture_name"),
+                              AssetManufacturesInfo.description.label("manufacture_description"),
+                              AssetManufacturesInfo.extra.label("manufacture_extra"),
+                              AssetPositionsInfo.id.label("position_id"),
+                              AssetPositionsInfo.frame_position.label("position_frame_position"),
+                              AssetPositionsInfo.cabinet_position.label("position_cabinet_position"),
+                              AssetPositionsInfo.u_position.label("position_u_position"),
+                              AssetPositionsInfo.description.label("position_description"),
+                              AssetContractsInfo.id.label("contract_id"),
+                              AssetContractsInfo.contract_number.label("contract_number"),
+                              AssetContractsInfo.purchase_date.label("contract_purchase_date"),
+                              AssetContractsInfo.batch_number.label("contract_batch_number"),
+                              AssetContractsInfo.description.label("contract_description"),
+                              AssetBelongsInfo.id.label("belong_id"),
+                              AssetBelongsInfo.department_id.label("belong_department_id"),
+                              AssetBelongsInfo.department_name.label("belong_department_name"),
+                              AssetBelongsInfo.user_id.label("belong_user_id"),
+                              AssetBelongsInfo.user_name.label("belong_user_name"),
+                              AssetBelongsInfo.tel_number.label("belong_tel_number"),
+                              AssetBelongsInfo.description.label("belong_contract_description"),
+                              AssetCustomersInfo.id.label("customer_id"),
+                              AssetCustomersInfo.customer_id.label("customer_customer_id"),
+                              AssetCustomersInfo.customer_name.label("customer_customer_name"),
+                              AssetCustomersInfo.rental_duration.label("customer_rental_duration"),
+                              AssetCustomersInfo.start_date.label("customer_start_date"),
+                              AssetCustomersInfo.end_date.label("customer_end_date"),
+                              AssetCustomersInfo.vlan_id.label("customer_vlan_id"),
+                              AssetCustomersInfo.float_ip.label("customer_float_ip"),
+                              AssetCustomersInfo.band_width.label("customer_band_width"),
+                              AssetCustomersInfo.description.label("customer_description"),
+                              )
+        # 外连接
+        query = query.outerjoin(AssetManufactureRelationInfo, AssetManufactureRelationInfo.asset_id == AssetBasicInfo.id). \
+            outerjoin(AssetManufacturesInfo, AssetManufacturesInfo.id == AssetManufactureRelationInfo.manufacture_id). \
+            outerjoin(AssetType, AssetType.id == AssetBasicInfo.asset_type_id). \
+            outerjoin(AssetPositionsInfo, AssetPositionsInfo.asset_id == AssetBasicInfo.id). \
+            outerjoin(AssetContractsInfo, AssetContractsInfo.asset_id == AssetBasicInfo.id). \
+            outerjoin(AssetBelongsInfo, AssetBelongsInfo.asset_id == AssetBasicInfo.id). \
+            outerjoin(AssetCustomersInfo, AssetCustomersInfo.asset_id == AssetBasicInfo.id)
+        # 数据库查询参数
+        if "asset_name" in query_params and query_params["asset_name"]:
+            query = query.filter(AssetBasicInfo.name.like('%' + query_params["asset_name"] + '%'))
+        if "asset_id" in query_params and query_params["asset_id"]:
+            query = query.filter(AssetBasicInfo.id == query_params["asset_id"])
+        if "asset_ids" in query_params and query_params["asset_ids"]:
+            query = query.filter(AssetBasicInfo.id.in_(query_params["asset_ids"].split(',')))
+        if "asset_category" in query_params and query_params["asset_category"]:
+            query = query.filter(AssetBasicInfo.asset_category == query_params["asset_category"])
+        if "asset_type" in query_params and query_params["asset_type"]:
+            query = query.filter(AssetBasicInfo.asset_type.like('%' + query_params["asset_type"] + '%'))
+        if "asset_status" in query_params and query_params["asset_status"]:
+            # 状态拆分
+            asset_status_arr = query_params["asset_status"].split(",")
+            query = query.filter(AssetBasicInfo.asset_status.in_(asset_status_arr))
+        if "frame_position" in query_params and query_params["frame_position"]:
+            query = query.filter(AssetPositionsInfo.frame_position.like('%' + query_params["frame_position"] + '%'))
+        if "cabinet_position" in query_params and query_params["cabinet_position"]:
+            query = query.filter(AssetPositionsInfo.cabinet_position.like('%' + query_params["cabinet_position"] + '%'))
+        if "u_position" in query_params and query_params["u_position"]:
+            query = query.filter(AssetPositionsInfo.u_position.like('%' + query_params["u_position"] + '%'))
+        if "equipment_number" in query_params and query_params["equipment_number"]:
+            query = query.filter(AssetBasicInfo.equipment_number.like('%' + query_params["equipment_number"] + '%'))
+        if "asset_number" in query_params and query_params["asset_number"]:
+            query = query.filter(AssetBasicInfo.asset_number.like('%' + query_params["asset_number"] + '%'))
+        if "sn_number" in query_params and query_params["sn_number"]:
+            query = query.filter(AssetBasicInfo.sn_number.like('%' + query_params["sn_number"] + '%'))
+        if "department_name" in query_params and query_params["department_name"]:
+            query = query.filter(AssetBelongsInfo.department_name.like('%' + query_params["department_name"] + '%'))
+        if "user_name" in query_params and query_params["user_name"]:
+            query = query.filter(AssetBelongsInfo.user_name.like('%' + query_params["user_name"] + '%'))
+        if "manufacture_id" in query_params and query_params["manufacture_id"]:
+            query = query.filter(AssetManufacturesInfo.id == query_params["manufacture_id"])
+        if "manufacture_name" in query_params and query_params["manufacture_name"]:
+            query = query.filter(AssetManufacturesInfo.name.like('%' + query_params["manufacture_name"] + '%'))
+        # 返回
+        return query
+
     @classmethod
     def list_asset(cls, query_params, page=1, page_size=10, sort_keys=None, sort_dirs="ascend"):
         # 获取session
         session = get_session()
         with session.begin():
             # 查询语句
-            query = session.query(AssetBasicInfo.id.label("id"),
-                                  AssetBasicInfo.name.label("name"),
-                                  AssetBasicInfo.asset_type_id.label("asset_type_id"),
-                                  AssetBasicInfo.asset_category.label("asset_category"),
-                                  AssetBasicInfo.asset_type.label("asset_type"),
-                                  AssetBasicInfo.equipment_number.label("equipment_number"),
-                                  AssetBasicInfo.sn_number.label("sn_number"),
-                                  AssetBasicInfo.asset_number.label("asset_number"),
-                                  AssetBasicInfo.asset_status.label("asset_status"),
-                                  AssetBasicInfo.asset_status_description.label("asset_status_description"),
-                                  AssetBasicInfo.description.label("description"),
-                                  AssetBasicInfo.extra.label("extra"),
-                                  AssetBasicInfo.extend_column_extra.label("extend_column_extra"),
-                                  AssetType.asset_type_name_zh.label("asset_type_name_zh"),
-                                  AssetManufacturesInfo.id.label("manufacture_id"),
-                                  AssetManufacturesInfo.name.label("manufacture_name"),
-                                  AssetManufacturesInfo.description.label("manufacture_description"),
-                                  AssetManufacturesInfo.extra.label("manufacture_extra"),
-                                  AssetPositionsInfo.id.label("position_id"),
-                                  AssetPositionsInfo.frame_position.label("position_frame_position"),
-                                  AssetPositionsInfo.cabinet_position.label("position_cabinet_position"),
-                                  AssetPositionsInfo.u_position.label("position_u_position"),
-                                  AssetPositionsInfo.description.label("position_description"),
-                                  AssetContractsInfo.id.label("contract_id"),
-                                  AssetContractsInfo.contract_number.label("contract_number"),
-                                  AssetContractsInfo.purchase_date.label("contract_purchase_date"),
-                                  AssetContractsInfo.batch_number.label("contract_batch_number"),
-                                  AssetContractsInfo.description.label("contract_description"),
-                                  AssetBelongsInfo.id.label("belong_id"),
-                                  AssetBelongsInfo.department_id.label("belong_department_id"),
-                                  AssetBelongsInfo.department_name.label("belong_department_name"),
-                                  AssetBelongsInfo.user_id.label("belong_user_id"),
-                                  AssetBelongsInfo.user_name.label("belong_user_name"),
-                                  AssetBelongsInfo.tel_number.label("belong_tel_number"),
-                                  AssetBelongsInfo.description.label("belong_contract_description"),
-                                  AssetCustomersInfo.id.label("customer_id"),
-                                  AssetCustomersInfo.customer_id.label("customer_customer_id"),
-                                  AssetCustomersInfo.customer_name.label("customer_customer_name"),
-                                  AssetCustomersInfo.rental_duration.label("customer_rental_duration"),
-                                  AssetCustomersInfo.start_date.label("customer_start_date"),
-                                  AssetCustomersInfo.end_date.label("customer_end_date"),
-                                  AssetCustomersInfo.vlan_id.label("customer_vlan_id"),
-                                  AssetCustomersInfo.float_ip.label("customer_float_ip"),
-                                  AssetCustomersInfo.band_width.label("customer_band_width"),
-                                  AssetCustomersInfo.description.label("customer_description"),
-                                  )
-            # 外连接
-            query = query.outerjoin(AssetManufactureRelationInfo, AssetManufactureRelationInfo.asset_id == AssetBasicInfo.id). \
-                outerjoin(AssetManufacturesInfo, AssetManufacturesInfo.id == AssetManufactureRelationInfo.manufacture_id). \
-                outerjoin(AssetType, AssetType.id == AssetBasicInfo.asset_type_id). \
-                outerjoin(AssetPositionsInfo, AssetPositionsInfo.asset_id == AssetBasicInfo.id). \
-                outerjoin(AssetContractsInfo, AssetContractsInfo.asset_id == AssetBasicInfo.id). \
-                outerjoin(AssetBelongsInfo, AssetBelongsInfo.asset_id == AssetBasicInfo.id). \
-                outerjoin(AssetCustomersInfo, AssetCustomersInfo.asset_id == AssetBasicInfo.id)
-            # 数据库查询参数
-            if "asset_name" in query_params and query_params["asset_name"]:
-                query = query.filter(AssetBasicInfo.name.like('%' + query_params["asset_name"] + '%'))
-            if "asset_id" in query_params and query_params["asset_id"]:
-                query = query.filter(AssetBasicInfo.id == query_params["asset_id"])
-            if "asset_ids" in query_params and query_params["asset_ids"]:
-                query = query.filter(AssetBasicInfo.id.in_(query_params["asset_ids"].split(',')))
-            if "asset_category" in query_params and query_params["asset_category"]:
-                query = query.filter(AssetBasicInfo.asset_category == query_params["asset_category"])
-            if "asset_type" in query_params and query_params["asset_type"]:
-                query = query.filter(AssetBasicInfo.asset_type.like('%' + query_params["asset_type"] + '%'))
-            if "asset_status" in query_params and query_params["asset_status"]:
-                # 状态拆分
-                asset_status_arr = query_params["asset_status"].split(",")
-                query = query.filter(AssetBasicInfo.asset_status.in_(asset_status_arr))
-            if "frame_position" in query_params and query_params["frame_position"]:
-                query = query.filter(AssetPositionsInfo.frame_position.like('%' + query_params["frame_position"] + '%'))
-            if "cabinet_position" in query_params and query_params["cabinet_position"]:
-                query = query.filter(AssetPositionsInfo.cabinet_position.like('%' + query_params["cabinet_position"] + '%'))
-            if "u_position" in query_params and query_params["u_position"]:
-                query = query.filter(AssetPositionsInfo.u_position.like('%' + query_params["u_position"] + '%'))
-            if "equipment_number" in query_params and query_params["equipment_number"]:
-                query = query.filter(AssetBasicInfo.equipment_number.like('%' + query_params["equipment_number"] + '%'))
-            if "asset_number" in query_params and query_params["asset_number"]:
-                query = query.filter(AssetBasicInfo.asset_number.like('%' + query_params["asset_number"] + '%'))
-            if "sn_number" in query_params and query_params["sn_number"]:
-                query = query.filter(AssetBasicInfo.sn_number.like('%' + query_params["sn_number"] + '%'))
-            if "department_name" in query_params and query_params["department_name"]:
-                query = query.filter(AssetBelongsInfo.department_name.like('%' + query_params["department_name"] + '%'))
-            if "user_name" in query_params and query_params["user_name"]:
-                query = query.filter(AssetBelongsInfo.user_name.like('%' + query_params["user_name"] + '%'))
-            if "manufacture_id" in query_params and query_params["manufacture_id"]:
-                query = query.filter(AssetManufacturesInfo.id == query_params["manufacture_id"])
-            if "manufacture_name" in query_params and query_params["manufacture_name"]:
-                query = query.filter(AssetManufacturesInfo.name.like('%' + query_params["manufacture_name"] + '%'))
+            query = cls.build_asset_query(session, query_params)
             # 总数
             count = query.count()
             # 排序
@@ -149,6 +158,161 @@ class AssetSQL:
             return count, assert_list
 
 
+    # 资产列表的查询条件 只作用于资产基础信息表 附属表的条件使用关联子查询 每个资产只对应一行
+    # 同一个附属表的多个条件放在一个子查询中 与外连接时同一行数据满足所有条件一致
+    @classmethod
+    def build_asset_conditions(cls, query_params):
+        conditions = []
+        # 资产基础信息的条件
+        if query_params.get("asset_name"):
+            conditions.append(AssetBasicInfo.name.like('%' + query_params["asset_name"] + '%'))
+        if query_params.get("asset_id"):
+            conditions.append(AssetBasicInfo.id == query_params["asset_id"])
+        if query_params.get("asset_ids"):
+            conditions.append(AssetBasicInfo.id.in_(query_params["asset_ids"].split(',')))
+        if query_params.get("asset_category"):
+            conditions.append(AssetBasicInfo.asset_category == query_params["asset_category"])
+        if query_params.get("asset_type"):
+            conditions.append(AssetBasicInfo.asset_type.like('%' + query_params["asset_type"] + '%'))
+        if query_params.get("asset_status"):
+            conditions.append(AssetBasicInfo.asset_status.in_(query_params["asset_status"].split(",")))
+        if query_params.get("equipment_number"):
+            conditions.append(AssetBasicInfo.equipment_number.like('%' + query_params["equipment_number"] + '%'))
+        if query_params.get("asset_number"):
+            conditions.append(AssetBasicInfo.asset_number.like('%' + query_params["asset_number"] + '%'))
+        if query_params.get("sn_number"):
+            conditions.append(AssetBasicInfo.sn_number.like('%' + query_params["sn_number"] + '%'))
+        # 位置信息的条件
+        position_conditions = [getattr(AssetPositionsInfo, key).like('%' + query_params[key] + '%')
+                               for key in ("frame_position", "cabinet_position", "u_position") if query_params.get(key)]
+        if position_conditions:
+            conditions.append(exists().where(AssetPositionsInfo.asset_id == AssetBasicInfo.id, *position_conditions))
+        # 归属信息的条件
+        belong_conditions = [getattr(AssetBelongsInfo, key).like('%' + query_params[key] + '%')
+                             for key in ("department_name", "user_name") if query_params.get(key)]
+        if belong_conditions:
+            conditions.append(exists().where(AssetBelongsInfo.asset_id == AssetBasicInfo.id, *belong_conditions))
+        # 厂商的条件 通过关联关系表
+        manufacture_conditions = []
+        if query_params.get("manufacture_id"):
+            manufacture_conditions.append(AssetManufacturesInfo.id == query_params["manufacture_id"])
+        if query_params.get("manufacture_name"):
+            manufacture_conditions.append(AssetManufacturesInfo.name.like('%' + query_params["manufacture_name"] + '%'))
+        if manufacture_conditions:
+            conditions.append(exists().where(AssetManufactureRelationInfo.asset_id == AssetBasicInfo.id,
+                                             AssetManufacturesInfo.id == AssetManufactureRelationInfo.manufacture_id,
+                                             *manufacture_conditions))
+        # 返回
+        return conditions
+
+    # 游标分页的排序字段 资产基础信息的字段直接排序 附属表的字段使用关联子查询 一个资产有多个值时取排在最前的值
+    @classmethod
+    def build_asset_cursor_sort_column(cls, sort_column, sort_desc):
+        if sort_column.class_ is AssetBasicInfo:
+            return sort_column
+        aggregate = func.max(sort_column) if sort_desc else func.min(sort_column)
+        if sort_column.class_ is AssetManufacturesInfo:
+            return select(aggregate).select_from(AssetManufactureRelationInfo). \
+                join(AssetManufacturesInfo, AssetManufacturesInfo.id == AssetManufactureRelationInfo.manufacture_id). \
+                where(AssetManufactureRelationInfo.asset_id == AssetBasicInfo.id).correlate(AssetBasicInfo).scalar_subquery()
+        return select(aggregate).where(sort_column.class_.asset_id == AssetBasicInfo.id).correlate(AssetBasicInfo).scalar_subquery()
+
+    # 游标分页查询资产列表 按照(排序字段, id)定位 不使用OFFSET
+    # 只在资产基础信息表上按照游标条件排序和分页 默认排序使用(asset_category, create_date)以及(create_date, id)索引
+    # 附属表只关联当前页的资产 附属表有多条数据时一个资产会有多行 按照资产id去重
+    @classmethod
+    def list_asset_by_cursor(cls, query_params, cursor_value=None, cursor_id=None, page_size=10, sort_keys=None, sort_dirs=None, with_total=False):
+        # 获取session
+        session = get_session()
+        with session.begin():
+            # 查询条件
+            conditions = cls.build_asset_conditions(query_params)
+            # 总数 只有需要时才查询
+            count = session.query(func.count(AssetBasicInfo.id)).filter(*conditions).scalar() if with_total else None
+            # 排序字段和方向 默认按照创建时间降序
+            if sort_keys is not None and sort_keys in asset_dir_dic:
+                sort_desc = sort_dirs == "descend"
+                sort_value = cls.build_asset_cursor_sort_column(asset_dir_dic[sort_keys], sort_desc)
+            else:
+                sort_value = AssetBasicInfo.create_date
+                sort_desc = True
+            asset_id = AssetBasicInfo.id
+            page_query = session.query(asset_id.label("id"), sort_value.label("cursor_sort_value")).filter(*conditions)
+            # 游标条件 mysql中null值排在最前
+            if cursor_id is not None:
+                if sort_desc:
+                    if cursor_value is None:
+                        page_query = page_query.filter(and_(sort_value.is_(None), asset_id < cursor_id))
+                    else:
+                        page_query = page_query.filter(or_(sort_value < cursor_value,
+                                                           and_(sort_value == cursor_value, asset_id < cursor_id),
+                                                           sort_value.is_(None)))
+                else:
+                    if cursor_value is None:
+                        page_query = page_query.filter(or_(sort_value.isnot(None),
+                                                           and_(sort_value.is_(None), asset_id > cursor_id)))
+                    else:
+                        page_query = page_query.filter(or_(sort_value > cursor_value,
+                                                           and_(sort_value == cursor_value, asset_id > cursor_id)))
+            # 排序 id作为第二排序字段保证顺序唯一
+            if sort_desc:
+                page_query = page_query.order_by(sort_value.desc(), asset_id.desc())
+            else:
+                page_query = page_query.order_by(sort_value.asc(), asset_id.asc())
+            # 多查询一条用于判断是否存在下一页
+            page = page_query.limit(int(page_size) + 1).subquery()
+            # 关联当前页的资产查询详细数据 按照分页的顺序返回 每个资产只保留第一行
+            query = cls.build_asset_query(session, {}).join(page, page.c.id == AssetBasicInfo.id). \
+                add_columns(page.c.cursor_sort_value.label("cursor_sort_value"))
+            if sort_desc:
+                query = query.order_by(page.c.cursor_sort_value.desc(), page.c.id.desc())
+            else:
+                query = query.order_by(page.c.cursor_sort_value.asc(), page.c.id.asc())
+            asset_ids = set()
+            assert_list = []
+            for asset in query.all():
+                if asset.id not in asset_ids:
+                    asset_ids.add(asset.id)
+                    assert_list.append(asset)
+            # 返回
+            return count, assert_list
+
+    # 流式查询资产列表 使用服务端游标按批返回 导出时内存占用不随数据量增长
+    @classmethod
+    def stream_asset(cls, query_params, chunk_size=1000):
+        # 获取session
+        session = get_session()
+        with session.begin():
+            # 查询语句
+            query = cls.build_asset_query(session, query_params)
+            # 默认按照创建时间降序
+            query = query.order_by(AssetBasicInfo.create_date.desc(), AssetBasicInfo.id.desc())
+            # 服务端游标 每次从数据库读取chunk_size条
+            chunk = []
+            for row in query.yield_per(chunk_size):
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            # 最后一批
+            if chunk:
+                yield chunk
+
+    # 查询资产配件的所有类型 导出时提前生成配件表头
+    @classmethod
+    def list_asset_part_types(cls, query_params):
+        session = get_session()
+        with session.begin():
+            query = session.query(AssetPartsInfo.part_type).join(AssetBasicInfo, AssetBasicInfo.id == AssetPartsInfo.asset_id)
+            query = query.filter(AssetPartsInfo.part_type.isnot(None))
+            # 数据库查询参数
+            if "asset_ids" in query_params and query_params["asset_ids"]:
+                query = query.filter(AssetBasicInfo.id.in_(query_params["asset_ids"].split(',')))
+            if "asset_category" in query_params and query_params["asset_category"]:
+                query = query.filter(AssetBasicInfo.asset_category == query_params["asset_category"])
+            # 返回去重后的类型
+            return [r.part_type for r in query.distinct().all()]
+
     @classmethod
     def list_asset_basic_info(cls, asset_name=None, page=1, page_size=10, field=None, dir="ascend"):
         # Session = sessionmaker(bind=engine,expire_on_commit=False)
@@ -198,6 +362,96 @@ class AssetSQL:
         with session.begin():
             return session.query(AssetBasicInfo).filter(AssetBasicInfo.asset_number == asset_number).first()
 
+    # 根据资产名称列表批量查询资产 导入时预加载使用
+    @classmethod
+    def list_asset_basic_info_by_names(cls, names, asset_category=None, batch_size=1000):
+        # 判空
+        if not names:
+            return []
+        session = get_session()
+        with session.begin():
+            asset_list = []
+            # 名称去重
+            names = list(dict.fromkeys(names))
+            # 分批查询，避免IN条件过长
+            for start in range(0, len(names), batch_size):
+                query = session.query(AssetBasicInfo.id, AssetBasicInfo.name, AssetBasicInfo.asset_number, AssetBasicInfo.asset_category)
+                query = query.filter(AssetBasicInfo.name.in_(names[start:start + batch_size]))
+                # 资产大类
+                if asset_category:
+                    query = query.filter(AssetBasicInfo.asset_category == asset_category)
+                asset_list.extend(query.all())
+            # 返回
+            return asset_list
+
+    # 根据id列表批量查询资产 批量更新时预加载使用
+    @classmethod
+    def list_asset_basic_info_by_ids(cls, asset_ids, batch_size=1000):
+        # 判空
+        if not asset_ids:
+            return []
+        session = get_session()
+        with session.begin():
+            asset_list = []
+            # id去重
+            asset_ids = list(dict.fromkeys(asset_ids))
+            # 分批查询，避免IN条件过长
+            for start in range(0, len(asset_ids), batch_size):
+                query = session.query(AssetBasicInfo.id, AssetBasicInfo.asset_type_id, AssetBasicInfo.asset_type,
+                                      AssetBasicInfo.description, AssetBasicInfo.asset_status)
+                query = query.filter(AssetBasicInfo.id.in_(asset_ids[start:start + batch_size]))
+                asset_list.extend(query.all())
+            # 返回
+            return asset_list
+
+    # 根据资产编号列表批量查询资产 导入时预加载使用
+    @classmethod
+    def list_asset_basic_info_by_asset_numbers(cls, asset_numbers, batch_size=1000):
+        # 判空
+        if not asset_numbers:
+            return []
+        session = get_session()
+        with session.begin():
+            asset_list = []
+            # 编号去重
+            asset_numbers = list(dict.fromkeys(asset_numbers))
+            # 分批查询，避免IN条件过长
+            for start in range(0, len(asset_numbers), batch_size):
+                query = session.query(AssetBasicInfo.id, AssetBasicInfo.name, AssetBasicInfo.asset_number)
+                query = query.filter(AssetBasicInfo.asset_number.in_(asset_numbers[start:start + batch_size]))
+                asset_list.extend(query.all())
+            # 返回
+            return asset_list
+
+    # 批量保存数据 按照表依次批量插入 在同一个事务中
+    @classmethod
+    def create_asset_mappings(cls, model_mappings, new_manufactures=None):
+        session = get_session()
+        with session.begin():
+            # 新的厂商与资产在同一个事务中创建 已经存在同名厂商时关联已存在的厂商 返回新建的厂商名称
+            created_names = []
+            if new_manufactures:
+                manufacture_dict = {}
+                query = session.query(AssetManufacturesInfo.id, AssetManufacturesInfo.name). \
+                    filter(AssetManufacturesInfo.name.in_([manufacture["name"] for manufacture in new_manufactures]))
+                for manufacture_id, manufacture_name in query:
+                    manufacture_dict.setdefault(manufacture_name, manufacture_id)
+                create_manufactures = [manufacture for manufacture in new_manufactures if manufacture["name"] not in manufacture_dict]
+                if create_manufactures:
+                    session.bulk_insert_mappings(AssetManufacturesInfo, create_manufactures)
+                    created_names = [manufacture["name"] for manufacture in create_manufactures]
+                # 关联关系改为已存在的厂商id
+                id_dict = {manufacture["id"]: manufacture_dict[manufacture["name"]] for manufacture in new_manufactures
+                           if manufacture["name"] in manufacture_dict}
+                for model, mappings in model_mappings:
+                    if model is AssetManufactureRelationInfo:
+                        for mapping in mappings:
+                            mapping["manufacture_id"] = id_dict.get(mapping["manufacture_id"], mapping["manufacture_id"])
+            for model, mappings in model_mappings:
+                if mappings:
+                    session.bulk_insert_mappings(model, mappings)
+            return created_names
+
     @classmethod
     def get_asset_count_number_by_asset_type_id(cls, asset_type_id):
         session = get_session()
@@ -273,6 +527,41 @@ class AssetSQL:
                 session.add_all(flow_info)
 
 
+    # 批量更新资产 basic_info_groups是{(更新字段, 值)元组: 资产id列表} 所有更新在一个事务中完成
+    @classmethod
+    def update_asset_list(cls, basic_info_groups, belong_values=None, manufacture_id=None, asset_ids=None, batch_size=1000):
+        session = get_session()
+        with session.begin():
+            # 1、基础信息 相同更新内容的资产一次更新
+            for update_items, group_asset_ids in basic_info_groups.items():
+                for start in range(0, len(group_asset_ids), batch_size):
+                    session.query(AssetBasicInfo).filter(AssetBasicInfo.id.in_(group_asset_ids[start:start + batch_size])). \
+                        update(dict(update_items), synchronize_session=False)
+            # 判空
+            if not asset_ids:
+                return
+            # 2、归属信息 已存在的更新 不存在的新建
+            if belong_values:
+                cls.update_or_insert_by_asset_ids(session, AssetBelongsInfo, asset_ids, belong_values, batch_size)
+            # 3、厂商关联信息 已存在的更新 不存在的新建
+            if manufacture_id:
+                cls.update_or_insert_by_asset_ids(session, AssetManufactureRelationInfo, asset_ids, {"manufacture_id": manufacture_id}, batch_size)
+
+    # 按照资产id批量更新关联表 资产没有关联数据时批量插入
+    @classmethod
+    def update_or_insert_by_asset_ids(cls, session, model, asset_ids, values, batch_size=1000):
+        # 已存在关联数据的资产id
+        exists_asset_ids = set()
+        for start in range(0, len(asset_ids), batch_size):
+            batch_asset_ids = asset_ids[start:start + batch_size]
+            exists_asset_ids.update(r.asset_id for r in session.query(model.asset_id).filter(model.asset_id.in_(batch_asset_ids)).all())
+            # 更新
+            session.query(model).filter(model.asset_id.in_(batch_asset_ids)).update(values, synchronize_session=False)
+        # 插入
+        insert_mappings = [dict(values, id=uuid.uuid4().hex, asset_id=asset_id) for asset_id in asset_ids if asset_id not in exists_asset_ids]
+        if insert_mappings:
+            session.bulk_insert_mappings(model, insert_mappings)
+
     @classmethod
     def delete_asset(cls, asset_id):
         # Session = sessionmaker(bind=engine, expire_on_commit=False)
@@ -363,6 +652,58 @@ class AssetSQL:
             return session.query(AssetManufacturesInfo).filter(AssetManufacturesInfo.name == manufacture_name).first()
 
 
+    # 查询厂商的id和名称索引 limit为空时查询全部
+    @classmethod
+    def list_manufacture_index(cls, limit=None):
+        session = get_session()
+        with session.begin():
+            # 只查询id和名称
+            query = session.query(AssetManufacturesInfo.id, AssetManufacturesInfo.name)
+            if limit is not None:
+                query = query.limit(limit)
+            # 返回
+            return query.all()
+
+    # 根据厂商名称批量查询或者创建厂商 不存在的名称在同一个事务中创建 返回名称到id的字典以及新建的名称
+    # 根据名称批量查询厂商id 名称重复时取第一个 返回名称到id的字典
+    @classmethod
+    def list_manufacture_ids_by_names(cls, manufacture_names, batch_size=1000):
+        session = get_session()
+        with session.begin():
+            manufacture_dict = {}
+            # 分批查询，避免IN条件过长
+            for start in range(0, len(manufacture_names), batch_size):
+                query = session.query(AssetManufacturesInfo.id, AssetManufacturesInfo.name).filter(AssetManufacturesInfo.name.in_(manufacture_names[start:start + batch_size]))
+                for manufacture_id, manufacture_name in query:
+                    manufacture_dict.setdefault(manufacture_name, manufacture_id)
+            return manufacture_dict
+
+    @classmethod
+    def upsert_manufactures_by_names(cls, manufacture_names, asset_id=None, description=None, create_date=None, batch_size=1000):
+        # 判空
+        if not manufacture_names:
+            return {}, []
+        # 名称去重
+        manufacture_names = list(dict.fromkeys(manufacture_names))
+        session = get_session()
+        with session.begin():
+            # 已存在的厂商 名称重复时取第一个
+            manufacture_dict = {}
+            # 分批查询，避免IN条件过长
+            for start in range(0, len(manufacture_names), batch_size):
+                query = session.query(AssetManufacturesInfo.id, AssetManufacturesInfo.name).filter(AssetManufacturesInfo.name.in_(manufacture_names[start:start + batch_size]))
+                for manufacture_id, manufacture_name in query:
+                    manufacture_dict.setdefault(manufacture_name, manufacture_id)
+            # 不存在的厂商统一新建
+            new_manufactures = [{"id": uuid.uuid4().hex, "asset_id": asset_id, "name": manufacture_name, "create_date": create_date,
+                                 "description": description, "extra": None}
+                                for manufacture_name in manufacture_names if manufacture_name not in manufacture_dict]
+            for start in range(0, len(new_manufactures), batch_size):
+                session.bulk_insert_mappings(AssetManufacturesInfo, new_manufactures[start:start + batch_size])
+            manufacture_dict.update({manufacture["name"]: manufacture["id"] for manufacture in new_manufactures})
+            # 返回
+            return manufacture_dict, [manufacture["name"] for manufacture in new_manufactures]
+
     @classmethod
     def get_manufacture_by_asset_id(cls, asset_id):
         session = get_session()
@@ -419,6 +760,41 @@ class AssetSQL:
         with session.begin():
             return session.query(AssetCustomersInfo).filter(AssetCustomersInfo.asset_id == asset_id).first()
 
+    # 根据资产id列表批量查询租户信息 每个资产只取一条
+    @classmethod
+    def list_customer_by_asset_ids(cls, asset_ids, batch_size=1000):
+        # 判空
+        if not asset_ids:
+            return []
+        session = get_session()
+        with session.begin():
+            customer_list = []
+            # id去重
+            asset_ids = list(dict.fromkeys(asset_ids))
+            # 分批查询，避免IN条件过长
+            for start in range(0, len(asset_ids), batch_size):
+                query = session.query(AssetCustomersInfo).filter(AssetCustomersInfo.asset_id.in_(asset_ids[start:start + batch_size]))
+                customer_list.extend(query.all())
+            # 返回
+            return customer_list
+
+    # 批量更新资产状态 基础信息和租户信息在一个事务中批量更新和插入
+    @classmethod
+    def update_assets_status(cls, basic_info_mappings, customer_update_mappings=None, customer_insert_mappings=None, batch_size=1000):
+        session = get_session()
+        with session.begin():
+            # 基础状态信息更新
+            for start in range(0, len(basic_info_mappings), batch_size):
+                session.bulk_update_mappings(AssetBasicInfo, basic_info_mappings[start:start + batch_size])
+            # 已存在的租户信息更新
+            if customer_update_mappings:
+                for start in range(0, len(customer_update_mappings), batch_size):
+                    session.bulk_update_mappings(AssetCustomersInfo, customer_update_mappings[start:start + batch_size])
+            # 新的租户信息插入
+            if customer_insert_mappings:
+                for start in range(0, len(customer_insert_mappings), batch_size):
+                    session.bulk_insert_mappings(AssetCustomersInfo, customer_insert_mappings[start:start + batch_size])
+
     @classmethod
     def create_asset_customer(cls, customer_db):
         session = get_session()
@@ -450,6 +826,23 @@ class AssetSQL:
             return assert_type_list
 
 
+    # 递归查询资产类型的所有子孙类型 使用WITH RECURSIVE一次查询
+    @classmethod
+    def list_child_asset_type(cls, asset_type_id):
+        session = get_session()
+        with session.begin():
+            # 直接子类型
+            child_types = session.query(AssetType.id).filter(AssetType.parent_id == asset_type_id). \
+                cte(name="child_types", recursive=True)
+            # 逐级向下 union去重避免数据成环时无限递归
+            child_types = child_types.union(session.query(AssetType.id).join(child_types, AssetType.parent_id == child_types.c.id))
+            # 查询所有子孙类型
+            query = session.query(AssetType).join(child_types, AssetType.id == child_types.c.id)
+            # 默认按照序号排序
+            query = query.order_by(AssetType.queue.asc())
+            # 返回
+            return query.all()
+
     @classmethod
     def create_asset_type(cls, asset_type):
         # Session = sessionmaker(bind=engine, expire_on_commit=False)
@@ -508,47 +901,93 @@ class AssetSQL:
             # 返回
             return assert_part_list
 
+    # 根据资产id列表批量查询配件 一次IN查询替代逐条查询
+    @classmethod
+    def list_asset_part_by_asset_ids(cls, asset_ids, batch_size=1000):
+        # 判空
+        if not asset_ids:
+            return []
+        session = get_session()
+        with session.begin():
+            assert_part_list = []
+            # 资产id去重
+            asset_ids = list(dict.fromkeys(asset_ids))
+            # id过多时分批查询，避免IN条件过长
+            for start in range(0, len(asset_ids), batch_size):
+                query = session.query(AssetPartsInfo).filter(AssetPartsInfo.asset_id.in_(asset_ids[start:start + batch_size]))
+                # 默认排序
+                query = query.order_by(AssetPartsInfo.part_type.asc())
+                assert_part_list.extend(query.all())
+            # 返回
+            return assert_part_list
+
+
+    # 配件列表的查询语句 包含外连接和查询条件
+    @classmethod
+    def build_asset_part_query(cls, session, query_params):
+        query = session.query(*part_columns, AssetBasicInfo.name.label("asset_name"), AssetBasicInfo.asset_number.label("asset_number"),
+                              AssetManufacturesInfo.name.label("manufacturer_name"), AssetType.asset_type_name.label("part_type_name"))
+        # 外连接
+        query = query.outerjoin(AssetBasicInfo, AssetBasicInfo.id == AssetPartsInfo.asset_id). \
+            outerjoin(AssetManufacturesInfo, AssetManufacturesInfo.id == AssetPartsInfo.manufacturer_id). \
+            outerjoin(AssetType, AssetType.id == AssetPartsInfo.part_type_id)
+        # 配件类型
+        part_catalog = None
+        # 数据库查询参数
+        if "part_catalog" in query_params and query_params["part_catalog"]:
+            part_catalog = query_params["part_catalog"]
+            if query_params["part_catalog"] == "inventory":
+                query = query.filter(AssetPartsInfo.asset_id == None)
+            if query_params["part_catalog"] == "used":
+                query = query.filter(AssetPartsInfo.asset_id != None)
+        if "name" in query_params and query_params["name"]:
+            query = query.filter(AssetPartsInfo.name.like('%' + query_params["name"] + '%'))
+        if "asset_id" in query_params and query_params["asset_id"]:
+            query = query.filter(AssetPartsInfo.asset_id == query_params["asset_id"])
+        if "asset_name" in query_params and query_params["asset_name"]:
+            query = query.filter(AssetBasicInfo.name.like('%' + query_params["asset_name"] + '%'))
+        if "part_type" in query_params and query_params["part_type"]:
+            # 库存配件的开头默认PART_
+            part_type_start = "PART_" if part_catalog == "inventory" else ""
+            # 过滤
+            query = query.filter(AssetPartsInfo.part_type.like(part_type_start + '%' + query_params["part_type"] + '%'))
+        if "part_config" in query_params and query_params["part_config"]:
+            query = query.filter(AssetPartsInfo.part_config.like('%' + query_params["part_config"] + '%'))
+        if "part_number" in query_params and query_params["part_number"]:
+            query = query.filter(AssetPartsInfo.part_number.like('%' + query_params["part_number"] + '%'))
+        if "surplus" in query_params and query_params["surplus"]:
+            query = query.filter(AssetPartsInfo.surplus.like('%' + query_params["surplus"] + '%'))
+        if "description" in query_params and query_params["description"]:
+            query = query.filter(AssetPartsInfo.description.like('%' + query_params["description"] + '%'))
+        if "personal_used_flag" in query_params:
+            query = query.filter(AssetPartsInfo.personal_used_flag == query_params["personal_used_flag"])
+        # 返回
+        return query
+
+    # 流式查询配件列表 导出时使用 每次返回chunk_size条数据
+    @classmethod
+    def stream_asset_part(cls, query_params, chunk_size=1000):
+        session = get_session()
+        with session.begin():
+            query = cls.build_asset_part_query(session, query_params)
+            # 默认按照创建时间降序
+            query = query.order_by(AssetPartsInfo.create_date.desc(), AssetPartsInfo.id.desc())
+            # 服务端游标 每次从数据库读取chunk_size条
+            chunk = []
+            for row in query.yield_per(chunk_size):
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            # 最后一批
+            if chunk:
+                yield chunk
 
     @classmethod
     def list_asset_part_page(cls, query_params, page=1, page_size=10, field=None, dir="ascend"):
         session = get_session()
         with session.begin():
-            query = session.query(*part_columns, AssetBasicInfo.name.label("asset_name"), AssetBasicInfo.asset_number.label("asset_number"),
-                                  AssetManufacturesInfo.name.label("manufacturer_name"), AssetType.asset_type_name.label("part_type_name"))
-            # 外连接
-            query = query.outerjoin(AssetBasicInfo, AssetBasicInfo.id == AssetPartsInfo.asset_id). \
-                outerjoin(AssetManufacturesInfo, AssetManufacturesInfo.id == AssetPartsInfo.manufacturer_id). \
-                outerjoin(AssetType, AssetType.id == AssetPartsInfo.part_type_id)
-            # 配件类型
-            part_catalog = None
-            # 数据库查询参数
-            if "part_catalog" in query_params and query_params["part_catalog"]:
-                part_catalog = query_params["part_catalog"]
-                if query_params["part_catalog"] == "inventory":
-                    query = query.filter(AssetPartsInfo.asset_id == None)
-                if query_params["part_catalog"] == "used":
-                    query = query.filter(AssetPartsInfo.asset_id != None)
-            if "name" in query_params and query_params["name"]:
-                query = query.filter(AssetPartsInfo.name.like('%' + query_params["name"] + '%'))
-            if "asset_id" in query_params and query_params["asset_id"]:
-                query = query.filter(AssetPartsInfo.asset_id == query_params["asset_id"])
-            if "asset_name" in query_params and query_params["asset_name"]:
-                query = query.filter(AssetBasicInfo.name.like('%' + query_params["asset_name"] + '%'))
-            if "part_type" in query_params and query_params["part_type"]:
-                # 库存配件的开头默认PART_
-                part_type_start = "PART_" if part_catalog == "inventory" else ""
-                # 过滤
-                query = query.filter(AssetPartsInfo.part_type.like(part_type_start + '%' + query_params["part_type"] + '%'))
-            if "part_config" in query_params and query_params["part_config"]:
-                query = query.filter(AssetPartsInfo.part_config.like('%' + query_params["part_config"] + '%'))
-            if "part_number" in query_params and query_params["part_number"]:
-                query = query.filter(AssetPartsInfo.part_number.like('%' + query_params["part_number"] + '%'))
-            if "surplus" in query_params and query_params["surplus"]:
-                query = query.filter(AssetPartsInfo.surplus.like('%' + query_params["surplus"] + '%'))
-            if "description" in query_params and query_params["description"]:
-                query = query.filter(AssetPartsInfo.description.like('%' + query_params["description"] + '%'))
-            if "personal_used_flag" in query_params:
-                query = query.filter(AssetPartsInfo.personal_used_flag == query_params["personal_used_flag"])
+            query = cls.build_asset_part_query(session, query_params)
             # 总数
             count = query.count()
             # 排序
@@ -625,29 +1064,53 @@ class AssetSQL:
         # Session = sessionmaker(bind=engine,expire_on_commit=False)
         # session = Session()
         session = get_session()
-        position_alias1 = aliased(AssetPositionsInfo)
-        basic_alias1 = aliased(AssetBasicInfo)
         with session.begin():
-            query = session.query(*flow_columns, AssetPositionsInfo.cabinet_position.label("cabinet_position"),AssetPositionsInfo.u_position.label("u_position"),
-                                  AssetBasicInfo.name.label("asset_name"),basic_alias1.name.label("opposite_asset_name"),
-                                  position_alias1.cabinet_position.label("opposite_cabinet_position"), position_alias1.u_position.label("opposite_u_position"))
-            # 外连接
-            query = query.outerjoin(AssetPositionsInfo, AssetPositionsInfo.asset_id == AssetFlowsInfo.asset_id). \
-                outerjoin(position_alias1, position_alias1.asset_id == AssetFlowsInfo.opposite_asset_id). \
-                outerjoin(AssetBasicInfo, AssetBasicInfo.id == AssetFlowsInfo.asset_id). \
-                outerjoin(basic_alias1, basic_alias1.id == AssetFlowsInfo.opposite_asset_id)
-                    # 数据库查询参数
-            if asset_id is not None:
-                query = query.filter(AssetFlowsInfo.asset_id == asset_id)
-            if asset_ids is not None:
-                query = query.filter(AssetFlowsInfo.id.in_(asset_ids.split(',')))
-            # 排序
-            query = query.order_by(AssetFlowsInfo.create_date.desc())
+            query = cls.build_asset_flow_query(session, asset_id, asset_ids)
             # 查询所有数据
             assert_flow_list = query.all()
             # 返回
             return assert_flow_list
 
+    # 流式查询资产流量列表 使用服务端游标按批返回
+    @classmethod
+    def stream_asset_flow(cls, asset_id=None, asset_ids=None, chunk_size=1000):
+        session = get_session()
+        with session.begin():
+            query = cls.build_asset_flow_query(session, asset_id, asset_ids)
+            # 服务端游标 每次从数据库读取chunk_size条
+            chunk = []
+            for row in query.yield_per(chunk_size):
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            # 最后一批
+            if chunk:
+                yield chunk
+
+    # 资产流量列表的查询语句
+    @classmethod
+    def build_asset_flow_query(cls, session, asset_id=None, asset_ids=None):
+        position_alias1 = aliased(AssetPositionsInfo)
+        basic_alias1 = aliased(AssetBasicInfo)
+        query = session.query(*flow_columns, AssetPositionsInfo.cabinet_position.label("cabinet_position"),AssetPositionsInfo.u_position.label("u_position"),
+                              AssetBasicInfo.name.label("asset_name"),basic_alias1.name.label("opposite_asset_name"),
+                              position_alias1.cabinet_position.label("opposite_cabinet_position"), position_alias1.u_position.label("opposite_u_position"))
+        # 外连接
+        query = query.outerjoin(AssetPositionsInfo, AssetPositionsInfo.asset_id == AssetFlowsInfo.asset_id). \
+            outerjoin(position_alias1, position_alias1.asset_id == AssetFlowsInfo.opposite_asset_id). \
+            outerjoin(AssetBasicInfo, AssetBasicInfo.id == AssetFlowsInfo.asset_id). \
+            outerjoin(basic_alias1, basic_alias1.id == AssetFlowsInfo.opposite_asset_id)
+        # 数据库查询参数
+        if asset_id is not None:
+            query = query.filter(AssetFlowsInfo.asset_id == asset_id)
+        if asset_ids is not None:
+            query = query.filter(AssetFlowsInfo.id.in_(asset_ids.split(',')))
+        # 排序
+        query = query.order_by(AssetFlowsInfo.create_date.desc())
+        # 返回
+        return query
+
     @classmethod
     def create_asset_flow(cls, asset_flow):
         # Session = sessionmaker(bind=engine, expire_on_commit=False)
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from sqlalchemy import JSON, Column, MetaData, String, Table, Text, DateTime, Integer, Boolean, ForeignKey, Float
+from sqlalchemy import JSON, Column, MetaData, String, Table, Text, DateTime, Integer, Boolean, ForeignKey, Float, UniqueConstraint, Index
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -22,6 +22,8 @@ class BigscreenMetricsConfig(Base):
 
 class BigscreenMetrics(Base):
     __tablename__ = "ops_bigscreen_metrics"
+    # 每个地区的每个指标只有一条数据 批量写入时按照这个唯一索引更新
+    __table_args__ = (UniqueConstraint("name", "region", name="uq_ops_bigscreen_metrics_name_region"),)
 
     id = Column(String(length=128), primary_key=True, nullable=False, index=True, unique=False)
     name = Column(String, ForeignKey("ops_bigscreen_metrics_configs.name"), nullable=False)
@@ -31,3 +33,22 @@ class BigscreenMetrics(Base):
 
     config = relationship("BigscreenMetricsConfig", back_populates="metrics")
 
+
+# 大屏指标的历史数据 按照分辨率(秒)保存每个时间段的平均值、最小值、最大值以及采样次数
+class BigscreenMetricsHistory(Base):
+    __tablename__ = "ops_bigscreen_metrics_history"
+    # 每个地区的每个指标在每个分辨率的每个时间段只有一条数据 按照分辨率和时间清理过期数据
+    __table_args__ = (
+        UniqueConstraint("name", "region", "resolution", "bucket_time", name="uq_ops_bigscreen_metrics_history_bucket"),
+        Index("ix_ops_bigscreen_metrics_history_resolution_bucket_time", "resolution", "bucket_time"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(length=128), nullable=False)
+    region = Column(String(length=128), nullable=False, default="")
+    resolution = Column(Integer, nullable=False)
+    bucket_time = Column(DateTime, nullable=False)
+    value_avg = Column(Float, nullable=True)
+    value_min = Column(Float, nullable=True)
+    value_max = Column(Float, nullable=True)
+    sample_count = Column(Integer, nullable=False, default=1)
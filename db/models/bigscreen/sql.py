@@ -2,12 +2,17 @@
 
 from __future__ import annotations
 
+import uuid
+
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from typing_extensions import assert_type
 
 from db.engines.mysql import get_session
-from db.models.bigscreen.models import BigscreenMetricsConfig, BigscreenMetrics
+from services.custom_exception import Fail
+from db.models.bigscreen.models import BigscreenMetricsConfig, BigscreenMetrics, BigscreenMetricsHistory
 
 from datetime import datetime
 from enum import Enum
@@ -59,6 +64,12 @@ class BigscreenSQL:
         with session.begin():
             return session.query(BigscreenMetricsConfig).filter(BigscreenMetricsConfig.sub_class == bigscreen_metrics_config_sub_class)
 
+    @classmethod
+    def list_bigscreen_metrics_config_names_by_sub_class(cls, bigscreen_metrics_config_sub_class):
+        session = get_session()
+        with session.begin():
+            return [name for name, in session.query(BigscreenMetricsConfig.name).filter(BigscreenMetricsConfig.sub_class == bigscreen_metrics_config_sub_class)]
+
     @classmethod
     def create_bigscreen_metrics(cls, bigscreen_metrics_info):
         session = get_session()
@@ -80,12 +91,59 @@ class BigscreenSQL:
                 BigscreenMetrics.region == bigscreen_metrics_region
             ).first()
 
+    @classmethod
+    def list_bigscreen_metrics_by_names_and_region(cls, bigscreen_metrics_names, bigscreen_metrics_region):
+        # 判空
+        if not bigscreen_metrics_names:
+            return []
+        session = get_session()
+        with session.begin():
+            return session.query(BigscreenMetrics).filter(
+                BigscreenMetrics.name.in_(bigscreen_metrics_names),
+                BigscreenMetrics.region == bigscreen_metrics_region
+            ).all()
+
     @classmethod
     def update_bigscreen_metrics(cls, bigscreen_metrics_info):
         session = get_session()
         with session.begin():
             session.merge(bigscreen_metrics_info)
 
+    # 批量写入指标数据 按照(name, region)唯一索引 存在则更新数据和修改时间 不存在则插入 一条语句完成
+    @classmethod
+    def upsert_bigscreen_metrics(cls, metrics_list):
+        # 判空
+        if not metrics_list:
+            return
+        session = get_session()
+        with session.begin():
+            dialect_name = session.get_bind().dialect.name
+            # 地区是空的数据唯一索引不生效 逐条更新或者插入
+            rows = [dict(metrics, id=uuid.uuid4().hex) for metrics in metrics_list if metrics["region"] is not None]
+            for metrics in metrics_list:
+                if metrics["region"] is None:
+                    count = session.query(BigscreenMetrics).filter(BigscreenMetrics.name == metrics["name"], BigscreenMetrics.region.is_(None)). \
+                        update({"data": metrics["data"], "last_modified": metrics["last_modified"]}, synchronize_session=False)
+                    if count == 0:
+                        session.add(BigscreenMetrics(id=uuid.uuid4().hex, **metrics))
+            if not rows:
+                return
+            session.execute(cls.create_upsert_statement(dialect_name, BigscreenMetrics, rows, ["name", "region"], ["data", "last_modified"]))
+
+    # 批量更新或者插入的语句 唯一索引冲突时更新指定的字段
+    @classmethod
+    def create_upsert_statement(cls, dialect_name, model, rows, index_elements, update_columns):
+        # mysql 使用 INSERT ... ON DUPLICATE KEY UPDATE
+        if dialect_name == "mysql":
+            statement = mysql_insert(model).values(rows)
+            return statement.on_duplicate_key_update({column: statement.inserted[column] for column in update_columns})
+        # sqlite 使用 INSERT ... ON CONFLICT DO UPDATE
+        if dialect_name == "sqlite":
+            statement = sqlite_insert(model).values(rows)
+            return statement.on_conflict_do_update(index_elements=index_elements,
+                                                   set_={column: statement.excluded[column] for column in update_columns})
+        raise Fail(f"upsert is not supported by {dialect_name}", error_message=f"数据库{dialect_name}不支持批量更新或者插入")
+
     @classmethod
     def update_bigscreen_metrics_data_by_name(cls, name, data):
         session = get_session()
@@ -117,4 +175,42 @@ class BigscreenSQL:
     def get_bigscreen_by_region(cls, bigscreen_metrics_region):
         session = get_session()
         with session.begin():
-            return session.query(BigscreenMetrics).filter(BigscreenMetrics.region == bigscreen_metrics_region).first()
\ No newline at end of file
+            return session.query(BigscreenMetrics).filter(BigscreenMetrics.region == bigscreen_metrics_region).first()
+
+    # 批量更新或者插入指标的历史数据 同一个时间段的数据覆盖
+    @classmethod
+    def upsert_bigscreen_metrics_history(cls, history_list):
+        # 判空
+        if not history_list:
+            return
+        session = get_session()
+        with session.begin():
+            session.execute(cls.create_upsert_statement(session.get_bind().dialect.name, BigscreenMetricsHistory, history_list,
+                                                        ["name", "region", "resolution", "bucket_time"],
+                                                        ["value_avg", "value_min", "value_max", "sample_count"]))
+
+    # 查询一段时间内指定分辨率的历史数据 按照指标名称和时间排序
+    @classmethod
+    def list_bigscreen_metrics_history(cls, resolution, start_time, end_time, names=None, region=None):
+        session = get_session()
+        with session.begin():
+            query = session.query(BigscreenMetricsHistory.name, BigscreenMetricsHistory.region, BigscreenMetricsHistory.bucket_time,
+                                  BigscreenMetricsHistory.value_avg, BigscreenMetricsHistory.value_min,
+                                  BigscreenMetricsHistory.value_max, BigscreenMetricsHistory.sample_count). \
+                filter(BigscreenMetricsHistory.resolution == resolution,
+                       BigscreenMetricsHistory.bucket_time >= start_time,
+                       BigscreenMetricsHistory.bucket_time < end_time)
+            if names:
+                query = query.filter(BigscreenMetricsHistory.name.in_(names))
+            if region is not None:
+                query = query.filter(BigscreenMetricsHistory.region == region)
+            return query.order_by(BigscreenMetricsHistory.name, BigscreenMetricsHistory.bucket_time).all()
+
+    # 删除指定分辨率在某个时间之前的历史数据 返回删除的数量
+    @classmethod
+    def delete_bigscreen_metrics_history(cls, resolution, before_time):
+        session = get_session()
+        with session.begin():
+            return session.query(BigscreenMetricsHistory).filter(BigscreenMetricsHistory.resolution == resolution,
+                                                                 BigscreenMetricsHistory.bucket_time < before_time). \
+                delete(synchronize_session=False)
@@ -49,3 +49,12 @@ class SystemSQL:
         session = get_session()
         with session.begin():
             session.add(operate_log_info)
+
+    @classmethod
+    def create_operate_logs(cls, operate_log_info_list):
+        # 判空
+        if not operate_log_info_list:
+            return
+        session = get_session()
+        with session.begin():
+            session.add_all(operate_log_info_list)
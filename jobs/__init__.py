@@ -16,9 +16,47 @@ bigscreen_opts = [
     cfg.IntOpt('metrics_expiration_time', default=60, help='metrics expiration time'),
     cfg.StrOpt('memcached_address', default='10.220.56.19:11211', help='memcached address'),
     cfg.StrOpt('memcached_key_prefix', default='bigscreen_metrics_', help='memcached bigscreen key prefix'),
+    cfg.ListOpt('memcached_servers', default=[], help='memcached servers with consistent hashing, use memcached_address when empty'),
+    cfg.IntOpt('memcached_pool_size', default=16, help='memcached connection pool size of each server'),
+    cfg.FloatOpt('memcached_connect_timeout', default=1.0, help='memcached connect timeout seconds'),
+    cfg.FloatOpt('memcached_timeout', default=1.0, help='memcached read and write timeout seconds'),
+    cfg.IntOpt('memcached_retry_attempts', default=2, help='memcached retry attempts before a server is marked dead'),
+    cfg.IntOpt('memcached_retry_timeout', default=1, help='memcached seconds between retry attempts'),
+    cfg.IntOpt('memcached_dead_timeout', default=60, help='memcached seconds before a dead server is retried'),
+    cfg.IntOpt('prometheus_max_concurrency', default=10, help='max concurrent prometheus queries of one metrics collection'),
+    cfg.FloatOpt('prometheus_connect_timeout', default=3.0, help='prometheus connect timeout seconds'),
+    cfg.FloatOpt('prometheus_query_timeout', default=10.0, help='prometheus timeout seconds of each query'),
     cfg.StrOpt('nightingale_base_url', default='http://nightingale.zetyun.cn', help='nightingale base url'),
     cfg.StrOpt('nightingale_username', default='root', help='nightingale username'),
-    cfg.StrOpt('nightingale_password', default='Zetyun2024', help='nightingale password')
+    cfg.StrOpt('nightingale_password', default='Zetyun2024', help='nightingale password'),
+    cfg.FloatOpt('nightingale_timeout', default=10.0, help='nightingale request timeout seconds'),
+    cfg.IntOpt('nightingale_token_expire_seconds', default=3600, help='nightingale access token lifetime seconds when the token has no exp claim'),
+    cfg.IntOpt('nightingale_token_refresh_margin', default=60, help='refresh the nightingale access token this many seconds before it expires'),
+    cfg.IntOpt('nightingale_alert_list_limit', default=1000, help='max alert events fetched by one list call to count the alerts client-side'),
+    cfg.IntOpt('nightingale_alert_counts_ttl', default=5, help='seconds the alert counts of one list call are shared'),
+    cfg.IntOpt('metrics_history_retention_1m_days', default=2, help='days the 1 minute bigscreen metrics history is kept'),
+    cfg.IntOpt('metrics_history_retention_5m_days', default=14, help='days the 5 minute bigscreen metrics history is kept'),
+    cfg.IntOpt('metrics_history_retention_1h_days', default=180, help='days the 1 hour bigscreen metrics history is kept'),
+    cfg.IntOpt('metrics_history_rollup_interval', default=60, help='bigscreen metrics history rollup and purge interval seconds'),
+    cfg.IntOpt('promql_proxy_cache_ttl', default=15, help='seconds a successful drill-down promql result is cached'),
+    cfg.IntOpt('promql_proxy_cache_max_size', default=1000, help='max drill-down promql results cached per process'),
+    cfg.IntOpt('promql_proxy_align_seconds', default=15, help='seconds range query start/end are aligned to when no step is given'),
+    cfg.IntOpt('promql_proxy_max_connections', default=20, help='max pooled connections of the drill-down promql proxy'),
+    cfg.StrOpt('leader_election_backend', default='redis', choices=['redis', 'file'],
+               help='how the syncer leader is elected: a redis lease shared by all replicas or a file lock for single-host setups'),
+    cfg.IntOpt('leader_election_lease_seconds', default=30, help='seconds the syncer leader lease lasts without renewal'),
+    cfg.IntOpt('leader_election_renew_interval', default=10, help='seconds between syncer leader lease renewals and follower campaigns'),
+    cfg.StrOpt('leader_election_lock_file', default='/tmp/dingoops_bigscreen_syncer.lock', help='lock file of the file leader election backend'),
+    cfg.IntOpt('mq_outbox_max_size', default=1000, help='max bigscreen mq messages buffered while the broker is unavailable, the oldest are dropped first'),
+    cfg.FloatOpt('mq_reconnect_backoff_initial', default=1.0, help='seconds before the first mq reconnect attempt'),
+    cfg.FloatOpt('mq_reconnect_backoff_max', default=60.0, help='max seconds between mq reconnect attempts'),
+    cfg.IntOpt('mq_heartbeat', default=60, help='mq publisher connection heartbeat seconds'),
+    cfg.IntOpt('mq_blocked_connection_timeout', default=30, help='seconds before a publisher connection blocked by the broker is dropped'),
+    cfg.IntOpt('mq_consumer_prefetch', default=50, help='unacked bigscreen mq messages the center region consumer prefetches'),
+    cfg.IntOpt('mq_consumer_batch_size', default=20, help='max bigscreen mq messages written to the db in one batch'),
+    cfg.FloatOpt('mq_consumer_batch_interval', default=1.0, help='max seconds a bigscreen mq message waits for its batch to fill'),
+    cfg.IntOpt('mq_consumer_max_deliveries', default=30, help='deliveries after which a bigscreen mq message that keeps failing on its own is moved to the dead letter queue'),
+    cfg.IntOpt('metrics_history_max_points', default=2016, help='max points per metric when the history resolution is chosen automatically'),
 ]
 
 CONF.register_group(bigscreen_group)
@@ -1,47 +1,85 @@
 import json
 
 from apscheduler.schedulers.blocking import BlockingScheduler
-from pymemcache.client.base import Client
 from apscheduler.schedulers.background import BackgroundScheduler
+from services.bigscreen_collector import bigscreen_metrics_collector
+from services.bigscreen_history import BigScreenMetricsHistoryService
 from services.bigscreens import BigScreensService, region_name
+from services.memcached_client import memcached_client
 from services.bigscreenshovel import BigScreenShovelService
+from services.leader_election import LeaderElection
 from jobs import CONF
 from datetime import datetime, timedelta
 import time
 
-from services.syn_bigscreens import BigScreenSyncService
+from services.syn_bigscreens import BigScreenSyncService, bigscreen_mq_publisher, bigscreen_mq_consumer
 
 scheduler = BackgroundScheduler()
 blocking_scheduler = BlockingScheduler()
-# 启动完成后执行
-run_time_10s = datetime.now() + timedelta(seconds=10)  # 任务将在10秒后执行
-run_time_30s = datetime.now() + timedelta(seconds=30)  # 任务将在30秒后执行
 
+# 每个gunicorn的worker都会启动定时任务 只有选出的主执行同步任务
 def start():
+    scheduler.add_job(campaign_leader, 'interval', seconds=CONF.bigscreen.leader_election_renew_interval, next_run_time=datetime.now())
     scheduler.add_job(fetch_bigscreen_metrics, 'interval', seconds=CONF.bigscreen.metrics_fetch_interval)
-    scheduler.add_job(auto_add_shovel, 'date', run_date=run_time_10s)
-    scheduler.add_job(auto_connect_queue, 'date', run_date=run_time_30s)
+    scheduler.add_job(rollup_bigscreen_metrics_history, 'interval', seconds=CONF.bigscreen.metrics_history_rollup_interval)
     scheduler.start()
 
+# 停止定时任务并退出选主 其他进程立即接管
+def stop():
+    scheduler.shutdown(wait=False)
+    # 处理完当前批次的消息后停止消费 未ack的消息由broker重新投递
+    bigscreen_mq_consumer.stop()
+    leader_election.resign()
+    # 发送发件箱中剩余的消息
+    bigscreen_mq_publisher.close()
+
+# 竞选或者续约 不再是主时停止消费mq消息
+def campaign_leader():
+    if not leader_election.campaign():
+        bigscreen_mq_consumer.stop()
+
+# 成为主之后执行的任务 启动完成后执行
+def on_elected():
+    scheduler.add_job(auto_add_shovel, 'date', run_date=datetime.now() + timedelta(seconds=10))  # 任务将在10秒后执行
+    scheduler.add_job(auto_connect_queue, 'date', run_date=datetime.now() + timedelta(seconds=30))  # 任务将在30秒后执行
+
+# 每个地区选一个主
+leader_election = LeaderElection(region_name, on_elected=on_elected)
+
 def auto_add_shovel():
+    if not leader_election.is_leader():
+        return
     print(f"Starting add shovel at {time.strftime('%Y-%m-%d %H:%M:%S')}")
     BigScreenShovelService.add_shovel()
 
 def auto_connect_queue():
+    if not leader_election.is_leader():
+        return
     print(f"Starting connect big screen mq queue at {time.strftime('%Y-%m-%d %H:%M:%S')}")
     BigScreenSyncService.connect_mq_queue()
 
+# 数值类型的指标转换成浮点数写入缓存 按照8字节保存
+def convert_cache_value(metric_value):
+    try:
+        return float(metric_value)
+    except (TypeError, ValueError):
+        return metric_value
+
 def fetch_bigscreen_metrics():
+    # 只有主采集
+    if not leader_election.is_leader():
+        return
     metrics = BigScreensService.list_bigscreen_metrics_configs()
-    memcached_client = Client((CONF.bigscreen.memcached_address))
-    metrics_dict = {}
+    # 并发采集 使用已经加载的指标配置 采集失败的指标保留上一次的数据
+    metrics_dict = {metric_name: metric_value for metric_name, metric_value in bigscreen_metrics_collector.collect(metrics).items()
+                    if metric_value is not None}
     metrics_dict_with_prefix = {}
-    print(f'client: {memcached_client}')
-    for metric in metrics:
-        metric_name = metric.name
-        metric_value = BigScreensService.get_bigscreen_metrics(metric_name, None, sync=True)
-        metrics_dict[metric_name] = metric_value
-        metrics_dict_with_prefix[f'{CONF.bigscreen.memcached_key_prefix}{metric_name}'] = metric_value
+    for metric_name, metric_value in metrics_dict.items():
+        metrics_dict_with_prefix[f'{CONF.bigscreen.memcached_key_prefix}{metric_name}'] = convert_cache_value(metric_value)
+    # 采集期间租约可能已经失效 写入前校验仍然是主
+    if not leader_election.validate():
+        print("大屏指标同步任务已经不是主 丢弃本次采集的数据")
+        return
     try:
         # metrics 写入缓存
         memcached_client.set_many(metrics_dict_with_prefix, expire=CONF.bigscreen.metrics_expiration_time)
@@ -54,3 +92,12 @@ def fetch_bigscreen_metrics():
     except Exception as e:
         print(f"缓存写入失败: {e}")
 
+# 汇总指标的历史数据并清理过期数据
+def rollup_bigscreen_metrics_history():
+    if not leader_election.is_leader():
+        return
+    try:
+        BigScreenMetricsHistoryService.rollup()
+        BigScreenMetricsHistoryService.purge()
+    except Exception as e:
+        print(f"大屏指标历史数据汇总失败: {e}")
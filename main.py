@@ -1,8 +1,15 @@
+import hashlib
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import Response
+
 from api import api_router
 from jobs import bigscreen_metrics_syncer
+from services.bigscreen_collector import bigscreen_metrics_collector
+from services.promql_proxy import promql_proxy
+from services.response_cache import response_cache
 
 PROJECT_NAME = "dingoops"
 
@@ -21,6 +28,79 @@ async def root():
 
 app.include_router(api_router, prefix="/v1")
 
+# 支持ETag的接口前缀以及对应的资源 按照顺序匹配第一个
+# 资源不为空时使用资源的版本号计算ETag 版本号没有变化时不调用接口直接返回304 响应依赖多个资源时使用所有资源的版本号
+# 资源为空时使用响应内容的hash计算ETag 文件下载和流式导出不处理
+etag_path_resources = [
+    ("/v1/assets/download", False),
+    ("/v1/assets/templates", False),
+    ("/v1/assets/export.", False),
+    ("/v1/assets/flows/export.", False),
+    ("/v1/parts/export.", False),
+    ("/v1/assets/import_jobs", None),
+    ("/v1/assets/types", ("asset_types",)),
+    ("/v1/assets/columns", ("asset_columns",)),
+    # 资产和配件列表中包含类型名称
+    ("/v1/assets", ("assets", "asset_types")),
+    ("/v1/parts", ("assets", "asset_types")),
+    ("/v1/monitor/urls", ("monitor_urls",)),
+    ("/v1/system/logs", ("system_logs",)),
+    ("/v1/bigscreen/", None),
+]
+
+# 查询请求路径对应的资源 False表示不支持ETag
+def get_etag_resource(path):
+    for path_prefix, resource in etag_path_resources:
+        if path.startswith(path_prefix):
+            return resource
+    return False
+
+# 判断请求头If-None-Match是否与ETag匹配 按照弱比较忽略W/前缀
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [value.strip().removeprefix("W/") for value in if_none_match.split(",")]
+
+# 根据版本号纪元和资源版本号计算ETag 任意一个查询失败时返回None
+def create_generation_etag(resources, request):
+    try:
+        # 纪元与版本号一起读取 redis被清空后版本号从0开始 纪元不同 不会与清空前的ETag相同
+        epoch = response_cache.get_generation_epoch()
+        generations = "-".join(f"{resource}-{response_cache.get_generation(resource)}" for resource in resources)
+    except Exception:
+        return None
+    request_hash = hashlib.sha1(f"{request.url.path}?{request.url.query}".encode("utf-8")).hexdigest()
+    return f'"{epoch}-{generations}-{request_hash}"'
+
+# 条件请求中间件 GET请求计算ETag 数据没有变化时返回304
+@app.middleware("http")
+async def etag_middleware(request: Request, call_next):
+    # 只处理GET请求
+    resources = get_etag_resource(request.url.path) if request.method == "GET" else False
+    if resources is False:
+        return await call_next(request)
+    if_none_match = request.headers.get("if-none-match")
+    # 使用资源版本号计算ETag 接口调用之前计算 版本号在查询期间变化时客户端下次会重新下载
+    etag = await run_in_threadpool(create_generation_etag, resources, request) if resources else None
+    if etag and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response = await call_next(request)
+    # 只处理成功的json响应
+    if response.status_code != 200 or not response.headers.get("content-type", "").startswith("application/json"):
+        return response
+    # 读取响应内容
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    headers = {key: value for key, value in response.headers.items() if key.lower() != "content-length"}
+    # 没有资源版本号时使用响应内容的hash
+    if not etag:
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag}, background=response.background)
+    headers["ETag"] = etag
+    return Response(content=body, status_code=response.status_code, headers=headers, background=response.background)
+
 # @app.on_event("startup")
 # async def app_start():
 #     bigscreen_metrics_syncer.start()
@@ -29,7 +109,12 @@ app.include_router(api_router, prefix="/v1")
 async def lifespan(app: FastAPI):
     bigscreen_metrics_syncer.start()
     yield
-    # Add any shutdown logic here if needed
+    # 停止同步任务 其他worker立即接管
+    bigscreen_metrics_syncer.stop()
+    # 关闭下钻查询的连接池
+    await promql_proxy.close()
+    # 关闭指标采集的连接池并停止采集线程的事件循环 等待关闭时不阻塞当前的事件循环
+    await run_in_threadpool(bigscreen_metrics_collector.close)
 
 app.router.lifespan_context = lifespan
 
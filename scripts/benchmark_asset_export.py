@@ -0,0 +1,166 @@
+# 资产excel导出的性能测试 对比旧的load_workbook+DataFrame.iterrows写入方式和openpyxl只写模式的耗时与峰值内存
+# 用法: python scripts/benchmark_asset_export.py [--assets 1000,10000,50000]
+# 每种规模生成一个临时的sqlite数据库 每次导出在独立的子进程中执行 峰值内存取子进程的ru_maxrss
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from db import CONF
+
+# 导出方式
+EXPORT_MODES = ("load_workbook", "write_only")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="asset excel export benchmark, load_workbook/iterrows vs write-only")
+    parser.add_argument("--assets", default="1000,10000,50000", help="comma separated numbers of seeded server assets")
+    # 子进程参数
+    parser.add_argument("--child", choices=EXPORT_MODES, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--connection", default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+# 替换数据库地址 必须在创建数据库连接之前执行
+def use_connection(connection):
+    CONF.set_override("connection", connection, group="database")
+
+
+# 生成服务器资产以及位置、归属、厂商、合同和配件数据 每个资产4个配件
+def seed_assets(asset_count):
+    from db.engines.mysql import get_engine
+    from db.models.asset import models as asset_models
+    from db.models.asset.models import AssetBasicInfo, AssetPositionsInfo, AssetBelongsInfo, AssetPartsInfo, \
+        AssetManufacturesInfo, AssetManufactureRelationInfo, AssetContractsInfo
+    engine = get_engine()
+    asset_models.Base.metadata.create_all(engine)
+    base_time = datetime(2024, 1, 1)
+    manufactures = [{"id": uuid.uuid4().hex, "name": f"manufacture-{i}"} for i in range(50)]
+    part_types = ("cpu", "memory", "disk", "nic")
+    with engine.begin() as connection:
+        connection.execute(AssetManufacturesInfo.__table__.insert(), manufactures)
+        for start in range(0, asset_count, 5000):
+            basic_list, position_list, belong_list, contract_list, part_list, relation_list = [], [], [], [], [], []
+            for i in range(start, min(start + 5000, asset_count)):
+                asset_id = uuid.uuid4().hex
+                extra = json.dumps({"host_name": f"host-{i}", "ip": f"10.0.{i // 256 % 256}.{i % 256}", "idrac": f"10.1.{i // 256 % 256}.{i % 256}",
+                                    "use_to": "compute", "operate_system": "ubuntu 22.04"})
+                basic_list.append({"id": asset_id, "name": f"asset-{i}", "asset_category": "SERVER", "asset_type": "SERVER_GPU",
+                                   "equipment_number": f"R750-{i % 7}", "asset_number": f"NO-{i:06d}", "sn_number": f"SN-{i:06d}",
+                                   "asset_status": str(i % 4), "extra": extra, "description": f"description of asset {i}",
+                                   "create_date": base_time + timedelta(minutes=i)})
+                position_list.append({"id": uuid.uuid4().hex, "asset_id": asset_id, "frame_position": f"frame-{i % 30}",
+                                      "cabinet_position": f"cabinet-{i % 300}", "u_position": str(i % 42)})
+                belong_list.append({"id": uuid.uuid4().hex, "asset_id": asset_id, "department_name": f"dept-{i % 12}", "user_name": f"user-{i % 500}"})
+                contract_list.append({"id": uuid.uuid4().hex, "asset_id": asset_id, "contract_number": f"CT-{i // 100}", "batch_number": f"B-{i // 1000}",
+                                      "purchase_date": base_time + timedelta(days=i % 365)})
+                relation_list.append({"id": uuid.uuid4().hex, "asset_id": asset_id, "manufacture_id": manufactures[i % len(manufactures)]["id"]})
+                for part_type in part_types:
+                    part_list.append({"id": uuid.uuid4().hex, "asset_id": asset_id, "part_type": part_type, "part_config": f"{part_type} config {i % 10}"})
+            connection.execute(AssetBasicInfo.__table__.insert(), basic_list)
+            connection.execute(AssetPositionsInfo.__table__.insert(), position_list)
+            connection.execute(AssetBelongsInfo.__table__.insert(), belong_list)
+            connection.execute(AssetContractsInfo.__table__.insert(), contract_list)
+            connection.execute(AssetManufactureRelationInfo.__table__.insert(), relation_list)
+            connection.execute(AssetPartsInfo.__table__.insert(), part_list)
+
+
+# 旧的导出方式 数据全部读入内存 复制模板后load_workbook 通过DataFrame.iterrows逐个单元格写入
+def export_with_load_workbook(export_service, result_file_path):
+    import pandas as pd
+    from openpyxl.reader.excel import load_workbook
+    from openpyxl.styles import Border, Side
+    from db.models.asset.sql import AssetSQL
+    from utils.constant import ASSET_SERVER_TEMPLATE_FILE_DIR, ASSET_TEMPLATE_ASSET_SHEET, ASSET_TEMPLATE_PART_SHEET, \
+        ASSET_EXPORT_CHUNK_SIZE, asset_part_info_columns
+    thin_border = Border(left=Side(border_style="thin", color="000000"), right=Side(border_style="thin", color="000000"),
+                         top=Side(border_style="thin", color="000000"), bottom=Side(border_style="thin", color="000000"))
+    # 读取全部数据 行的组装与只写模式相同 只比较excel的写入方式
+    excel_asset_data = []
+    excel_part_data = []
+    excel_part_header = set()
+    for chunk in AssetSQL.stream_asset({"asset_category": "SERVER"}, ASSET_EXPORT_CHUNK_SIZE):
+        asset_parts_dict = {}
+        for part in AssetSQL.list_asset_part_by_asset_ids([r.id for r in chunk]):
+            asset_parts_dict.setdefault(part.asset_id, []).append(part)
+        for r in chunk:
+            excel_asset_data.append(export_service.convert_asset_server_excel_row(r))
+            asset_parts = asset_parts_dict.get(r.id)
+            if asset_parts:
+                excel_part_header.update(part.part_type for part in asset_parts if part.part_type not in asset_part_info_columns)
+                excel_part_data.append(export_service.convert_asset_part_excel_row(r, asset_parts))
+    # 复制模板并加载
+    shutil.copy2(ROOT_DIR + ASSET_SERVER_TEMPLATE_FILE_DIR, result_file_path)
+    book = load_workbook(result_file_path)
+    sheet = book[ASSET_TEMPLATE_ASSET_SHEET]
+    headers = [cell.value for cell in sheet[1]]
+    for idx, row in pd.DataFrame(excel_asset_data).iterrows():
+        for col_idx, header in enumerate(headers, start=1):
+            sheet.cell(row=2 + idx, column=col_idx, value=row.get(header, "")).border = thin_border
+    part_sheet = book[ASSET_TEMPLATE_PART_SHEET]
+    part_headers = [cell.value for cell in part_sheet[1]]
+    for header_index, header in enumerate(sorted(excel_part_header), start=len(part_headers) + 1):
+        part_sheet.cell(row=1, column=header_index, value=header)
+    part_headers.extend(sorted(excel_part_header))
+    for idx, row in pd.DataFrame(excel_part_data).iterrows():
+        for col_idx, header in enumerate(part_headers, start=1):
+            part_sheet.cell(row=2 + idx, column=col_idx, value=row.get(header, "")).border = thin_border
+    book.save(result_file_path)
+
+
+# 子进程 执行一次导出 输出耗时和峰值内存(MB)
+def run_child(mode, connection):
+    use_connection(connection)
+    import api  # noqa: F401
+    from services.assets_export import AssetsExportService
+    export_service = AssetsExportService()
+    result_file_path = os.path.join(tempfile.mkdtemp(), "export.xlsx")
+    # 导入模块后的内存作为基线
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    start_time = time.perf_counter()
+    if mode == "load_workbook":
+        export_with_load_workbook(export_service, result_file_path)
+    else:
+        # 模板按照相对当前目录的路径读取
+        os.chdir(ROOT_DIR)
+        export_service.create_asset_excel("SERVER", result_file_path)
+    elapsed = time.perf_counter() - start_time
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": elapsed, "peak_rss_mb": peak_rss, "baseline_rss_mb": baseline_rss,
+                      "file_mb": os.path.getsize(result_file_path) / 1024 / 1024}))
+    shutil.rmtree(os.path.dirname(result_file_path), ignore_errors=True)
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        run_child(args.child, args.connection)
+        return
+    print(f"{'assets':>8}{'mode':>16}{'seconds':>10}{'peak rss(MB)':>15}{'rss growth(MB)':>17}{'file(MB)':>10}")
+    for asset_count in [int(asset_count) for asset_count in args.assets.split(",")]:
+        # 每种规模一个数据库 在子进程中生成 避免影响父进程的数据库连接
+        db_dir = tempfile.mkdtemp()
+        connection = "sqlite:///" + os.path.join(db_dir, "dingoops_export_benchmark.db")
+        subprocess.run([sys.executable, "-c", "import sys; sys.path.insert(0, sys.argv[1]); from scripts.benchmark_asset_export import use_connection, seed_assets; "
+                        "use_connection(sys.argv[2]); seed_assets(int(sys.argv[3]))", ROOT_DIR, connection, str(asset_count)], check=True)
+        for mode in EXPORT_MODES:
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, "--connection", connection],
+                                    check=True, capture_output=True, text=True).stdout
+            res = json.loads(output.strip().splitlines()[-1])
+            print(f"{asset_count:>8}{mode:>16}{res['seconds']:>10.2f}{res['peak_rss_mb']:>15.1f}"
+                  f"{res['peak_rss_mb'] - res['baseline_rss_mb']:>17.1f}{res['file_mb']:>10.2f}")
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# 资产列表查询的性能测试 对比0003迁移的索引创建前后AssetSQL.list_asset的耗时
+# 用法: python scripts/benchmark_asset_list.py [--assets 50000] [--connection sqlite:////tmp/dingoops_benchmark.db]
+# 数据库需要是空库 默认使用临时的sqlite文件 测试mysql时传入mysql的连接地址
+import argparse
+import importlib.util
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import CONF
+
+# 资产大类
+ASSET_CATEGORIES = ["server", "network", "storage", "gpu"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="asset list benchmark with and without the 0003 indexes")
+    parser.add_argument("--assets", type=int, default=50000, help="number of seeded assets")
+    parser.add_argument("--connection", default=None, help="database url of an empty database, default a temporary sqlite file")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each query")
+    return parser.parse_args()
+
+
+# 加载0003迁移 用来删除和重新创建索引
+def load_index_migration():
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "alembic", "versions",
+                        "0003_add_assets_lookup_indexes.py")
+    spec = importlib.util.spec_from_file_location("migration_0003", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    return migration
+
+
+# 执行迁移的upgrade或者downgrade
+def run_migration(engine, migration_func):
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+    with engine.begin() as connection:
+        with Operations.context(MigrationContext.configure(connection)):
+            migration_func()
+
+
+# 生成资产以及位置、归属、厂商关联和配件数据
+def seed_assets(engine, asset_count):
+    from db.models.asset.models import AssetBasicInfo, AssetPositionsInfo, AssetBelongsInfo, AssetPartsInfo, \
+        AssetManufacturesInfo, AssetManufactureRelationInfo
+    base_time = datetime(2024, 1, 1)
+    manufactures = [{"id": uuid.uuid4().hex, "name": f"manufacture-{i}"} for i in range(50)]
+    with engine.begin() as connection:
+        connection.execute(AssetManufacturesInfo.__table__.insert(), manufactures)
+        for start in range(0, asset_count, 5000):
+            basic_list, position_list, belong_list, part_list, relation_list = [], [], [], [], []
+            for i in range(start, min(start + 5000, asset_count)):
+                asset_id = uuid.uuid4().hex
+                basic_list.append({"id": asset_id, "name": f"asset-{i}", "asset_category": ASSET_CATEGORIES[i % len(ASSET_CATEGORIES)],
+                                   "asset_type": "server_gpu", "asset_type_id": f"type-{i % 20}", "asset_number": f"NO-{i:06d}",
+                                   "sn_number": f"SN-{i:06d}", "asset_status": str(i % 4), "create_date": base_time + timedelta(minutes=i)})
+                position_list.append({"id": uuid.uuid4().hex, "asset_id": asset_id, "frame_position": f"frame-{i % 30}",
+                                      "cabinet_position": f"cabinet-{i % 300}", "u_position": str(i % 42)})
+                belong_list.append({"id": uuid.uuid4().hex, "asset_id": asset_id, "department_name": f"dept-{i % 12}", "user_name": f"user-{i % 500}"})
+                relation_list.append({"id": uuid.uuid4().hex, "asset_id": asset_id, "manufacture_id": manufactures[i % len(manufactures)]["id"]})
+                for k in range(2):
+                    part_list.append({"id": uuid.uuid4().hex, "asset_id": asset_id, "name": f"part-{k}", "part_type": "disk"})
+            connection.execute(AssetBasicInfo.__table__.insert(), basic_list)
+            connection.execute(AssetPositionsInfo.__table__.insert(), position_list)
+            connection.execute(AssetBelongsInfo.__table__.insert(), belong_list)
+            connection.execute(AssetManufactureRelationInfo.__table__.insert(), relation_list)
+            connection.execute(AssetPartsInfo.__table__.insert(), part_list)
+
+
+# 测试的查询 名称以及查询参数
+def benchmark_cases(asset_count):
+    return [
+        ("default page 1", {}, 1),
+        ("default page 100", {}, 100),
+        ("category page 1", {"asset_category": "gpu"}, 1),
+        ("asset_number lookup", {"asset_number": f"NO-{asset_count // 2:06d}"}, 1),
+        ("asset_ids lookup", {"asset_ids": None}, 1),
+    ]
+
+
+# 每个查询执行多次 返回耗时的中位数(毫秒)
+def run_cases(asset_count, asset_ids, repeat):
+    from db.models.asset.sql import AssetSQL
+    res = {}
+    for name, query_params, page in benchmark_cases(asset_count):
+        if "asset_ids" in query_params:
+            query_params = {"asset_ids": ",".join(asset_ids)}
+        times = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            AssetSQL.list_asset(query_params, page, 10, None, None)
+            times.append((time.perf_counter() - start_time) * 1000)
+        res[name] = statistics.median(times)
+    return res
+
+
+def main():
+    args = parse_args()
+    connection = args.connection or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "dingoops_benchmark.db")
+    # 在创建数据库连接之前替换数据库地址
+    CONF.set_override("connection", connection, group="database")
+    from db.engines.mysql import get_engine
+    from db.models.asset import models as asset_models
+    engine = get_engine()
+    asset_models.Base.metadata.create_all(engine)
+    migration = load_index_migration()
+    # 模型中声明了0003的索引 先删除 模拟迁移之前的表结构
+    run_migration(engine, migration.downgrade)
+    seed_start = time.perf_counter()
+    seed_assets(engine, args.assets)
+    print(f"seeded {args.assets} assets in {time.perf_counter() - seed_start:.1f}s on {engine.dialect.name}")
+    with engine.connect() as conn:
+        from sqlalchemy import text
+        asset_ids = [row[0] for row in conn.execute(text("select id from ops_assets_basic_info order by create_date limit 5 offset 1000"))]
+    before = run_cases(args.assets, asset_ids, args.repeat)
+    run_migration(engine, migration.upgrade)
+    after = run_cases(args.assets, asset_ids, args.repeat)
+    # 输出
+    print(f"{'query':<22}{'before(ms)':>12}{'after(ms)':>12}{'speedup':>10}")
+    for name in before:
+        print(f"{name:<22}{before[name]:>12.1f}{after[name]:>12.1f}{before[name] / after[name]:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -25,10 +25,23 @@ redis_opts = [
     cfg.StrOpt('redis_password', default=None, help='the redis password'),
 ]
 
+# 接口响应缓存数据 各个接口的缓存时间(秒) 0表示不缓存
+response_cache_group = cfg.OptGroup(name='response_cache', title='response cache conf data')
+response_cache_opts = [
+    cfg.BoolOpt('enabled', default=True, help='enable the redis response cache of the hot read endpoints'),
+    cfg.IntOpt('assets_ttl', default=60, help='the cache seconds of the asset list'),
+    cfg.IntOpt('asset_types_ttl', default=600, help='the cache seconds of the asset type list'),
+    cfg.IntOpt('asset_columns_ttl', default=600, help='the cache seconds of the asset extend column list'),
+    cfg.IntOpt('asset_parts_ttl', default=60, help='the cache seconds of the asset part list'),
+    cfg.IntOpt('monitor_urls_ttl', default=600, help='the cache seconds of the monitor url list'),
+]
+
 # 注册默认配置
 CONF.register_group(default_group)
 CONF.register_opts(default_opts, default_group)
 # 注册redis配置
 CONF.register_group(redis_group)
 CONF.register_opts(redis_opts, redis_group)
-
+# 注册接口响应缓存配置
+CONF.register_group(response_cache_group)
+CONF.register_opts(response_cache_opts, response_cache_group)
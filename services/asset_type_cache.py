@@ -0,0 +1,148 @@
+# 资产类型树的进程内缓存 一次查询加载所有类型 按照版本号失效
+import threading
+import time
+
+from oslo_log import log
+
+from db.models.asset.sql import AssetSQL
+from services.redis_connection import redis_connection
+from utils.constant import ASSET_TYPE_VERSION_REDIS_KEY, ASSET_TYPE_CACHE_CHECK_SECONDS
+
+LOG = log.getLogger(__name__)
+
+
+# 资产类型树 id到节点、名称到id以及父id到子节点列表的索引
+class AssetTypeTree:
+
+    def __init__(self, asset_type_list, version):
+        # 加载时的版本以及最近一次检查版本的时间
+        self.version = version
+        self.checked_time = time.time()
+        # 所有类型 保持数据库中的序号顺序
+        self.asset_type_list = asset_type_list
+        # id到节点
+        self.type_dict = {asset_type.id: asset_type for asset_type in asset_type_list}
+        # 名称到id 名称重复时取第一个 与数据库first()一致
+        self.name_dict = {}
+        # 父id到子节点列表
+        self.children_dict = {}
+        for asset_type in asset_type_list:
+            self.name_dict.setdefault(asset_type.asset_type_name, asset_type.id)
+            self.children_dict.setdefault(asset_type.parent_id, []).append(asset_type)
+
+    # 根据id查询类型
+    def get_by_id(self, asset_type_id):
+        return self.type_dict.get(asset_type_id)
+
+    # 根据名称查询类型
+    def get_by_name(self, asset_type_name):
+        asset_type_id = self.name_dict.get(asset_type_name)
+        return self.type_dict.get(asset_type_id) if asset_type_id is not None else None
+
+    # 查询所有子孙类型 先返回直接子类型再依次返回每个子类型的子孙类型
+    def list_children(self, asset_type_id, visited=None):
+        # 已经访问过的节点 避免数据成环时无限递归
+        visited = visited if visited is not None else {asset_type_id}
+        children = [child for child in self.children_dict.get(asset_type_id, []) if child.id not in visited]
+        visited.update(child.id for child in children)
+        res = list(children)
+        for child in children:
+            res.extend(self.list_children(child.id, visited))
+        return res
+
+    # 查询所有祖先类型 从直接父类型到根类型
+    def list_ancestors(self, asset_type_id):
+        res = []
+        visited = {asset_type_id}
+        asset_type = self.type_dict.get(asset_type_id)
+        while asset_type is not None and asset_type.parent_id in self.type_dict and asset_type.parent_id not in visited:
+            visited.add(asset_type.parent_id)
+            asset_type = self.type_dict[asset_type.parent_id]
+            res.append(asset_type)
+        return res
+
+    # 按照条件过滤类型 名称是包含匹配且不区分大小写 与数据库like查询一致
+    def filter(self, asset_type_id=None, parent_id=None, asset_type_name=None, asset_type_name_zh=None):
+        res = self.children_dict.get(parent_id, []) if parent_id is not None else self.asset_type_list
+        if asset_type_id is not None:
+            res = [asset_type for asset_type in res if asset_type.id == asset_type_id]
+        if asset_type_name is not None:
+            res = [asset_type for asset_type in res if asset_type.asset_type_name and asset_type_name.casefold() in asset_type.asset_type_name.casefold()]
+        if asset_type_name_zh is not None:
+            res = [asset_type for asset_type in res if asset_type.asset_type_name_zh and asset_type_name_zh.casefold() in asset_type.asset_type_name_zh.casefold()]
+        return list(res)
+
+
+# 资产类型缓存 每个进程一份 类型变化时更新redis中的版本 其他进程定期检查版本后重新加载
+class AssetTypeCache:
+
+    def __init__(self):
+        # 当前的类型树 None表示缓存是冷的
+        self.tree = None
+        # 加载锁 避免并发时重复加载
+        self.lock = threading.Lock()
+
+    # 获取类型树 load为False时缓存是冷的直接返回None check_version为True时立即检查版本 保证与redis中的版本一致
+    def get_tree(self, load=True, check_version=False):
+        tree = self.tree
+        # 定期检查版本 版本变化或者无法读取版本时丢弃缓存
+        if tree is not None and (check_version or time.time() - tree.checked_time >= ASSET_TYPE_CACHE_CHECK_SECONDS):
+            version = self.get_version()
+            if version is None or version != tree.version:
+                self.tree = tree = None
+            else:
+                tree.checked_time = time.time()
+        # 缓存可用或者不需要加载
+        if tree is not None or not load:
+            return tree
+        # 加载
+        with self.lock:
+            if self.tree is None:
+                # 先读版本再查数据 加载期间的修改会在下次检查时重新加载
+                version = self.get_version()
+                self.tree = AssetTypeTree(AssetSQL.list_asset_type(None, None, None, None), version)
+            return self.tree
+
+    # 类型变化后调用 清空当前进程的缓存并更新版本
+    def invalidate(self):
+        self.tree = None
+        try:
+            redis_connection.redis_connection.incr(ASSET_TYPE_VERSION_REDIS_KEY)
+        except Exception as e:
+            LOG.error(f"更新资产类型缓存版本失败: {e}")
+
+    # 查询版本 查询失败返回None
+    def get_version(self):
+        try:
+            version = redis_connection.redis_connection.get(ASSET_TYPE_VERSION_REDIS_KEY)
+            return int(version) if version else 0
+        except Exception as e:
+            LOG.error(f"查询资产类型缓存版本失败: {e}")
+            return None
+
+    # 根据id查询类型
+    def get_asset_type_by_id(self, asset_type_id):
+        return self.get_tree().get_by_id(asset_type_id)
+
+    # 根据名称查询类型
+    def get_asset_type_by_name(self, asset_type_name):
+        return self.get_tree().get_by_name(asset_type_name)
+
+    # 按照条件查询类型列表 check_version为True时先检查版本 不使用过期的缓存
+    def list_asset_type(self, asset_type_id=None, parent_id=None, asset_type_name=None, asset_type_name_zh=None, check_version=False):
+        return self.get_tree(check_version=check_version).filter(asset_type_id, parent_id, asset_type_name, asset_type_name_zh)
+
+    # 查询所有子孙类型 缓存是冷的时候使用数据库递归查询
+    def list_child_asset_types(self, asset_type_id):
+        tree = self.get_tree(load=False)
+        if tree is None:
+            return AssetSQL.list_child_asset_type(asset_type_id)
+        return tree.list_children(asset_type_id)
+
+    # 查询所有祖先类型
+    def list_ancestor_asset_types(self, asset_type_id):
+        return self.get_tree().list_ancestors(asset_type_id)
+
+
+# 声明资产类型缓存
+asset_type_cache = AssetTypeCache()
@@ -1,15 +1,10 @@
 # 资产的service层
 import json
-import os
-import shutil
 import uuid
 from io import BytesIO
 
-import pandas as pd
 from datetime import datetime
 
-from openpyxl.reader.excel import load_workbook
-from openpyxl.styles import Border, Side
 from typing_extensions import assert_type
 
 from api.model.assets import AssetCreateApiModel, AssetFlowApiModel
@@ -21,28 +16,26 @@ from db.models.asset.sql import AssetSQL
 from math import ceil
 from oslo_log import log
 
+from services.asset_type_cache import asset_type_cache
+from services.manufacture_cache import manufacture_cache
+from services.response_cache import response_cache
+from services.assets_export import AssetsExportService
 from services.custom_exception import Fail
 from services.system import SystemService
-from utils.common import format_excel_str
-from utils.constant import ASSET_SERVER_TEMPLATE_FILE_DIR, asset_equipment_columns, asset_basic_info_columns, \
+from utils.common import format_excel_str, encode_page_cursor, decode_page_cursor, flatten_export_dict, \
+    format_csv_rows, format_ndjson_rows
+from utils.constant import ASSET_EXPORT_CHUNK_SIZE, asset_equipment_columns, asset_basic_info_columns, \
     asset_manufacture_info_columns, asset_position_info_columns, asset_contract_info_columns, asset_belong_info_columns, \
-    asset_customer_info_columns, asset_part_info_columns, asset_network_basic_info_columns, \
+    asset_customer_info_columns, asset_network_basic_info_columns, \
     asset_network_manufacture_info_columns, asset_network_position_info_columns, asset_network_basic_info_extra_columns, \
-    ASSET_NETWORK_TEMPLATE_FILE_DIR, ASSET_NETWORK_FLOW_TEMPLATE_FILE_DIR, asset_network_flow_info_columns, \
+    asset_network_flow_info_columns, \
     asset_basic_info_extra_columns
 from utils.datetime import change_excel_date_to_timestamp
 
 LOG = log.getLogger(__name__)
 
-# 定义边框样式
-thin_border = Border(
-    left=Side(border_style="thin", color="000000"),  # 左边框
-    right=Side(border_style="thin", color="000000"),  # 右边框
-    top=Side(border_style="thin", color="000000"),  # 上边框
-    bottom=Side(border_style="thin", color="000000")  # 下边框
-)
-
 system_service = SystemService()
+assets_export_service = AssetsExportService()
 
 class AssetsService:
 
@@ -52,78 +45,14 @@ class AssetsService:
         try:
             # 按照条件从数据库中查询数据
             count, data = AssetSQL.list_asset(query_params, page, page_size, sort_keys, sort_dirs)
+            # 一次查询当前页所有资产的配件信息
+            asset_parts_dict = self.list_assets_parts_by_asset_ids([r.id for r in data])
             # 数据处理
             ret = []
             # 遍历
             for r in data:
-                # 填充数据
-                temp = {}
-                temp["asset_id"] = r.id
-                temp["asset_type_id"] = r.asset_type_id
-                temp["asset_category"] = r.asset_category
-                temp["asset_type"] = r.asset_type
-                temp["asset_type_name_zh"] = r.asset_type_name_zh
-                temp["asset_name"] = r.name
-                temp["equipment_number"] = r.equipment_number
-                temp["sn_number"] = r.sn_number
-                temp["asset_number"] = r.asset_number
-                temp["asset_status"] = r.asset_status
-                temp["asset_status_description"] = r.asset_status_description
-                temp["asset_description"] = r.description
-                temp["extra"] = r.extra
-                temp["extend_column_extra"] = r.extend_column_extra
-                # 厂商信息
-                temp_manufacture = {}
-                temp_manufacture["id"] = r.manufacture_id
-                temp_manufacture["name"] = r.manufacture_name
-                temp_manufacture["description"] = r.manufacture_description
-                temp_manufacture["extra"] = r.manufacture_extra
-                temp["asset_manufacturer"] = temp_manufacture
-                # 位置信息
-                temp_position = {}
-                temp_position["id"] = r.position_id
-                temp_position["frame_position"] = r.position_frame_position
-                temp_position["cabinet_position"] = r.position_cabinet_position
-                temp_position["u_position"] = r.position_u_position
-                temp_position["description"] = r.position_description
-                temp["asset_position"] = temp_position
-                # 合同信息
-                temp_contract = {}
-                temp_contract["id"] = r.contract_id
-                temp_contract["contract_number"] = r.contract_number
-                temp_contract["purchase_date"] = None if r.contract_purchase_date is None else r.contract_purchase_date.timestamp() * 1000
-                temp_contract["batch_number"] = r.contract_batch_number
-                temp_contract["description"] = r.contract_description
-                temp["asset_contract"] = temp_contract
-                # 归属信息
-                temp_belong = {}
-                temp_belong["id"] = r.belong_id
-                temp_belong["department_id"] = r.belong_department_id
-                temp_belong["department_name"] = r.belong_department_name
-                temp_belong["user_id"] = r.belong_user_id
-                temp_belong["user_name"] = r.belong_user_name
-                temp_belong["tel_number"] = r.belong_tel_number
-                temp_belong["description"] = r.belong_contract_description
-                temp["asset_belong"] = temp_belong
-                # 租户信息
-                temp_cutomer = {}
-                temp_cutomer["id"] = r.customer_id
-                temp_cutomer["customer_id"] = r.customer_customer_id
-                temp_cutomer["customer_name"] = r.customer_customer_name
-                temp_cutomer["rental_duration"] = r.customer_rental_duration
-                temp_cutomer["start_date"] = None if r.customer_start_date is None else r.customer_start_date.timestamp() * 1000
-                temp_cutomer["end_date"] = None if r.customer_end_date is None else r.customer_end_date.timestamp() * 1000
-                temp_cutomer["vlan_id"] = r.customer_vlan_id
-                temp_cutomer["float_ip"] = r.customer_float_ip
-                temp_cutomer["band_width"] = r.customer_band_width
-                temp_cutomer["description"] = r.customer_description
-                temp["asset_customer"] = temp_cutomer
-                # 配件信息
-                temp["asset_part"] = self.list_assets_parts(r.id)
-                # 流量信息 列表上不需要
-                # temp["asset_flow"] = self.list_assets_flows(r.id)
-                # 加入列表
-                ret.append(temp)
+                # 填充数据后加入列表
+                ret.append(self.convert_asset_info_dict(r, asset_parts_dict))
 
             # 返回数据
             res = {}
@@ -140,6 +69,156 @@ class AssetsService:
             traceback.print_exc()
             return None
 
+    # 游标分页查询资产列表 不使用OFFSET 默认不查询总数
+    def list_assets_by_cursor(self, query_params, cursor, page_size, sort_keys, sort_dirs, with_total=False):
+        # 每页数量校验 游标分页不支持查询全部
+        if page_size is None or int(page_size) <= 0:
+            raise Fail("page size invalid", error_message="游标分页的页数量大小必须大于0")
+        # 解析游标 空游标表示第一页
+        cursor_value, cursor_id = None, None
+        if cursor:
+            cursor_data = decode_page_cursor(cursor)
+            # 游标与排序条件不一致时无法定位
+            if cursor_data is None or cursor_data.get("sort_keys") != sort_keys or cursor_data.get("sort_dirs") != sort_dirs:
+                raise Fail("cursor invalid", error_message="分页游标不合法或与排序条件不一致")
+            cursor_value, cursor_id = cursor_data.get("value"), cursor_data.get("id")
+        # 业务逻辑
+        try:
+            # 按照游标从数据库中查询数据 多查询一条判断是否存在下一页
+            count, data = AssetSQL.list_asset_by_cursor(query_params, cursor_value, cursor_id, page_size, sort_keys, sort_dirs, with_total)
+            has_next = len(data) > int(page_size)
+            data = data[:int(page_size)]
+            # 一次查询当前页所有资产的配件信息
+            asset_parts_dict = self.list_assets_parts_by_asset_ids([r.id for r in data])
+            # 数据处理
+            ret = [self.convert_asset_info_dict(r, asset_parts_dict) for r in data]
+            # 下一页游标 按照最后一条数据的排序字段和id生成
+            next_cursor = None
+            if has_next and data:
+                last = data[-1]
+                next_cursor = encode_page_cursor({"sort_keys": sort_keys, "sort_dirs": sort_dirs, "value": last.cursor_sort_value, "id": last.id})
+            # 返回数据
+            res = {}
+            res['pageSize'] = page_size
+            res['next_cursor'] = next_cursor
+            # 总数 只有with_total时才返回
+            if with_total:
+                res['total'] = count
+            res['data'] = ret
+            return res
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return None
+
+    # 流式导出资产列表 export_format是csv或者ndjson 数据从数据库游标分批读取
+    def export_assets_stream(self, query_params, export_format):
+        # 每批数据转换成返回的dict
+        def asset_chunks():
+            for chunk in AssetSQL.stream_asset(query_params, ASSET_EXPORT_CHUNK_SIZE):
+                # 一次查询当前批次所有资产的配件信息
+                asset_parts_dict = self.list_assets_parts_by_asset_ids([r.id for r in chunk])
+                yield [self.convert_asset_info_dict(r, asset_parts_dict) for r in chunk]
+        # 返回
+        return self.format_export_stream(asset_chunks(), export_format)
+
+    # 流式导出配件列表
+    def export_asset_parts_stream(self, query_params, export_format):
+        chunks = ([self.convert_asset_part_page_dict(r) for r in chunk]
+                  for chunk in AssetSQL.stream_asset_part(query_params, ASSET_EXPORT_CHUNK_SIZE))
+        return self.format_export_stream(chunks, export_format)
+
+    # 流式导出网络设备流列表
+    def export_asset_flows_stream(self, asset_id, ids, export_format):
+        chunks = ([self.convert_asset_flow_dict(r) for r in chunk]
+                  for chunk in AssetSQL.stream_asset_flow(asset_id, ids, ASSET_EXPORT_CHUNK_SIZE))
+        return self.format_export_stream(chunks, export_format)
+
+    # 每批数据转换成一段csv或者ndjson文本 csv的列头取第一行数据的字段
+    def format_export_stream(self, chunks, export_format):
+        columns = None
+        for rows in chunks:
+            # ndjson每行一个json对象
+            if export_format == "ndjson":
+                yield format_ndjson_rows(rows)
+                continue
+            # csv嵌套的字段展开
+            rows = [flatten_export_dict(row) for row in rows]
+            write_header = columns is None
+            if write_header:
+                columns = list(rows[0].keys())
+            yield format_csv_rows(rows, columns, write_header)
+
+    # 资产列表查询结果的一行数据转换成返回的dict
+    def convert_asset_info_dict(self, r, asset_parts_dict):
+        temp = {}
+        temp["asset_id"] = r.id
+        temp["asset_type_id"] = r.asset_type_id
+        temp["asset_category"] = r.asset_category
+        temp["asset_type"] = r.asset_type
+        temp["asset_type_name_zh"] = r.asset_type_name_zh
+        temp["asset_name"] = r.name
+        temp["equipment_number"] = r.equipment_number
+        temp["sn_number"] = r.sn_number
+        temp["asset_number"] = r.asset_number
+        temp["asset_status"] = r.asset_status
+        temp["asset_status_description"] = r.asset_status_description
+        temp["asset_description"] = r.description
+        temp["extra"] = r.extra
+        temp["extend_column_extra"] = r.extend_column_extra
+        # 厂商信息
+        temp_manufacture = {}
+        temp_manufacture["id"] = r.manufacture_id
+        temp_manufacture["name"] = r.manufacture_name
+        temp_manufacture["description"] = r.manufacture_description
+        temp_manufacture["extra"] = r.manufacture_extra
+        temp["asset_manufacturer"] = temp_manufacture
+        # 位置信息
+        temp_position = {}
+        temp_position["id"] = r.position_id
+        temp_position["frame_position"] = r.position_frame_position
+        temp_position["cabinet_position"] = r.position_cabinet_position
+        temp_position["u_position"] = r.position_u_position
+        temp_position["description"] = r.position_description
+        temp["asset_position"] = temp_position
+        # 合同信息
+        temp_contract = {}
+        temp_contract["id"] = r.contract_id
+        temp_contract["contract_number"] = r.contract_number
+        temp_contract["purchase_date"] = None if r.contract_purchase_date is None else r.contract_purchase_date.timestamp() * 1000
+        temp_contract["batch_number"] = r.contract_batch_number
+        temp_contract["description"] = r.contract_description
+        temp["asset_contract"] = temp_contract
+        # 归属信息
+        temp_belong = {}
+        temp_belong["id"] = r.belong_id
+        temp_belong["department_id"] = r.belong_department_id
+        temp_belong["department_name"] = r.belong_department_name
+        temp_belong["user_id"] = r.belong_user_id
+        temp_belong["user_name"] = r.belong_user_name
+        temp_belong["tel_number"] = r.belong_tel_number
+        temp_belong["description"] = r.belong_contract_description
+        temp["asset_belong"] = temp_belong
+        # 租户信息
+        temp_cutomer = {}
+        temp_cutomer["id"] = r.customer_id
+        temp_cutomer["customer_id"] = r.customer_customer_id
+        temp_cutomer["customer_name"] = r.customer_customer_name
+        temp_cutomer["rental_duration"] = r.customer_rental_duration
+        temp_cutomer["start_date"] = None if r.customer_start_date is None else r.customer_start_date.timestamp() * 1000
+        temp_cutomer["end_date"] = None if r.customer_end_date is None else r.customer_end_date.timestamp() * 1000
+        temp_cutomer["vlan_id"] = r.customer_vlan_id
+        temp_cutomer["float_ip"] = r.customer_float_ip
+        temp_cutomer["band_width"] = r.customer_band_width
+        temp_cutomer["description"] = r.customer_description
+        temp["asset_customer"] = temp_cutomer
+        # 配件信息
+        temp["asset_part"] = asset_parts_dict.get(r.id, [])
+        # 流量信息 列表上不需要
+        # temp["asset_flow"] = self.list_assets_flows(r.id)
+        # 返回
+        return temp
+
 
 
 # 返回对应数据
@@ -185,7 +264,7 @@ class AssetsService:
                 LOG.error("asset name or number exist")
                 raise Fail("asset exists", error_message="资产名称或编号重复")
             # 3. 查询资产类型
-            asset_type_list = AssetSQL.list_asset_type(asset.asset_type_id, None, None, None)
+            asset_type_list = asset_type_cache.list_asset_type(asset.asset_type_id)
             if not asset_type_list:
                 LOG.error("asset type not exist")
                 raise Fail("asset type not exists", error_message="资产类型不存在")
@@ -199,16 +278,10 @@ class AssetsService:
             # 资产的id重新生成覆盖
             asset.asset_id = asset_basic_info_db.id
             asset_id = asset_basic_info_db.id
-            # 2、资产厂商信息 资产关联的厂商可能已经存在也可能不存在
-            asset_manufacture_info_db = None
-            asset_manufacture_info_db_new = None
-            if asset.asset_manufacturer:
-                asset_manufacture_info_db = self.check_manufacturer_exists(asset)
-            # 数据库不存在当前厂商
-            if not asset_manufacture_info_db:
-                asset_manufacture_info_db_new = self.convert_asset_manufacturer_info_db(asset)
+            # 2、资产厂商信息 资产关联的厂商可能已经存在也可能不存在 不存在时与资产一起创建
+            asset_manufacture_info_db, new_manufacture_info_db = self.check_manufacturer_exists(asset)
             # 建立资产与厂商关联关系对象
-            asset_manufacture_relation_info_db = self.convert_manufacturer_relation_info_db(asset, asset_manufacture_info_db, asset_manufacture_info_db_new)
+            asset_manufacture_relation_info_db = self.convert_manufacturer_relation_info_db(asset, asset_manufacture_info_db or new_manufacture_info_db)
             # 3、资产位置信息
             asset_position_info_db = self.convert_asset_position_info_db(asset)
             # 4、资产合同信息
@@ -222,7 +295,11 @@ class AssetsService:
             # 8、资产流量信息
             asset_flow_info_db = None # self.convert_asset_flow_info_db_from_asset(asset)
             # 保存对象
-            AssetSQL.create_asset(asset_basic_info_db, asset_manufacture_info_db_new, asset_manufacture_relation_info_db, asset_position_info_db, asset_contract_info_db, asset_belong_info_db, asset_customer_info_db, asset_part_info_db, asset_flow_info_db)
+            self.save_asset_with_manufacturer(
+                lambda manufacture_info_db: AssetSQL.create_asset(asset_basic_info_db, manufacture_info_db, asset_manufacture_relation_info_db, asset_position_info_db, asset_contract_info_db, asset_belong_info_db, asset_customer_info_db, asset_part_info_db, asset_flow_info_db),
+                new_manufacture_info_db, asset_manufacture_relation_info_db)
+            # 资产数据变化 更新库存版本
+            assets_export_service.bump_inventory_version()
         except Fail as e:
             raise e
         except Exception as e:
@@ -233,18 +310,47 @@ class AssetsService:
         return asset_id
 
 
+    # 查询资产关联的厂商 先从缓存中查询 返回已存在的厂商以及需要新建的厂商对象 新建的厂商由保存资产时一起写入
     def check_manufacturer_exists(self, asset):
         # 默认空
         asset_manufacture_info_db = None
+        new_manufacture_info_db = None
         # 首先根据条件查询
         if asset.asset_manufacturer:
             # 先根据id查询
             if asset.asset_manufacturer.id:
-                return AssetSQL.get_manufacture_by_id(asset.asset_manufacturer.id)
-            if asset.asset_manufacturer.name:
-                return AssetSQL.get_manufacture_by_name(asset.asset_manufacturer.name)
+                asset_manufacture_info_db = manufacture_cache.get_manufacture_by_id(asset.asset_manufacturer.id)
+            # 再根据名称查询 不存在时只生成对象不写入
+            if asset_manufacture_info_db is None and asset.asset_manufacturer.name:
+                asset_manufacture_info_db = manufacture_cache.get_manufacture_by_name(asset.asset_manufacturer.name)
+                if asset_manufacture_info_db is None:
+                    new_manufacture_info_db = AssetManufacturesInfo(
+                        id=uuid.uuid4().hex,
+                        asset_id=asset.asset_id,
+                        name=asset.asset_manufacturer.name,
+                        create_date=datetime.fromtimestamp(datetime.now().timestamp()),
+                        description=asset.asset_manufacturer.description,
+                        extra=None
+                    )
         # 返回
-        return asset_manufacture_info_db
+        return asset_manufacture_info_db, new_manufacture_info_db
+
+    # 保存资产 有新建的厂商时加锁后按名称再查一次 其他请求已经创建时直接关联 否则与资产在同一个事务中创建
+    # 资产保存失败时厂商也不会写入
+    def save_asset_with_manufacturer(self, save_asset, new_manufacture_info_db, manufacture_relation_info_db):
+        # 没有新建的厂商
+        if new_manufacture_info_db is None:
+            save_asset(None)
+            return
+        with manufacture_cache.upsert_locked():
+            manufacture_db = AssetSQL.get_manufacture_by_name(new_manufacture_info_db.name)
+            if manufacture_db is not None:
+                manufacture_relation_info_db.manufacture_id = manufacture_db.id
+                save_asset(None)
+                return
+            save_asset(new_manufacture_info_db)
+        # 有新建的厂商 缓存失效
+        manufacture_cache.invalidate()
 
 
     # 资产创建时基础对象数据转换
@@ -269,24 +375,8 @@ class AssetsService:
         return asset_basic_info_db
 
 
-    # 资产创建时厂商对象数据转换
-    def convert_asset_manufacturer_info_db(self, asset):
-        # 判空
-        if asset.asset_manufacturer is None:
-            return None
-        # 数据转化为db对象
-        asset_manufacturer_info_db = AssetManufacturesInfo(
-            id=uuid.uuid4().hex,
-            asset_id=asset.asset_id,
-            name=asset.asset_manufacturer.name,
-            description=asset.asset_manufacturer.description,
-        )
-        # 返回数据
-        return asset_manufacturer_info_db
-
-
     # 创建资产与厂商关联关系
-    def convert_manufacturer_relation_info_db(self, asset, manufacturer_info_db, manufacturer_info_db_new):
+    def convert_manufacturer_relation_info_db(self, asset, manufacturer_info_db):
         # 判空
         if asset.asset_manufacturer is None:
             return None
@@ -299,9 +389,6 @@ class AssetsService:
         # 数据库中的厂商
         if manufacturer_info_db:
             manufacturer_relation_info_db.manufacture_id = manufacturer_info_db.id
-        # 新建的厂商
-        if manufacturer_info_db_new:
-            manufacturer_relation_info_db.manufacture_id = manufacturer_info_db_new.id
         # 返回数据
         return manufacturer_relation_info_db
 
@@ -464,50 +551,76 @@ class AssetsService:
             return None
         # 详情
         try:
-            for asset_temp in asset_list:
+            # 1、一次查询所有资产的基础信息
+            asset_basic_info_dict = {r.id: r for r in AssetSQL.list_asset_basic_info_by_ids(
+                [asset_temp.asset_id for asset_temp in asset_list if asset_temp is not None and asset_temp.asset_id])}
+            # 2、整批校验 任何一个资产不合法时都不更新
+            error_dict = {}
+            asset_ids = set()
+            for index, asset_temp in enumerate(asset_list):
                 # 判断对象是空
                 if asset_temp is None:
-                    pass
+                    error_dict[f"index_{index}"] = "资产对象是空"
                 # 资产id空或者资产状态空
-                if not asset_temp.asset_id or not asset_temp.asset_status:
-                    pass
+                elif not asset_temp.asset_id or not asset_temp.asset_status:
+                    error_dict[asset_temp.asset_id or f"index_{index}"] = "资产id或者资产状态是空"
+                # 同一个资产重复出现
+                elif asset_temp.asset_id in asset_ids:
+                    error_dict[asset_temp.asset_id] = "资产id重复"
                 # 资产状态如果是错误的时候 描述信息不能为空
-                if asset_temp.asset_status == "3" and not asset_temp.asset_status_description:
-                    pass
-                # 查询数据
-                asset_basic_info_db = AssetSQL.get_asset_basic_info_by_id(asset_temp.asset_id)
+                elif asset_temp.asset_status == "3" and not asset_temp.asset_status_description:
+                    error_dict[asset_temp.asset_id] = "故障状态的描述信息是空"
                 # 不存在
-                if not asset_basic_info_db:
-                    pass
+                elif asset_temp.asset_id not in asset_basic_info_dict:
+                    error_dict[asset_temp.asset_id] = "id不存在"
+                else:
+                    asset_ids.add(asset_temp.asset_id)
+            if error_dict:
+                raise Fail("asset status update check failed", params=error_dict,
+                           error_message="资产状态更新失败: " + "; ".join(f"{key}:{value}" for key, value in error_dict.items()))
+            # 3、分配状态的资产一次查询已存在的租户信息
+            asset_customer_dict = {}
+            for asset_customer_info_db in AssetSQL.list_customer_by_asset_ids(
+                    [asset_temp.asset_id for asset_temp in asset_list if asset_temp.asset_status == "2" and asset_temp.asset_customer]):
+                asset_customer_dict.setdefault(asset_customer_info_db.asset_id, asset_customer_info_db)
+            # 4、组装批量更新的数据
+            basic_info_mappings = []
+            customer_update_mappings = []
+            customer_insert_mappings = []
+            result = {}
+            for asset_temp in asset_list:
                 # 设置更新的字段
-                asset_basic_info_db.asset_status = asset_temp.asset_status
+                basic_info_mapping = {"id": asset_temp.asset_id, "asset_status": asset_temp.asset_status}
                 # 故障状态单
                 if asset_temp.asset_status == "3":
-                    if asset_temp.asset_status_description:
-                        asset_basic_info_db.asset_status_description = json.dumps(asset_temp.asset_status_description)
-                # 分配状态单
-                asset_customer_info_db = None
-                if asset_temp.asset_status == "2":
-                    # 创建资产设备的归属西悉尼
-                    if asset_temp.asset_customer:
-                        # 根据资产id查询
-                        asset_customer_info_db = AssetSQL.get_customer_by_asset_id(asset_temp.asset_id)
-                        if asset_customer_info_db:
-                            asset_customer_info_db = self.reset_asset_customer_info_db(asset_customer_info_db, asset_temp)
-                        else:
-                            asset_customer_info_db = self.convert_asset_customer_info_db(asset_temp)
-                # 更新数据
-                # 基础状态信息更新
-                AssetSQL.update_asset_basic_info(asset_basic_info_db)
-                # 分配状态信息更新
-                if asset_customer_info_db:
-                    AssetSQL.create_asset_customer(asset_customer_info_db)
+                    basic_info_mapping["asset_status_description"] = json.dumps(asset_temp.asset_status_description)
+                basic_info_mappings.append(basic_info_mapping)
+                # 分配状态单 创建资产设备的租户信息
+                if asset_temp.asset_status == "2" and asset_temp.asset_customer:
+                    asset_customer_info_db = asset_customer_dict.get(asset_temp.asset_id)
+                    if asset_customer_info_db:
+                        asset_customer_info_db = self.reset_asset_customer_info_db(asset_customer_info_db, asset_temp)
+                        customer_update_mappings.append(self.convert_db_mapping(asset_customer_info_db))
+                    else:
+                        customer_insert_mappings.append(self.convert_db_mapping(self.convert_asset_customer_info_db(asset_temp)))
+                # 每个资产更新后的状态
+                result[asset_temp.asset_id] = asset_temp.asset_status
+            # 5、一个事务中批量更新
+            AssetSQL.update_assets_status(basic_info_mappings, customer_update_mappings, customer_insert_mappings)
+            # 资产数据变化 更新库存版本
+            assets_export_service.bump_inventory_version()
+            # 成功返回每个资产更新后的状态
+            return result
+        except Fail as e:
+            raise e
         except Exception as e:
             import traceback
             traceback.print_exc()
             raise e
-        # 成功返回资产id
-        return None
+
+    # 数据库对象转换成批量写入使用的dict
+    def convert_db_mapping(self, db_object):
+        return {column.name: getattr(db_object, column.name) for column in db_object.__table__.columns}
 
 
     def delete_asset(self, asset_id):
@@ -518,6 +631,8 @@ class AssetsService:
         try:
             # 删除对象
             AssetSQL.delete_asset(asset_id)
+            # 资产数据变化 更新库存版本
+            assets_export_service.bump_inventory_version()
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -527,709 +642,53 @@ class AssetsService:
 
 
 
-    def import_asset(self, row):
-        # 存入一行
-        try:
-            # 初始化数据对象
-            asset = self.init_empty_asset_api_model()
-            asset.asset_type_id = "8fb707d8-b07e-11ef-90c8-44a842237864"
-            asset.asset_category = "SERVER"
-            # 从excel中加载基础信息数据
-            for basic_key, basic_column in asset_basic_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[basic_column]):
-                    asset.__setattr__(basic_key, row[basic_column])
-            # 重设资产设备分类类型
-            if asset.asset_type:
-                asset_type_db = AssetSQL.get_asset_type_by_name("SERVER_" + asset.asset_type)
-                if asset_type_db:
-                    asset.asset_type_id = asset_type_db.id
-            # 组装extra
-            extra = {}
-            for extra_key, extra_column in asset_basic_info_extra_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[extra_column]):
-                    extra[extra_key] = row[extra_column]
-            asset.extra = extra
-            # 从excel中加载厂商信息数据
-            for manufacture_key, manufacture_column in asset_manufacture_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[manufacture_column]):
-                    asset.asset_manufacturer.__setattr__(manufacture_key, row[manufacture_column])
-            # 从excel中加载位置信息数据
-            for position_key, position_column in asset_position_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[position_column]):
-                    asset.asset_position.__setattr__(position_key, row[position_column])
-            # 从excel中加载合同信息数据
-            for contract_key, contract_column in asset_contract_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row.get(contract_column, None)):
-                    row_value = row[contract_column]
-                    # 购买日期单独处理
-                    if "purchase_date" == contract_key:
-                        row_value = int(row_value.timestamp() * 1000)
-                    # 赋值
-                    asset.asset_contract.__setattr__(contract_key, row_value)
-            # 从excel中加载归属信息数据
-            for belong_key, belong_column in asset_belong_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[belong_column]):
-                    asset.asset_belong.__setattr__(belong_key, row[belong_column])
-            # 从excel中加载租户信息数据
-            for customer_key, customer_column in asset_customer_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row.get(customer_column, None)):
-                    asset.asset_customer.__setattr__(customer_key, row.get(customer_column, None))
-            # 调用创建
-            self.create_asset(asset)
-            # 记录操作日志
-            system_service.create_system_log(OperateLogApiModel(operate_type="create", resource_type="asset", resource_id=asset.asset_id, resource_name=asset.asset_name, operate_flag=True))
-            # 组装数据
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            raise e
-
-
-    def import_asset_part(self, row):
-        # 存入一行
-        try:
-            # 获取配件属于的资产编号
-            asset_number = None
-            if pd.notna(row["资产编号"]):
-                asset_number = row["资产编号"]
-            # 根据资产编号精准查询资产设备
-            asset_id = None
-            asset_name = ""
-            asset_basic_info_db = AssetSQL.get_asset_basic_info_by_asset_number(asset_number)
-            if asset_basic_info_db:
-                asset_id = asset_basic_info_db.id
-                asset_name = asset_basic_info_db.name
-            # 从excel中加载配件信息数据
-            for part_key, part_column in asset_part_info_columns.items():
-                # 每一列的数据都作为一个配件
-                # 初始化数据对象
-                asset_part = self.init_empty_asset_part_api_model()
-                # 判断excel的数据是非nan
-                if pd.notna(row[part_column]):
-                    asset_part.__setattr__("part_type", part_key)
-                    asset_part.__setattr__("asset_id", asset_id)
-                    asset_part.__setattr__("name", asset_name + "_" + part_key)
-                    asset_part.__setattr__("part_config", row[part_column])
-                # 入库
-                AssetSQL.create_asset_part(asset_part)
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            raise e
-
-
-    def import_asset_network(self, row):
-        # 存入一行
-        try:
-            # 初始化数据对象
-            asset = self.init_empty_asset_api_model()
-            asset.asset_type_id = "8fbc77f1-b07e-11ef-90c8-44a842237864"
-            asset.asset_category = "NETWORK"
-            # 从网络设备的excel中加载基础信息数据
-            for basic_key, basic_column in asset_network_basic_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[basic_column]):
-                    asset.__setattr__(basic_key, str(row[basic_column]))
-            # 重设资产设备分类类型
-            if asset.asset_type:
-                asset_type_db = AssetSQL.get_asset_type_by_name("NETWORK_" + asset.asset_type)
-                if asset_type_db:
-                    asset.asset_type_id = asset_type_db.id
-            # 从网络设备的excel中加载基础信息的扩展信息数据
-            extra = {}
-            for basic_extra_key, basic_extra_column in asset_network_basic_info_extra_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[basic_extra_column]):
-                    extra[basic_extra_key] = row[basic_extra_column]
-            if extra:
-                asset.extra = extra
-            # 从网络设备的excel中加载厂商信息数据
-            for manufacture_key, manufacture_column in asset_network_manufacture_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[manufacture_column]):
-                    asset.asset_manufacturer.__setattr__(manufacture_key, row[manufacture_column])
-            # 从网络设备的excel中加载位置信息数据
-            for position_key, position_column in asset_network_position_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[position_column]):
-                    asset.asset_position.__setattr__(position_key, row[position_column])
-            # 从网络设备的excel中加载合同信息数据
-            for contract_key, contract_column in asset_contract_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row.get(contract_column, None)):
-                    row_value = row[contract_column]
-                    # 购买日期单独处理
-                    if "purchase_date" == contract_key:
-                        row_value = int(row_value.timestamp() * 1000)
-                    # 赋值
-                    asset.asset_contract.__setattr__(contract_key, row_value)
-            self.create_asset(asset)
-            # 记录操作日志
-            system_service.create_system_log(OperateLogApiModel(operate_type="create", resource_type="asset", resource_id=asset.asset_id, resource_name=asset.asset_name, operate_flag=True))
-            # 组装数据
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            raise e
-
-
-    # 初始化一个空的资产数据的结构对象
-    def init_empty_asset_api_model(self):
-        # 初始化api的model对象
-        asset = AssetCreateApiModel(
-            # 资产通用信息
-            asset_id = uuid.uuid4().hex,
-            asset_name = "Default",
-            asset_type_id = "Default",
-            asset_description = None,
-            # 资产基础信息
-            equipment_number = None,
-            sn_number = None,
-            asset_number = None,
-            asset_status = "0",
-            extra = None,
-            # 配件信息
-            asset_part = None,
-            # 位置信息
-            asset_position = None,
-            # 厂商信息
-            asset_manufacturer = None,
-            # 合同信息
-            asset_contract = None,
-            # 所属用户信息
-            asset_belong = None,
-            # 租户信息
-            asset_customer = None,
-        )
-        # 厂商
-        asset_manufacturer = AssetManufacturesInfo(
-            id = uuid.uuid4().hex,
-            asset_id = asset.asset_id,
-            name = None,
-            description = None,
-            extra = None,
-        )
-        asset.asset_manufacturer = asset_manufacturer
-        # 位置
-        asset_position = AssetPositionsInfo(
-            id = uuid.uuid4().hex,
-            asset_id = asset.asset_id,
-            frame_position = None,
-            cabinet_position = None,
-            u_position = None,
-            description = None,
-        )
-        asset.asset_position = asset_position
-        # 合同
-        asset_contract = AssetContractsInfo(
-            id = uuid.uuid4().hex,
-            asset_id = asset.asset_id,
-            contract_number = None,
-            purchase_date = None,
-            batch_number = None,
-            description = None,
-        )
-        asset.asset_contract = asset_contract
-        # 归属信息
-        asset_belong = AssetBelongsInfo(
-            id = uuid.uuid4().hex,
-            asset_id = asset.asset_id,
-            department_id = None,
-            department_name = None,
-            user_id = None,
-            user_name = None,
-            tel_number = None,
-            description = None,
-        )
-        asset.asset_belong = asset_belong
-        # 租户信息
-        asset_customer = AssetCustomersInfo(
-            id = uuid.uuid4().hex,
-            asset_id = asset.asset_id,
-            customer_id = None,
-            customer_name = None,
-            rental_duration = None,
-            start_date = None,
-            end_date = None,
-            vlan_id = None,
-            float_ip = None,
-            band_width = None,
-            description = None,
-        )
-        asset.asset_customer = asset_customer
-        # 返回
-        return asset
-
-    # 初始化一个空的资产数据的结构对象
-    def init_empty_asset_part_api_model(self):
-        # 租户信息
-        asset_part = AssetPartsInfo(
-            id = uuid.uuid4().hex,
-            asset_id = None,
-            part_type = None,
-            part_brand = None,
-            part_config = None,
-            part_number = None,
-            personal_used_flag = None,
-            surplus = None,
-            name = None,
-            create_date = datetime.fromtimestamp(datetime.now().timestamp()),
-            description = None,
-            extra = None,
-        )
-        # 返回
-        return asset_part
-
-
-    def create_asset_excel(self, asset_type, asset_id, result_file_path):
-        # 判空
-        if not asset_type:
-            return None
-        # 模板路径
-        current_template_file = None
-        if asset_type == "SERVER":
-            current_template_file = os.getcwd() + ASSET_SERVER_TEMPLATE_FILE_DIR
-        elif asset_type == "NETWORK":
-            current_template_file = os.getcwd() + ASSET_NETWORK_TEMPLATE_FILE_DIR
-        elif asset_type == "NETWORK_FLOW":
-            current_template_file = os.getcwd() + ASSET_NETWORK_FLOW_TEMPLATE_FILE_DIR
-        else:
-            pass
-        # 对应类型的模板不存在
-        if current_template_file is None:
-            return None
-        # 生成不同资产类型的文件
-        try:
-            # 复制模板文件到临时目录
-            shutil.copy2(current_template_file, result_file_path)
-            # 服务器类型的文件
-            if asset_type == "SERVER":
-                self.create_asset_server_excel(result_file_path)
-            # 网络类型的文件
-            elif asset_type == "NETWORK":
-                self.create_asset_network_excel(result_file_path)
-            # 网络类型流入流出的文件
-            elif asset_type == "NETWORK_FLOW":
-                self.create_asset_network_flow_excel(result_file_path, asset_id, None)
-            else:
-                pass
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            raise e
-
-
-    def create_asset_server_excel(self, result_file_path):
-        try:
-            # 导出的excel数据
-            excel_asset_data = []
-            excel_part_data = []
-            excel_part_header = []
-            # 读取数据数据
-            page = 1
-            page_size = 100
-            # 查询一页
-            query_params = {}
-            query_params["asset_category"] = "SERVER"
-            res = self.list_assets(query_params, page, page_size, None, None)
-            while res and res['data']:
-                # 写入数据
-                for temp in res['data']:
-                    # df.loc[index,"设备名称"] = temp["asset_name"]
-                    # 下一行
-                    # index = index + 1
-                    extra_json = {}
-                    try:
-                        extra_json = json.loads(temp['extra'])
-                    except Exception as e:
-                        LOG.error(e)
-                    host_name = extra_json["host_name"] if extra_json is not None and "host_name" in extra_json else None
-                    ip = extra_json["ip"] if extra_json is not None and "ip" in extra_json else None
-                    idrac = extra_json["idrac"] if extra_json is not None and "idrac" in extra_json else None
-                    use_to = extra_json["use_to"] if extra_json is not None and "use_to" in extra_json else None
-                    operate_system = extra_json["operate_system"] if extra_json is not None and "operate_system" in extra_json else None
-                    # 修改或添加新数据
-                    temp_asset_data = {'机柜': temp['asset_position']['cabinet_position'],'U位': temp['asset_position']['u_position'],
-                                       '设备名称': temp['asset_name'],'设备型号': temp['equipment_number'],'资产编号': temp['asset_number'],'序列号': temp['sn_number'],
-                                       '部门': temp['asset_belong']['department_name'],'负责人': temp['asset_belong']['user_name'],'主机名': host_name,'IP': ip,
-                                       'IDRAC': idrac,'用途': use_to,'密码': None,'操作系统': operate_system,
-                                       '购买日期': temp['asset_contract']['purchase_date'],'厂商': temp['asset_manufacturer']['name'],'批次': temp['asset_contract']['batch_number'],'备注': temp['asset_description'],}
-                    # 配件数据
-                    if temp['asset_part']:
-                        temp_part_data = {'资产编号': temp['asset_number'],}
-                        # 遍历配件
-                        for temp_part in temp['asset_part']:
-                            # 表头存在
-                            if asset_part_info_columns.get(temp_part['part_type'], None):
-                                temp_part_data[asset_part_info_columns.get(temp_part['part_type'], None)] = temp_part['part_config']
-                            else:
-                                # 说明当前列头是自定义列头
-                                excel_part_header.append(temp_part['part_type'])
-                                temp_part_data[temp_part['part_type']] = temp_part['part_config']
-                        # 数据追加
-                        excel_part_data.append(temp_part_data)
-                    # 加入excel导出数据列表
-                    excel_asset_data.append(temp_asset_data)
-                # 判断总页数已经大于等于当前已经查询的页数，已经查询完成，退出循环
-                if res['totalPages'] >= page:
-                    break
-                # 查询下一页
-                page = page + 1
-                res = self.list_assets(query_params, page, page_size, None, None)
-            # 加载模板文件
-            book = load_workbook(result_file_path)
-            sheet = book['asset']  # 默认使用第一个工作表
-            # 确定起始写入行号
-            start_row = 2  # 自动追加到最后一行之后
-            # 写入数据到模板文件
-            for idx, row in pd.DataFrame(excel_asset_data).iterrows():
-                for col_idx, value in enumerate(row, start=1):  # 列从 1 开始
-                    sheet.cell(row=start_row + idx, column=col_idx, value=value)
-            # 保存修改
-            book.save(result_file_path)
-            # 配件sheet
-            part_sheet = book['part']
-            # 创建自定义列头
-            if excel_part_header:
-                # 自定义表头去重
-                excel_part_header = set(excel_part_header)
-                # 当前表头
-                current_headers = [cell.value for cell in part_sheet[1]]
-                current_headers_length = len(current_headers)
-                # 下表
-                header_index = 1
-                for temp_header in excel_part_header:
-                    part_sheet.cell(row=1, column=current_headers_length + header_index, value=temp_header)
-                    header_index = header_index + 1
-            start_row = 2  # 自动追加到最后一行之后
-            # 写入数据到模板文件
-            for idx, row in pd.DataFrame(excel_part_data).iterrows():
-                for col_idx, value in enumerate(part_sheet[1], start=1):  # 列从 1 开始
-                    part_sheet.cell(row=start_row + idx, column=col_idx, value=row.get(value.value, "")).border = thin_border
-                    # 保存修改
-            book.save(result_file_path)
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            raise e
-
-
-    def create_asset_network_excel(self, result_file_path):
-        try:
-            # 导出的excel数据
-            excel_asset_network_data = []
-            # 读取数据数据
-            page = 1
-            page_size = 100
-            # 查询一页
-            query_params = {}
-            query_params["asset_category"] = "NETWORK"
-            res = self.list_assets(query_params, page, page_size, None, None)
-            while res and res['data']:
-                # 写入数据
-                for temp in res['data']:
-                    # 定义扩展字段
-                    extra_json = {}
-                    try:
-                        extra_json = json.loads(temp['extra'])
-                    except Exception as e:
-                        LOG.error(e)
-                    # 修改或添加新数据
-                    temp_asset_data = {'机柜': temp['asset_position']['cabinet_position'],'U位': temp['asset_position']['u_position'],
-                                       '设备厂商': temp['asset_manufacturer']['name'],'设备类型': temp['asset_type'].replace("NETWORK_", "") if temp['asset_type'] else None,
-                                       '设备名称': temp['asset_name'],'设备型号': temp['equipment_number'],'资产编号': temp['asset_number'],
-                                       '主机名': extra_json.get("host_name"),'管理地址': extra_json.get("manage_address"),'带外网关': extra_json.get("external_gateway"),
-                                       'm-lag mac': extra_json.get("m_lagmac"),'网络设备角色': extra_json.get("network_equipment_role"),'序号': extra_json.get("serial_number"),
-                                       'loopback': extra_json.get("loopback"),'vlanifv4': extra_json.get("vlanifv4"),'预留': None,'BGP_AS': extra_json.get("bgp_as"),'用途': extra_json.get("use_to"),
-                                       '采购合同号': temp['asset_contract']['contract_number']}
-                    # 加入excel导出数据列表
-                    excel_asset_network_data.append(temp_asset_data)
-                # 判断总页数已经大于等于当前已经查询的页数，已经查询完成，退出循环
-                if res['totalPages'] >= page:
-                    break
-                # 查询下一页
-                page = page + 1
-                res = self.list_assets(query_params, page, page_size, None, None)
-            # 加载模板文件
-            book = load_workbook(result_file_path)
-            sheet = book.active  # 默认使用第一个工作表
-            # 确定起始写入行号
-            start_row = 2  # 自动追加到最后一行之后
-            # 写入数据到模板文件
-            for idx, row in pd.DataFrame(excel_asset_network_data).iterrows():
-                for col_idx, value in enumerate(sheet[1], start=1):  # 列从 1 开始
-                    sheet.cell(row=start_row + idx, column=col_idx, value=row.get(value.value, "")).border = thin_border
-            # 保存修改
-            book.save(result_file_path)
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            raise e
-
-
-    def create_asset_network_excel_4select(self, result_file_path, ids):
-        try:
-            # 导出的excel数据
-            excel_asset_network_data = []
-            # 读取数据数据
-            page = 1
-            page_size = 100
-            # 查询一页
-            query_params = {}
-            query_params["asset_ids"] = ids
-            query_params["asset_category"] = "NETWORK"
-            res = self.list_assets(query_params, page, page_size, None, None)
-            while res and res['data']:
-                # 写入数据
-                for temp in res['data']:
-                    # 定义扩展字段
-                    extra_json = {}
-                    try:
-                        extra_json = json.loads(temp['extra'])
-                    except Exception as e:
-                        LOG.error(e)
-                    # 修改或添加新数据
-                    temp_asset_data = {'机柜': temp['asset_position']['cabinet_position'],'U位': temp['asset_position']['u_position'],
-                                       '设备厂商': temp['asset_manufacturer']['name'],'设备类型': temp['asset_type'].replace("NETWORK_", "") if temp['asset_type'] else None,
-                                       '设备名称': temp['asset_name'],'设备型号': temp['equipment_number'],'资产编号': temp['asset_number'],
-                                       '主机名': extra_json.get("host_name"),'管理地址': extra_json.get("manage_address"),'带外网关': extra_json.get("external_gateway"),
-                                       'm-lag mac': extra_json.get("m_lagmac"),'网络设备角色': extra_json.get("network_equipment_role"),'序号': extra_json.get("serial_number"),
-                                       'loopback': extra_json.get("loopback"),'vlanifv4': extra_json.get("vlanifv4"),'预留': None,'BGP_AS': extra_json.get("bgp_as"),'用途': extra_json.get("use_to"),
-                                       '采购合同号': temp['asset_contract']['contract_number']}
-                    # 加入excel导出数据列表
-                    excel_asset_network_data.append(temp_asset_data)
-                # 判断总页数已经大于等于当前已经查询的页数，已经查询完成，退出循环
-                if res['totalPages'] >= page:
-                    break
-                # 查询下一页
-                page = page + 1
-                res = self.list_assets(query_params, page, page_size, None, None)
-            # 加载模板文件
-            book = load_workbook(result_file_path)
-            sheet = book.active  # 默认使用第一个工作表
-            # 确定起始写入行号
-            start_row = 2  # 自动追加到最后一行之后
-            # 写入数据到模板文件
-            for idx, row in pd.DataFrame(excel_asset_network_data).iterrows():
-                for col_idx, value in enumerate(sheet[1], start=1):  # 列从 1 开始
-                    sheet.cell(row=start_row + idx, column=col_idx, value=row.get(value.value, "")).border = thin_border
-            # 保存修改
-            book.save(result_file_path)
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            raise e
-
-
-    def create_asset_excel_4batch(self, item, result_file_path):
-        # 判空
-        if not item or not item.asset_type or not item.asset_ids:
-            return None
-        # 模板路径
-        current_template_file = None
-        if item.asset_type == "SERVER":
-            current_template_file = os.getcwd() + ASSET_SERVER_TEMPLATE_FILE_DIR
-        elif item.asset_type == "NETWORK":
-            current_template_file = os.getcwd() + ASSET_NETWORK_TEMPLATE_FILE_DIR
-        elif item.asset_type == "NETWORK_FLOW":
-            current_template_file = os.getcwd() + ASSET_NETWORK_FLOW_TEMPLATE_FILE_DIR
-        else:
-            pass
-        # 对应类型的模板不存在
-        if current_template_file is None:
-            return None
-        # 生成不同资产类型的文件
-        try:
-            # 复制模板文件到临时目录
-            shutil.copy2(current_template_file, result_file_path)
-            # 服务器类型的文件
-            if item.asset_type == "SERVER":
-                self.create_asset_excel_4select(result_file_path, item.asset_ids)
-            # 网络类型的文件
-            elif item.asset_type == "NETWORK":
-                self.create_asset_network_excel_4select(result_file_path, item.asset_ids)
-            # 网络类型流入流出的文件
-            elif item.asset_type == "NETWORK_FLOW":
-                self.create_asset_network_flow_excel(result_file_path, None, item.asset_ids)
-            else:
-                pass
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            raise e
-
-
-    def create_asset_excel_4select(self, result_file_path, ids):
-        # 模板路径
-        # template_file = os.getcwd() + ASSET_SERVER_TEMPLATE_FILE_DIR
-        # 复制模板文件到临时目录
-        # shutil.copy2(template_file, result_file_path)
-        # 导出的excel数据
-        excel_asset_data = []
-        excel_part_data = []
-        excel_part_header = []
-        # 读取数据数据
-        page = 1
-        page_size = 100
-        # 查询一页
-        query_params = {}
-        query_params["asset_ids"] = ids
-        query_params["asset_category"] = "SERVER"
-        res = self.list_assets(query_params, page, page_size, None, None)
-        while res and res['data']:
-            # 写入数据
-            for temp in res['data']:
-                # df.loc[index,"设备名称"] = temp["asset_name"]
-                # 下一行
-                # index = index + 1
-                extra_json = json.loads(temp['extra'])
-                host_name = extra_json["host_name"] if "host_name" in extra_json else None
-                ip = extra_json["ip"] if "ip" in extra_json else None
-                idrac = extra_json["idrac"] if "idrac" in extra_json else None
-                use_to = extra_json["use_to"] if "use_to" in extra_json else None
-                operate_system = extra_json["operate_system"] if "operate_system" in extra_json else None
-                # 修改或添加新数据
-                temp_asset_data = {'机柜': temp['asset_position']['cabinet_position'],'U位': temp['asset_position']['u_position'],
-                                   '设备名称': temp['asset_name'],'设备型号': temp['equipment_number'],'资产编号': temp['asset_number'],'序列号': temp['sn_number'],
-                                   '部门': temp['asset_belong']['department_name'],'负责人': temp['asset_belong']['user_name'],'主机名': host_name,'IP': ip,
-                                   'IDRAC': idrac,'用途': use_to,'密码': None,'操作系统': operate_system,
-                                   '购买日期': temp['asset_contract']['purchase_date'],'厂商': temp['asset_manufacturer']['name'],'批次': temp['asset_contract']['batch_number'],'备注': temp['asset_description'],}
-                # 配件数据
-                if temp['asset_part']:
-                    temp_part_data = {'资产编号': temp['asset_number'],}
-                    # 遍历配件
-                    for temp_part in temp['asset_part']:
-                        # 表头存在
-                        if asset_part_info_columns.get(temp_part['part_type'], None):
-                            temp_part_data[asset_part_info_columns.get(temp_part['part_type'], None)] = temp_part['part_config']
-                        else:
-                            # 说明当前列头是自定义列头
-                            excel_part_header.append(temp_part['part_type'])
-                            temp_part_data[temp_part['part_type']] = temp_part['part_config']
-                    # 数据追加
-                    excel_part_data.append(temp_part_data)
-                # 加入excel导出数据列表
-                excel_asset_data.append(temp_asset_data)
-            # 判断总页数已经大于等于当前已经查询的页数，已经查询完成，退出循环
-            if res['totalPages'] >= page:
-                break
-            # 查询下一页
-            page = page + 1
-            res = self.list_assets(query_params, page, page_size, None, None)
-        try:
-            # 加载模板文件
-            book = load_workbook(result_file_path)
-            sheet = book['asset']  # 默认使用第一个工作表
-            # 确定起始写入行号
-            start_row = 2  # 自动追加到最后一行之后
-            # 写入数据到模板文件
-            for idx, row in pd.DataFrame(excel_asset_data).iterrows():
-                for col_idx, value in enumerate(row, start=1):  # 列从 1 开始
-                    sheet.cell(row=start_row + idx, column=col_idx, value=value).border = thin_border
-            # 保存修改
-            # book.save(result_file_path)
-            # 配件sheet
-            part_sheet = book['part']
-            # 创建自定义列头
-            if excel_part_header:
-                # 自定义表头去重
-                excel_part_header = set(excel_part_header)
-                # 当前表头
-                current_headers = [cell.value for cell in part_sheet[1]]
-                current_headers_length = len(current_headers)
-                # 下表
-                header_index = 1
-                for temp_header in excel_part_header:
-                    part_sheet.cell(row=1, column=current_headers_length + header_index, value=temp_header)
-                    header_index = header_index + 1
-                # # 保存新建的表头
-                # book.save(result_file_path)
-                # # 重新读取
-                # book = load_workbook(result_file_path)
-                # part_sheet = book['part']
-                # 保存更新后的 Excel 文件到内存
-            start_row = 2  # 自动追加到最后一行之后
-            # 写入数据到模板文件
-            for idx, row in pd.DataFrame(excel_part_data).iterrows():
-                for col_idx, value in enumerate(part_sheet[1], start=1):  # 列从 1 开始
-                    part_sheet.cell(row=start_row + idx, column=col_idx, value=row.get(value.value, "")).border = thin_border
-                    # 保存修改
-            book.save(result_file_path)
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            raise e
-
     # 批量更新
     def update_asset_list(self, asset_batch):
         try:
             # 判空
             if not asset_batch or not asset_batch.asset_ids:
-                raise Fail("batch asset model ids is empty", "批量更新对象的id是空")
+                raise Fail("batch asset model ids is empty", error_message="批量更新对象的id是空")
             # id分割
             asset_ids = asset_batch.asset_ids.split(',')
             # 判空
             if not asset_ids:
-                raise Fail("batch asset model ids is empty", "批量更新对象的id是空")
-            # 遍历
-            for temp_asset_id in asset_ids:
-                # 基础信息
-                asset_basic_info_db = AssetSQL.get_asset_basic_info_by_id(temp_asset_id)
-                # 判空
-                if not asset_basic_info_db:
-                    raise Fail("asset id not exists", "id不存在")
-                # 已分配状态直接过滤
-                if asset_basic_info_db.asset_status == '2':
-                    continue
-                # 临时更新对象
-                temp_asset = AssetCreateApiModel(
-                    asset_name=asset_basic_info_db.name,
-                    asset_type_id=asset_basic_info_db.asset_type_id,
-                    asset_status=asset_basic_info_db.asset_status,
-                )
+                raise Fail("batch asset model ids is empty", error_message="批量更新对象的id是空")
+            # 一次查询所有资产的基础信息
+            asset_basic_info_dict = {r.id: r for r in AssetSQL.list_asset_basic_info_by_ids(asset_ids)}
+            # 判空
+            if any(temp_asset_id not in asset_basic_info_dict for temp_asset_id in asset_ids):
+                raise Fail("asset id not exists", error_message="id不存在")
+            # 已分配状态直接过滤
+            update_asset_ids = [temp_asset_id for temp_asset_id in dict.fromkeys(asset_ids)
+                                if asset_basic_info_dict[temp_asset_id].asset_status != '2']
+            if not update_asset_ids:
+                return asset_ids
+            # 基础信息按照更新内容分组 相同内容的资产一次更新
+            basic_info_groups = {}
+            for temp_asset_id in update_asset_ids:
+                asset_basic_info_db = asset_basic_info_dict[temp_asset_id]
                 # 设置更新参数
-                if asset_batch.asset_type_id:
-                    temp_asset.asset_type_id = asset_batch.asset_type_id
-                if asset_batch.asset_type:
-                    temp_asset.asset_type = asset_batch.asset_type
-                if asset_batch.description:
-                    temp_asset.asset_description = asset_batch.description
-                # 更新
-                self.update_asset(temp_asset_id, temp_asset)
-                # 归属信息
-                if asset_batch.department_name or asset_batch.user_name or asset_batch.tel_number:
-                    # 查库
-                    asset_belong_db = AssetSQL.get_belong_by_asset_id(temp_asset_id)
-                    # 非空
-                    if asset_belong_db:
-                        if asset_batch.department_name:
-                            asset_belong_db.department_name = asset_batch.department_name
-                        if asset_batch.user_name:
-                            asset_belong_db.user_name = asset_batch.user_name
-                        if asset_batch.tel_number:
-                            asset_belong_db.tel_number = asset_batch.tel_number
-                    else:
-                        asset_belong_db = AssetBelongsInfo(id=uuid.uuid4().hex,asset_id=temp_asset_id,department_name=asset_batch.department_name,user_name=asset_batch.user_name,tel_number=asset_batch.tel_number)
-                    # 更新
-                    AssetSQL.update_belong(asset_belong_db)
-                # 厂商关联信息
-                if asset_batch.manufacturer_id:
-                    # 查库
-                    manufacture_relation_db = AssetSQL.get_manufacture_relation_by_asset_id(temp_asset_id)
-                    # 非空
-                    if manufacture_relation_db:
-                        manufacture_relation_db.manufacture_id = asset_batch.manufacturer_id
-                    else:
-                        manufacture_relation_db = AssetManufactureRelationInfo(id=uuid.uuid4().hex,asset_id=temp_asset_id,manufacture_id=asset_batch.manufacturer_id)
-                    # 更新
-                    AssetSQL.update_manufacture_relation(manufacture_relation_db)
+                asset_type_id = asset_batch.asset_type_id or asset_basic_info_db.asset_type_id
+                asset_type = asset_batch.asset_type or asset_basic_info_db.asset_type
+                # 按照类型id重查类型名称
+                asset_type_db = asset_type_cache.get_asset_type_by_id(asset_type_id) if asset_type_id is not None else None
+                if asset_type_db is not None:
+                    asset_type = asset_type_db.asset_type_name
+                update_items = (("asset_type_id", asset_type_id), ("asset_type", asset_type),
+                                ("description", asset_batch.description or asset_basic_info_db.description))
+                basic_info_groups.setdefault(update_items, []).append(temp_asset_id)
+            # 归属信息
+            belong_values = {}
+            if asset_batch.department_name:
+                belong_values["department_name"] = asset_batch.department_name
+            if asset_batch.user_name:
+                belong_values["user_name"] = asset_batch.user_name
+            if asset_batch.tel_number:
+                belong_values["tel_number"] = asset_batch.tel_number
+            # 一个事务中更新基础信息、归属信息、厂商关联信息
+            AssetSQL.update_asset_list(basic_info_groups, belong_values, asset_batch.manufacturer_id, update_asset_ids)
+            # 资产数据变化 更新库存版本
+            assets_export_service.bump_inventory_version()
             # 成功返回id
             return asset_ids
         except Fail as e:
@@ -1254,20 +713,13 @@ class AssetsService:
         # 重新设置类型
         if asset_basic_info_db.asset_type_id is not None:
             # 根据类型id重查类型名称
-            asset_type = AssetSQL.get_asset_type_by_id(asset_basic_info_db.asset_type_id)
+            asset_type = asset_type_cache.get_asset_type_by_id(asset_basic_info_db.asset_type_id)
             if asset_type is not None:
                 asset_basic_info_db.asset_type = asset_type.asset_type_name
-        # 2、资产厂商信息 资产关联的厂商可能已经存在也可能不存在
-        asset_manufacture_info_db = None
-        asset_manufacture_info_db_new = None
-        asset_manufacture_relation_info_db = None
-        if asset.asset_manufacturer:
-            asset_manufacture_info_db = self.check_manufacturer_exists(asset)
-        # 数据库不存在当前厂商
-        if not asset_manufacture_info_db:
-            asset_manufacture_info_db_new = self.convert_asset_manufacturer_info_db(asset)
+        # 2、资产厂商信息 资产关联的厂商可能已经存在也可能不存在 不存在时与资产一起创建
+        asset_manufacture_info_db, new_manufacture_info_db = self.check_manufacturer_exists(asset)
         # 建立资产与厂商关联关系对象
-        asset_manufacture_relation_info_db = self.convert_manufacturer_relation_info_db(asset, asset_manufacture_info_db, asset_manufacture_info_db_new)
+        asset_manufacture_relation_info_db = self.convert_manufacturer_relation_info_db(asset, asset_manufacture_info_db or new_manufacture_info_db)
         # 3、资产位置信息
         asset_position_info_db = None
         if asset.asset_position:
@@ -1312,7 +764,11 @@ class AssetsService:
         if asset.asset_part:
             asset_part_info_db = self.convert_asset_part_info_db(asset)
         # 更新资产相关的数据
-        AssetSQL.update_asset(asset_basic_info_db, asset_manufacture_info_db_new, asset_manufacture_relation_info_db, asset_position_info_db, asset_contract_info_db, asset_belong_info_db, asset_customer_info_db, asset_part_info_db, None)
+        self.save_asset_with_manufacturer(
+            lambda manufacture_info_db: AssetSQL.update_asset(asset_basic_info_db, manufacture_info_db, asset_manufacture_relation_info_db, asset_position_info_db, asset_contract_info_db, asset_belong_info_db, asset_customer_info_db, asset_part_info_db, None),
+            new_manufacture_info_db, asset_manufacture_relation_info_db)
+        # 资产数据变化 更新库存版本
+        assets_export_service.bump_inventory_version()
 
 
     # 资产创建时基础对象数据转换
@@ -1462,6 +918,8 @@ class AssetsService:
             manufacture_id = manufacture_info_db.id
             # 保存对象
             AssetSQL.create_manufacture(manufacture_info_db)
+            # 厂商变化 缓存失效
+            manufacture_cache.invalidate()
         except Fail as e:
             raise e
         except Exception as e:
@@ -1536,6 +994,10 @@ class AssetsService:
                 raise Fail("manufacturer in use", error_message="厂商使用中")
             # 删除对象
             AssetSQL.delete_manufacture(manufacture_id)
+            # 厂商变化 缓存失效
+            manufacture_cache.invalidate()
+            # 资产数据变化 更新库存版本
+            assets_export_service.bump_inventory_version()
         except Fail as e:
             raise e
         except Exception as e:
@@ -1574,6 +1036,10 @@ class AssetsService:
                 manufacture_db.extra = json.dumps(manufacture_update_info.extra)
             # 保存对象
             AssetSQL.update_manufacture(manufacture_db)
+            # 厂商变化 缓存失效
+            manufacture_cache.invalidate()
+            # 资产数据变化 更新库存版本
+            assets_export_service.bump_inventory_version()
         except Fail as e:
             raise e
         except Exception as e:
@@ -1589,8 +1055,8 @@ class AssetsService:
     def list_assets_types(self, id, asset_type_name, asset_type_name_zh, child_included):
         # 业务逻辑
         try:
-            # 按照条件从数据库中查询数据
-            data = AssetSQL.list_asset_type(id, None,asset_type_name, asset_type_name_zh)
+            # 按照条件查询数据 结果会写入按照版本号区分的响应缓存 先检查类型缓存的版本 避免过期的数据缓存在新的版本下
+            data = asset_type_cache.list_asset_type(id, None, asset_type_name, asset_type_name_zh, check_version=True)
             # 数据处理
             ret = []
             # 遍历
@@ -1630,20 +1096,16 @@ class AssetsService:
             parent_asset_type_db = None
             if asset_type_db.parent_id:
                 # 查询父id的类型数据
-                data = AssetSQL.list_asset_type(asset_type_db.parent_id, None,None, None)
+                parent_asset_type_db = asset_type_cache.get_asset_type_by_id(asset_type_db.parent_id)
                 # 如果数据不存在
-                if not data:
+                if not parent_asset_type_db:
                     LOG.error("parent not exist")
                     raise Fail("type model parent not exists", error_message="类型的父类对象不存在")
             if asset_type_db.asset_type_name:
                 # 查询名称重复的类型数据
-                data = AssetSQL.list_asset_type(None, None, asset_type_db.asset_type_name, None)
-                # 如果数据已经存在
-                if data:
-                    for temp_asset_type in data:
-                        if asset_type_db.asset_type_name == temp_asset_type.asset_type_name:
-                            LOG.error("asset type exist")
-                            raise Fail("type model name already exists", error_message="类型的名称已存在")
+                if asset_type_cache.get_asset_type_by_name(asset_type_db.asset_type_name):
+                    LOG.error("asset type exist")
+                    raise Fail("type model name already exists", error_message="类型的名称已存在")
                 # 获取数据
                 # parent_asset_type_db = data[0]
                 # 英文名称匹配校验
@@ -1652,6 +1114,10 @@ class AssetsService:
                 #     raise Exception
             # 数据入库
             AssetSQL.create_asset_type(asset_type_db)
+            # 类型变化 缓存失效
+            asset_type_cache.invalidate()
+            # 资产和配件列表中包含类型名称 资产的响应缓存同时失效
+            assets_export_service.bump_inventory_version()
             # 返回
             return asset_type_db.id
         except Fail as e:
@@ -1682,24 +1148,8 @@ class AssetsService:
     def list_child_asset_types(self, id):
         # 业务逻辑
         try:
-            # 返回数据
-            res = list()
-            # 按照条件从数据库中查询数据
-            data = AssetSQL.list_asset_type(None, id,None, None)
-            # 数据处理
-            if not data:
-                return res
-            # 加入当前数据
-            res.extend(data)
-            # 遍历
-            for temp_asset_type in data:
-                # 查询当前的子数据
-                temp_data = self.list_child_asset_types(temp_asset_type.id)
-                # 存在子数据
-                if temp_data:
-                    res.extend(temp_data)
-            # 返回数据结果
-            return res
+            # 缓存中查询子树 缓存是冷的时候数据库递归查询
+            return asset_type_cache.list_child_asset_types(id)
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -1718,8 +1168,8 @@ class AssetsService:
             if asset_count > 0 or part_count > 0:
                 raise Fail("type used", error_message="分类使用中")
             # 先删除下级然后再删除上级
-            # 递归查询当前id的所有子类型
-            child_data = self.list_child_asset_types(asset_type_id)
+            # 数据库递归查询当前id的所有子类型 不使用可能过期的缓存
+            child_data = AssetSQL.list_child_asset_type(asset_type_id)
             # 遍历删除子类型
             if child_data:
                 for temp_child_type in child_data:
@@ -1727,12 +1177,17 @@ class AssetsService:
                     AssetSQL.delete_asset_type(temp_child_type.id)
             # 删除对象
             AssetSQL.delete_asset_type(asset_type_id)
+            # 资产和配件列表中包含类型名称 资产的响应缓存同时失效
+            assets_export_service.bump_inventory_version()
         except Fail as e:
             raise e
         except Exception as e:
             import traceback
             traceback.print_exc()
             raise e
+        finally:
+            # 类型变化 缓存失效
+            asset_type_cache.invalidate()
         # 成功返回资产id
         return asset_type_id
 
@@ -1754,13 +1209,9 @@ class AssetsService:
                 # 名称重复校验
                 if asset_type.asset_type_name != assert_type_db.asset_type_name:
                     # 查询名称重复的类型数据
-                    data = AssetSQL.list_asset_type(None, None, asset_type.asset_type_name, None)
-                    # 如果数据已经存在
-                    if data:
-                        for temp_asset_type in data:
-                            if asset_type.asset_type_name == temp_asset_type.asset_type_name:
-                                LOG.error("asset type exist")
-                                raise Fail("type model name already exists", error_message="类型的名称已存在")
+                    if asset_type_cache.get_asset_type_by_name(asset_type.asset_type_name):
+                        LOG.error("asset type exist")
+                        raise Fail("type model name already exists", error_message="类型的名称已存在")
                 # 校验通过赋值
                 assert_type_db.asset_type_name = asset_type.asset_type_name
             # 描述
@@ -1768,6 +1219,10 @@ class AssetsService:
                 assert_type_db.description = asset_type.description
             # 保存对象
             AssetSQL.update_asset_type(assert_type_db)
+            # 类型变化 缓存失效
+            asset_type_cache.invalidate()
+            # 资产和配件列表中包含类型名称 资产的响应缓存同时失效
+            assets_export_service.bump_inventory_version()
         except Fail as e:
             raise e
         except Exception as e:
@@ -1789,20 +1244,8 @@ class AssetsService:
             ret = []
             # 遍历
             for r in data:
-                # 填充数据
-                temp = {}
-                temp["id"] = r.id
-                temp["name"] = r.name
-                temp["asset_id"] = r.asset_id
-                temp["part_type"] = r.part_type
-                temp["part_brand"] = r.part_brand
-                temp["part_config"] = r.part_config
-                temp["part_number"] = r.part_number
-                temp["personal_used_flag"] = r.personal_used_flag
-                temp["surplus"] = r.surplus
-                temp["description"] = r.description
                 # 加入列表
-                ret.append(temp)
+                ret.append(self.convert_asset_part_dict(r))
             # 返回数据
             return ret
         except Exception as e:
@@ -1810,6 +1253,63 @@ class AssetsService:
             traceback.print_exc()
             return None
 
+    # 批量查询多个资产的配件列表 按照资产id分组
+    def list_assets_parts_by_asset_ids(self, asset_ids):
+        # 返回数据 资产id -> 配件列表
+        asset_parts_dict = {}
+        # 判空
+        if not asset_ids:
+            return asset_parts_dict
+        # 一次IN查询所有资产的配件
+        data = AssetSQL.list_asset_part_by_asset_ids(asset_ids)
+        # 内存中按照资产id分组
+        for r in data:
+            asset_parts_dict.setdefault(r.asset_id, []).append(self.convert_asset_part_dict(r))
+        # 返回数据
+        return asset_parts_dict
+
+    # 配件数据库对象转换为返回的dict
+    def convert_asset_part_dict(self, r):
+        # 填充数据
+        temp = {}
+        temp["id"] = r.id
+        temp["name"] = r.name
+        temp["asset_id"] = r.asset_id
+        temp["part_type"] = r.part_type
+        temp["part_brand"] = r.part_brand
+        temp["part_config"] = r.part_config
+        temp["part_number"] = r.part_number
+        temp["personal_used_flag"] = r.personal_used_flag
+        temp["surplus"] = r.surplus
+        temp["description"] = r.description
+        # 返回
+        return temp
+
+    # 配件列表查询结果的一行数据转换成返回的dict
+    def convert_asset_part_page_dict(self, r):
+        # 填充数据
+        temp = {}
+        temp["id"] = r.id
+        temp["name"] = r.name
+        temp["asset_name"] = r.asset_name
+        temp["asset_number"] = r.asset_number
+        temp["asset_id"] = r.asset_id
+        temp["manufacturer_name"] = r.manufacturer_name
+        temp["manufacturer_id"] = r.manufacturer_id
+        temp["part_type_id"] = r.part_type_id
+        if r.part_type:
+            temp["part_type"] = r.part_type
+        else:
+            temp["part_type"] = r.part_type_name
+        temp["part_brand"] = r.part_brand
+        temp["part_config"] = r.part_config
+        temp["part_number"] = r.part_number
+        temp["personal_used_flag"] = r.personal_used_flag
+        temp["surplus"] = r.surplus
+        temp["description"] = r.description
+        # 返回
+        return temp
+
     # 查询资产配件列表
     def list_assets_parts_pages(self, query_params, page, page_size, sort_keys, sort_dirs):
         # 业务逻辑
@@ -1820,28 +1320,8 @@ class AssetsService:
             ret = []
             # 遍历
             for r in data:
-                # 填充数据
-                temp = {}
-                temp["id"] = r.id
-                temp["name"] = r.name
-                temp["asset_name"] = r.asset_name
-                temp["asset_number"] = r.asset_number
-                temp["asset_id"] = r.asset_id
-                temp["manufacturer_name"] = r.manufacturer_name
-                temp["manufacturer_id"] = r.manufacturer_id
-                temp["part_type_id"] = r.part_type_id
-                if r.part_type:
-                    temp["part_type"] = r.part_type
-                else:
-                    temp["part_type"] = r.part_type_name
-                temp["part_brand"] = r.part_brand
-                temp["part_config"] = r.part_config
-                temp["part_number"] = r.part_number
-                temp["personal_used_flag"] = r.personal_used_flag
-                temp["surplus"] = r.surplus
-                temp["description"] = r.description
-                # 加入列表
-                ret.append(temp)
+                # 填充数据后加入列表
+                ret.append(self.convert_asset_part_page_dict(r))
             # 返回数据
             res = {}
             # 页数相关信息
@@ -1870,6 +1350,8 @@ class AssetsService:
             asset_part_id = asset_part_info_db.id
             # 保存对象
             AssetSQL.create_asset_part(asset_part_info_db)
+            # 资产数据变化 更新库存版本
+            assets_export_service.bump_inventory_version()
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -1901,7 +1383,7 @@ class AssetsService:
         )
         # 重新设置part_type
         if asset_part_info_db.part_type_id:
-            asset_type = AssetSQL.get_asset_type_by_id(asset_part_info_db.part_type_id)
+            asset_type = asset_type_cache.get_asset_type_by_id(asset_part_info_db.part_type_id)
             if asset_type and asset_type.asset_type_name:
                 asset_part_info_db.part_type = asset_type.asset_type_name
         # 返回数据
@@ -1932,7 +1414,7 @@ class AssetsService:
             if asset_part.part_type_id is not None and len(asset_part.part_type_id) > 0:
                 asset_part_db.part_type_id = asset_part.part_type_id
                 # 重新设置part_type
-                asset_type = AssetSQL.get_asset_type_by_id(asset_part_db.part_type_id)
+                asset_type = asset_type_cache.get_asset_type_by_id(asset_part_db.part_type_id)
                 if asset_type:
                     asset_part_db.part_type = asset_type.asset_type_name
                 else:
@@ -1957,6 +1439,8 @@ class AssetsService:
                 asset_part_db.description = asset_part.description
             # 保存对象
             AssetSQL.update_asset_part(asset_part_db)
+            # 资产数据变化 更新库存版本
+            assets_export_service.bump_inventory_version()
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -1973,6 +1457,8 @@ class AssetsService:
         try:
             # 删除对象
             AssetSQL.delete_asset_part(asset_part_id)
+            # 资产数据变化 更新库存版本
+            assets_export_service.bump_inventory_version()
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -2001,6 +1487,8 @@ class AssetsService:
             asset_part_db.asset_id = asset_id
             # 保存对象
             AssetSQL.update_asset_part(asset_part_db)
+            # 资产数据变化 更新库存版本
+            assets_export_service.bump_inventory_version()
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -2028,6 +1516,8 @@ class AssetsService:
             asset_part_db.asset_id = None
             # 保存对象
             AssetSQL.update_asset_part(asset_part_db)
+            # 资产数据变化 更新库存版本
+            assets_export_service.bump_inventory_version()
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -2047,28 +1537,8 @@ class AssetsService:
             ret = []
             # 遍历
             for r in data:
-                # 填充数据
-                temp = {}
-                temp["id"] = r.id
-                temp["asset_id"] = r.asset_id
-                temp["asset_name"] = r.asset_name
-                temp["cabinet_position"] = r.cabinet_position
-                temp["u_position"] = r.u_position
-                temp["port"] = r.port
-                temp["label"] = r.label
-                temp["opposite_asset_id"] = r.opposite_asset_id
-                temp["opposite_asset_name"] = r.opposite_asset_name
-                temp["opposite_cabinet_position"] = r.opposite_cabinet_position
-                temp["opposite_u_position"] = r.opposite_u_position
-                temp["opposite_port"] = r.opposite_port
-                temp["opposite_label"] = r.opposite_label
-                temp["cable_type"] = r.cable_type
-                temp["cable_interface_type"] = r.cable_interface_type
-                temp["cable_length"] = r.cable_length
-                temp["extra"] = r.extra
-                temp["description"] = r.description
-                # 加入列表
-                ret.append(temp)
+                # 填充数据后加入列表
+                ret.append(self.convert_asset_flow_dict(r))
             # 返回数据
             return ret
         except Exception as e:
@@ -2077,6 +1547,31 @@ class AssetsService:
             raise e
 
 
+    # 网络设备流查询结果的一行数据转换成返回的dict
+    def convert_asset_flow_dict(self, r):
+        # 填充数据
+        temp = {}
+        temp["id"] = r.id
+        temp["asset_id"] = r.asset_id
+        temp["asset_name"] = r.asset_name
+        temp["cabinet_position"] = r.cabinet_position
+        temp["u_position"] = r.u_position
+        temp["port"] = r.port
+        temp["label"] = r.label
+        temp["opposite_asset_id"] = r.opposite_asset_id
+        temp["opposite_asset_name"] = r.opposite_asset_name
+        temp["opposite_cabinet_position"] = r.opposite_cabinet_position
+        temp["opposite_u_position"] = r.opposite_u_position
+        temp["opposite_port"] = r.opposite_port
+        temp["opposite_label"] = r.opposite_label
+        temp["cable_type"] = r.cable_type
+        temp["cable_interface_type"] = r.cable_interface_type
+        temp["cable_length"] = r.cable_length
+        temp["extra"] = r.extra
+        temp["description"] = r.description
+        # 返回
+        return temp
+
     # 创建网络设备的流转数据
     def create_asset_flow(self, asset_flow_api_model):
         # 业务逻辑
@@ -2089,6 +1584,8 @@ class AssetsService:
             asset_flow_db = self.convert_asset_flow_info_db(asset_flow_api_model)
             # 数据入库
             AssetSQL.create_asset_flow(asset_flow_db)
+            # 资产数据变化 更新库存版本
+            assets_export_service.bump_inventory_version()
             # 返回
             return asset_flow_db.id
         except Fail as e:
@@ -2131,6 +1628,8 @@ class AssetsService:
         try:
             # 删除对象
             AssetSQL.delete_asset_flow(asset_flow_id)
+            # 资产数据变化 更新库存版本
+            assets_export_service.bump_inventory_version()
         except Fail as e:
             raise e
         except Exception as e:
@@ -2181,6 +1680,8 @@ class AssetsService:
                 assert_flow_db.description = asset_flow.description
             # 保存对象
             AssetSQL.update_asset_flow(assert_flow_db)
+            # 资产数据变化 更新库存版本
+            assets_export_service.bump_inventory_version()
         except Fail as e:
             raise e
         except Exception as e:
@@ -2190,99 +1691,6 @@ class AssetsService:
         # 成功返回id
         return id
 
-    # 导出网络设备的流数据，或者指定id的流数据
-    def create_asset_network_flow_excel(self, result_file_path, asset_id, ids):
-        try:
-            # 导出的excel数据
-            excel_asset_network_flow_data = []
-            # 查询
-            res = self.list_assets_flows(asset_id, ids)
-            # 空
-            if not res:
-                return None
-            # 非空，遍历写入
-            for temp in res:
-                # 修改或添加新数据
-                temp_asset_data = {'设备名称': temp['asset_name'],'U位': temp['u_position'],'机柜': temp['cabinet_position'],
-                                   '端口': temp['port'],'对端设备名称': temp['opposite_asset_name'],'对端U位': temp['opposite_u_position'],
-                                   '对端机柜': temp['opposite_cabinet_position'],'线缆类型': temp['cable_type'],'线缆接口类型': temp['cable_interface_type'],
-                                   '线缆长度': temp['cable_interface_type'],'标签': temp['label'],'对端标签': temp['opposite_label'],'备注': temp['description']}
-                # 加入excel导出数据列表
-                excel_asset_network_flow_data.append(temp_asset_data)
-            # 加载模板文件
-            book = load_workbook(result_file_path)
-            sheet = book.active  # 默认使用第一个工作表
-            # 确定起始写入行号
-            start_row = 2  # 自动追加到最后一行之后
-            # 写入数据到模板文件
-            for idx, row in pd.DataFrame(excel_asset_network_flow_data).iterrows():
-                for col_idx, value in enumerate(row, start=1):  # 列从 1 开始
-                    sheet.cell(row=start_row + idx, column=col_idx, value=value)
-            # 保存修改
-            book.save(result_file_path)
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            raise e
-
-
-    def import_asset_network_flow(self, row):
-        # 存入一行
-        try:
-            # 初始化数据对象
-            asset_network_flow = self.init_empty_asset_network_flow_api_model()
-            asset_name = None
-            opposite_asset_name = None
-            # 从网络设备的excel中加载基础信息数据
-            for basic_key, basic_column in asset_network_flow_info_columns.items():
-                # 判断excel的数据是非nan 并且对象中存在对应属性
-                if pd.notna(row[basic_column]):
-                    # 资产名称
-                    if basic_column == "设备名称":
-                        asset_name = row[basic_column]
-                    # 对端资产名称
-                    if basic_column == "对端设备名称":
-                        opposite_asset_name = row[basic_column]
-                    # 属性与excel中能够对应
-                    if hasattr(asset_network_flow, basic_key):
-                        asset_network_flow.__setattr__(basic_key, row[basic_column])
-            # 读取对应名称的资产设备信息
-            if asset_name:
-                asset_db = AssetSQL.get_asset_basic_info_by_catalog_name("NETWORK", format_excel_str(asset_name))
-                if asset_db:
-                    asset_network_flow.asset_id = asset_db.id
-            if opposite_asset_name:
-                asset_db = AssetSQL.get_asset_basic_info_by_catalog_name("NETWORK", format_excel_str(opposite_asset_name))
-                if asset_db:
-                    asset_network_flow.opposite_asset_id = asset_db.id
-            # 保存
-            self.create_asset_flow(asset_network_flow)
-            # 组装数据
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            raise e
-
-    # 初始化一个空的资产数据的结构对象
-    def init_empty_asset_network_flow_api_model(self):
-        # 初始化api的model对象
-        asset_network_flow_api_model = AssetFlowApiModel(
-            # 资产通用信息
-            id = uuid.uuid4().hex,
-            asset_id = None,
-            port = None,
-            label = None,
-            opposite_asset_id = None,
-            opposite_port = None,
-            opposite_label = None,
-            cable_type = None,
-            cable_interface_type = None,
-            cable_length = None,
-            extra = None,
-            description = None,
-        )
-        return asset_network_flow_api_model
-
 
 # 以下是资产-扩展字段相关的service
     # 查询资产扩展字段列表
@@ -2334,6 +1742,8 @@ class AssetsService:
                 asset_column_info_db.queue = current_max_queue + 1
             # 保存对象
             AssetSQL.create_asset_column(asset_column_info_db)
+            # 扩展字段变化 接口缓存失效
+            response_cache.bump_generation("asset_columns")
         except Fail as e:
             raise e
         except Exception as e:
@@ -2374,6 +1784,8 @@ class AssetsService:
         try:
             # 删除对象
             AssetSQL.delete_asset_column_by_id(column_id)
+            # 扩展字段变化 接口缓存失效
+            response_cache.bump_generation("asset_columns")
         except Fail as e:
             raise e
         except Exception as e:
@@ -2401,6 +1813,8 @@ class AssetsService:
             assert_column_db = self.reset_asset_column_info_db(assert_column_db, asset_column)
             # 保存对象
             AssetSQL.update_asset_column(assert_column_db)
+            # 扩展字段变化 接口缓存失效
+            response_cache.bump_generation("asset_columns")
         except Fail as e:
             raise e
         except Exception as e:
@@ -0,0 +1,372 @@
+# 资产excel导出的service层 使用openpyxl的只写模式流式写入
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from copy import copy
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.reader.excel import load_workbook
+from oslo_log import log
+
+from db.models.asset.sql import AssetSQL
+from services.redis_connection import redis_connection
+from utils.constant import EXCEL_TEMP_DIR, EXCEL_TEMP_FILE_EXPIRE_SECONDS, EXCEL_TEMP_DIR_MAX_SIZE, \
+    EXCEL_EXPORT_CACHE_DIR, EXCEL_EXPORT_CACHE_MAX_SIZE, EXCEL_EXPORT_CACHE_EXPIRE_SECONDS, ASSET_INVENTORY_VERSION_REDIS_KEY, \
+    ASSET_SERVER_TEMPLATE_FILE_DIR, ASSET_NETWORK_TEMPLATE_FILE_DIR, \
+    ASSET_NETWORK_FLOW_TEMPLATE_FILE_DIR, ASSET_TEMPLATE_ASSET_SHEET, ASSET_TEMPLATE_PART_SHEET, \
+    ASSET_TEMPLATE_NETWORK_SHEET, ASSET_EXPORT_CHUNK_SIZE, asset_part_info_columns
+
+LOG = log.getLogger(__name__)
+
+# 不同资产类型对应的模板文件
+asset_export_template_files = {
+    "SERVER": ASSET_SERVER_TEMPLATE_FILE_DIR,
+    "NETWORK": ASSET_NETWORK_TEMPLATE_FILE_DIR,
+    "NETWORK_FLOW": ASSET_NETWORK_FLOW_TEMPLATE_FILE_DIR,
+}
+
+
+class AssetsExportService:
+
+    # 查询资产库存版本 查询失败时返回None 此时不使用缓存
+    def get_inventory_version(self):
+        try:
+            inventory_version = redis_connection.redis_connection.get(ASSET_INVENTORY_VERSION_REDIS_KEY)
+            return int(inventory_version) if inventory_version else 0
+        except Exception as e:
+            LOG.error(f"查询资产库存版本失败: {e}")
+            return None
+
+    # 资产数据变化后更新库存版本 旧版本的导出缓存随之失效
+    def bump_inventory_version(self):
+        try:
+            redis_connection.redis_connection.incr(ASSET_INVENTORY_VERSION_REDIS_KEY)
+        except Exception as e:
+            LOG.error(f"更新资产库存版本失败: {e}")
+
+    # 导出excel文件 优先使用缓存 返回本次请求独占的临时文件路径 下载完成后删除 资产类型不支持时返回None
+    def export_asset_excel(self, asset_type, result_file_name, asset_id=None, asset_ids=None):
+        # 资产类型不支持 资产类型会拼接到缓存文件路径中 必须先校验
+        if not asset_type or asset_type not in asset_export_template_files:
+            return None
+        # 缓存文件由资产类型、选中数据的hash以及库存版本组成
+        inventory_version = self.get_inventory_version()
+        # 库存版本不可用 只生成临时文件
+        if inventory_version is None:
+            result_file_path = self.create_export_file_path(result_file_name)
+            self.create_asset_excel_file(asset_type, result_file_path, asset_id, asset_ids)
+            return result_file_path
+        # 缓存文件路径
+        cache_file_path = EXCEL_EXPORT_CACHE_DIR + f"{asset_type}_{self.hash_export_ids(asset_id, asset_ids)}_{inventory_version}.xlsx"
+        # 命中缓存 更新修改时间用于LRU淘汰 链接到本次请求的临时文件 缓存文件被并发淘汰时不影响下载
+        if os.path.exists(cache_file_path):
+            result_file_path = self.create_export_file_path(result_file_name)
+            try:
+                os.utime(cache_file_path)
+                self.link_export_file(cache_file_path, result_file_path)
+                return result_file_path
+            except FileNotFoundError:
+                # 刚好被淘汰 重新生成
+                pass
+        # 未命中 先生成到临时文件再链接到缓存目录 避免并发下载读到未写完的文件
+        result_file_path = self.create_export_file_path(result_file_name)
+        self.create_asset_excel_file(asset_type, result_file_path, asset_id, asset_ids)
+        os.makedirs(EXCEL_EXPORT_CACHE_DIR, exist_ok=True)
+        # 链接到临时目录下的新文件名后再原子替换缓存文件
+        cache_temp_file_path = EXCEL_TEMP_DIR + uuid.uuid4().hex + ".cache"
+        try:
+            self.link_export_file(result_file_path, cache_temp_file_path)
+            os.replace(cache_temp_file_path, cache_file_path)
+        except Exception as e:
+            self.delete_export_file(cache_temp_file_path)
+            LOG.error(f"写入导出缓存失败: {e}")
+        # 淘汰过期的缓存
+        self.clean_export_cache_dir(inventory_version, cache_file_path)
+        # 返回
+        return result_file_path
+
+    # 硬链接文件 文件系统不支持硬链接时复制
+    def link_export_file(self, source_file_path, target_file_path):
+        try:
+            os.link(source_file_path, target_file_path)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            shutil.copy2(source_file_path, target_file_path)
+
+    # 生成excel文件 失败时删除生成了一半的文件
+    def create_asset_excel_file(self, asset_type, result_file_path, asset_id=None, asset_ids=None):
+        try:
+            self.create_asset_excel(asset_type, result_file_path, asset_id, asset_ids)
+        except Exception as e:
+            self.delete_export_file(result_file_path)
+            raise e
+
+    # 选中数据的hash 顺序和重复的id不影响结果
+    def hash_export_ids(self, asset_id=None, asset_ids=None):
+        ids = sorted(set(asset_ids.split(","))) if asset_ids else []
+        return hashlib.sha1(f"{asset_id or ''}|{','.join(ids)}".encode("utf-8")).hexdigest()
+
+    # 淘汰缓存文件 删除旧库存版本和过期的文件 总大小超过上限时从最久未使用的文件开始删除
+    def clean_export_cache_dir(self, inventory_version, keep_file_path=None):
+        try:
+            # 有效的缓存文件
+            cache_files = []
+            expire_time = time.time() - EXCEL_EXPORT_CACHE_EXPIRE_SECONDS
+            with os.scandir(EXCEL_EXPORT_CACHE_DIR) as entries:
+                for entry in entries:
+                    if not entry.is_file() or entry.path == keep_file_path:
+                        continue
+                    stat = entry.stat()
+                    # 旧版本或者过期直接删除
+                    if not entry.name.endswith(f"_{inventory_version}.xlsx") or stat.st_mtime < expire_time:
+                        self.delete_export_file(entry.path)
+                    else:
+                        cache_files.append((stat.st_mtime, stat.st_size, entry.path))
+            # 总大小超过上限 按照最近使用时间从早到晚删除
+            total_size = sum(cache_file[1] for cache_file in cache_files)
+            if keep_file_path and os.path.exists(keep_file_path):
+                total_size += os.path.getsize(keep_file_path)
+            for _, file_size, file_path in sorted(cache_files):
+                if total_size <= EXCEL_EXPORT_CACHE_MAX_SIZE:
+                    break
+                self.delete_export_file(file_path)
+                total_size -= file_size
+        except Exception as e:
+            LOG.error(f"清理导出缓存目录失败: {e}")
+
+    # 生成导出文件的临时路径 文件名加上uuid避免并发导出时互相覆盖
+    def create_export_file_path(self, result_file_name):
+        # 先清理临时目录
+        self.clean_export_temp_dir()
+        # 目录不存在时创建
+        os.makedirs(EXCEL_TEMP_DIR, exist_ok=True)
+        # 返回
+        return EXCEL_TEMP_DIR + uuid.uuid4().hex + "_" + result_file_name
+
+    # 删除导出的临时文件 下载完成后执行
+    def delete_export_file(self, result_file_path):
+        try:
+            os.remove(result_file_path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            LOG.error(f"删除导出文件{result_file_path}失败: {e}")
+
+    # 清理临时目录 删除过期的文件 总大小超过上限时从最早的文件开始删除
+    def clean_export_temp_dir(self):
+        # 目录不存在
+        if not os.path.isdir(EXCEL_TEMP_DIR):
+            return
+        try:
+            # 未过期的文件
+            temp_files = []
+            expire_time = time.time() - EXCEL_TEMP_FILE_EXPIRE_SECONDS
+            with os.scandir(EXCEL_TEMP_DIR) as entries:
+                for entry in entries:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    # 过期直接删除
+                    if stat.st_mtime < expire_time:
+                        self.delete_export_file(entry.path)
+                    else:
+                        temp_files.append((stat.st_mtime, stat.st_size, entry.path))
+            # 总大小超过上限 按照修改时间从早到晚删除
+            total_size = sum(temp_file[1] for temp_file in temp_files)
+            for _, file_size, file_path in sorted(temp_files):
+                if total_size <= EXCEL_TEMP_DIR_MAX_SIZE:
+                    break
+                self.delete_export_file(file_path)
+                total_size -= file_size
+        except Exception as e:
+            LOG.error(f"清理导出临时目录失败: {e}")
+
+    # 按照资产类型导出excel文件 asset_id只对网络设备流有效 asset_ids是选中的数据id
+    def create_asset_excel(self, asset_type, result_file_path, asset_id=None, asset_ids=None):
+        # 判空
+        if not asset_type or asset_type not in asset_export_template_files:
+            return None
+        try:
+            # 模板文件只读取表头和样式
+            template_book = load_workbook(os.getcwd() + asset_export_template_files[asset_type])
+            # 只写模式的excel 数据逐行写入临时文件 内存占用不随行数增长
+            book = Workbook(write_only=True)
+            # 服务器类型的文件
+            if asset_type == "SERVER":
+                self.write_asset_server_sheets(book, template_book, asset_ids)
+            # 网络类型的文件
+            elif asset_type == "NETWORK":
+                self.write_asset_network_sheet(book, template_book, asset_ids)
+            # 网络类型流入流出的文件
+            elif asset_type == "NETWORK_FLOW":
+                self.write_asset_network_flow_sheet(book, template_book, asset_id, asset_ids)
+            # 保存
+            book.save(result_file_path)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            raise e
+
+
+    # 写入服务器的资产sheet页和配件sheet页
+    def write_asset_server_sheets(self, book, template_book, asset_ids):
+        # 查询条件
+        query_params = {"asset_category": "SERVER"}
+        if asset_ids:
+            query_params["asset_ids"] = asset_ids
+        # 配件的自定义类型作为额外的列头 提前查询
+        extra_part_headers = sorted(part_type for part_type in AssetSQL.list_asset_part_types(query_params)
+                                    if part_type not in asset_part_info_columns)
+        # 创建sheet页
+        asset_sheet, asset_headers, asset_styles = self.create_sheet_from_template(book, template_book[ASSET_TEMPLATE_ASSET_SHEET])
+        part_sheet, part_headers, part_styles = self.create_sheet_from_template(book, template_book[ASSET_TEMPLATE_PART_SHEET], extra_part_headers)
+        # 按批写入数据
+        for chunk in AssetSQL.stream_asset(query_params, ASSET_EXPORT_CHUNK_SIZE):
+            # 当前批次资产的配件 一次查询
+            asset_parts_dict = {}
+            for part in AssetSQL.list_asset_part_by_asset_ids([r.id for r in chunk]):
+                asset_parts_dict.setdefault(part.asset_id, []).append(part)
+            # 遍历写入
+            for r in chunk:
+                self.append_sheet_row(asset_sheet, asset_headers, asset_styles, self.convert_asset_server_excel_row(r))
+                # 配件数据
+                asset_parts = asset_parts_dict.get(r.id)
+                if asset_parts:
+                    self.append_sheet_row(part_sheet, part_headers, part_styles, self.convert_asset_part_excel_row(r, asset_parts))
+
+
+    # 写入网络设备的sheet页
+    def write_asset_network_sheet(self, book, template_book, asset_ids):
+        # 查询条件
+        query_params = {"asset_category": "NETWORK"}
+        if asset_ids:
+            query_params["asset_ids"] = asset_ids
+        # 创建sheet页
+        sheet, headers, styles = self.create_sheet_from_template(book, template_book[ASSET_TEMPLATE_NETWORK_SHEET])
+        # 按批写入数据
+        for chunk in AssetSQL.stream_asset(query_params, ASSET_EXPORT_CHUNK_SIZE):
+            for r in chunk:
+                self.append_sheet_row(sheet, headers, styles, self.convert_asset_network_excel_row(r))
+
+
+    # 写入网络设备流的sheet页
+    def write_asset_network_flow_sheet(self, book, template_book, asset_id, asset_ids):
+        # 创建sheet页
+        sheet, headers, styles = self.create_sheet_from_template(book, template_book[ASSET_TEMPLATE_NETWORK_SHEET])
+        # 按批写入数据
+        for chunk in AssetSQL.stream_asset_flow(asset_id, asset_ids, ASSET_EXPORT_CHUNK_SIZE):
+            for r in chunk:
+                self.append_sheet_row(sheet, headers, styles, self.convert_asset_network_flow_excel_row(r))
+
+
+    # 按照模板sheet页创建只写sheet页 复制表头、列宽、冻结窗格以及数据行样式
+    def create_sheet_from_template(self, book, template_sheet, extra_headers=None):
+        # 新建sheet页
+        sheet = book.create_sheet(template_sheet.title)
+        # 列宽必须在写入数据前设置
+        for column_letter, column_dimension in template_sheet.column_dimensions.items():
+            if column_dimension.width:
+                sheet.column_dimensions[column_letter].width = column_dimension.width
+        # 冻结窗格
+        sheet.freeze_panes = template_sheet.freeze_panes
+        # 表头和第二行的样式作为数据行的样式
+        template_headers = [cell for cell in template_sheet[1] if cell.value is not None]
+        headers = [cell.value for cell in template_headers]
+        header_cells = []
+        styles = []
+        for template_header in template_headers:
+            header_cells.append(self.create_cell(sheet, template_header.value, template_header))
+            styles.append(self.create_cell(sheet, None, template_sheet.cell(row=2, column=template_header.column))._style)
+        # 自定义的列头 使用最后一列的样式
+        for extra_header in extra_headers or []:
+            headers.append(extra_header)
+            header_cells.append(self.create_cell(sheet, extra_header, template_headers[-1]))
+            styles.append(copy(styles[-1]))
+        # 写入表头
+        sheet.append(header_cells)
+        # 返回
+        return sheet, headers, styles
+
+    # 按照模板单元格的样式创建只写单元格
+    def create_cell(self, sheet, value, template_cell):
+        cell = WriteOnlyCell(sheet, value=value)
+        # 复制样式
+        if template_cell.has_style:
+            cell.font = copy(template_cell.font)
+            cell.fill = copy(template_cell.fill)
+            cell.border = copy(template_cell.border)
+            cell.alignment = copy(template_cell.alignment)
+            cell.number_format = template_cell.number_format
+            cell.protection = copy(template_cell.protection)
+        # 返回
+        return cell
+
+    # 按照表头顺序写入一行数据
+    def append_sheet_row(self, sheet, headers, styles, row_data):
+        cells = []
+        for header, style in zip(headers, styles):
+            cell = WriteOnlyCell(sheet)
+            # 先设置样式再赋值 日期类型的值会自动设置日期格式
+            cell._style = copy(style)
+            cell.value = row_data.get(header)
+            cells.append(cell)
+        sheet.append(cells)
+
+
+    # 资产的扩展信息
+    def load_asset_extra(self, r):
+        try:
+            extra_json = json.loads(r.extra) if r.extra else {}
+            return extra_json if isinstance(extra_json, dict) else {}
+        except Exception as e:
+            LOG.error(e)
+            return {}
+
+    # 资产类型去掉资产大类的前缀 与导入模板一致
+    def format_excel_asset_type(self, r):
+        # 空或者是资产大类本身
+        if not r.asset_type or r.asset_type == r.asset_category:
+            return None
+        return r.asset_type.replace(r.asset_category + "_", "", 1) if r.asset_category else r.asset_type
+
+    # 服务器资产的一行excel数据
+    def convert_asset_server_excel_row(self, r):
+        extra_json = self.load_asset_extra(r)
+        return {'机柜': r.position_cabinet_position, 'U位': r.position_u_position, '设备名称': r.name,
+                '设备类型': self.format_excel_asset_type(r), '设备型号': r.equipment_number, '资产编号': r.asset_number,
+                '序列号': r.sn_number, '部门': r.belong_department_name, '负责人': r.belong_user_name,
+                '主机名': extra_json.get("host_name"), 'IP': extra_json.get("ip"), 'IDRAC': extra_json.get("idrac"),
+                '用途': extra_json.get("use_to"), '密码': None, '操作系统': extra_json.get("operate_system"),
+                '购买日期': r.contract_purchase_date, '厂商': r.manufacture_name, '批次': r.contract_batch_number,
+                '备注': r.description}
+
+    # 服务器配件的一行excel数据 每种配件一列
+    def convert_asset_part_excel_row(self, r, asset_parts):
+        row_data = {'资产编号': r.asset_number}
+        for part in asset_parts:
+            # 模板中存在的配件列 不存在时是自定义列头
+            row_data[asset_part_info_columns.get(part.part_type, part.part_type)] = part.part_config
+        return row_data
+
+    # 网络设备的一行excel数据
+    def convert_asset_network_excel_row(self, r):
+        extra_json = self.load_asset_extra(r)
+        return {'机柜': r.position_cabinet_position, 'U位': r.position_u_position, '设备厂商': r.manufacture_name,
+                '设备类型': self.format_excel_asset_type(r), '设备名称': r.name, '设备型号': r.equipment_number,
+                '资产编号': r.asset_number, '主机名': extra_json.get("host_name"), '管理地址': extra_json.get("manage_address"),
+                '带外网关': extra_json.get("external_gateway"), 'm-lag mac': extra_json.get("m_lagmac"),
+                '网络设备角色': extra_json.get("network_equipment_role"), '序号': extra_json.get("serial_number"),
+                'loopback': extra_json.get("loopback"), 'vlanifv4': extra_json.get("vlanifv4"), '预留': None,
+                'BGP_AS': extra_json.get("bgp_as"), '用途': extra_json.get("use_to"), '采购合同号': r.contract_number}
+
+    # 网络设备流的一行excel数据
+    def convert_asset_network_flow_excel_row(self, r):
+        return {'设备名称': r.asset_name, 'U位': r.u_position, '机柜': r.cabinet_position, '端口': r.port,
+                '对端设备名称': r.opposite_asset_name, '对端U位': r.opposite_u_position, '对端机柜': r.opposite_cabinet_position,
+                '对端端口': r.opposite_port, '线缆类型': r.cable_type, '线缆接口类型': r.cable_interface_type,
+                '线缆长度': r.cable_length, '标签': r.label, '对端标签': r.opposite_label, '备注': r.description}
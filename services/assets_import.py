@@ -0,0 +1,559 @@
+# 资产excel批量导入的service层
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+from oslo_log import log
+
+from api.model.system import OperateLogApiModel
+from db.models.asset.models import AssetBasicInfo, AssetManufactureRelationInfo, \
+    AssetPositionsInfo, AssetContractsInfo, AssetBelongsInfo, AssetCustomersInfo, AssetPartsInfo, AssetFlowsInfo
+from db.models.asset.sql import AssetSQL
+from services.asset_type_cache import asset_type_cache
+from services.manufacture_cache import manufacture_cache
+from services.assets_export import AssetsExportService
+from services.custom_exception import Fail
+from services.redis_channel import redis_channel_service
+from services.redis_connection import redis_connection
+from services.system import SystemService
+from utils.common import format_excel_key
+from utils.constant import ASSET_TEMPLATE_ASSET_SHEET, ASSET_TEMPLATE_PART_SHEET, ASSET_TEMPLATE_NETWORK_SHEET, \
+    ASSET_IMPORT_CHUNK_SIZE, asset_basic_info_columns, asset_basic_info_extra_columns, asset_manufacture_info_columns, \
+    asset_position_info_columns, asset_contract_info_columns, asset_belong_info_columns, asset_customer_info_columns, \
+    asset_part_info_columns, asset_network_basic_info_columns, asset_network_basic_info_extra_columns, \
+    asset_network_manufacture_info_columns, asset_network_position_info_columns, asset_network_flow_info_columns, \
+    ASSET_IMPORT_JOB_WORKERS, ASSET_IMPORT_JOB_REDIS_KEY_PREFIX, ASSET_IMPORT_JOB_EXPIRE_SECONDS, \
+    ASSET_IMPORT_JOB_HEARTBEAT_SECONDS, ASSET_IMPORT_JOB_STALE_SECONDS, websocket_type_channels
+
+LOG = log.getLogger(__name__)
+
+system_service = SystemService()
+assets_export_service = AssetsExportService()
+
+# 资产异步导入任务的线程池
+import_job_executor = ThreadPoolExecutor(max_workers=ASSET_IMPORT_JOB_WORKERS, thread_name_prefix="asset_import_job")
+# 当前进程中未结束的导入任务 由心跳线程定期刷新更新时间 保存任务状态时加锁 避免心跳覆盖最终状态
+import_job_lock = threading.Lock()
+import_job_active_dict = {}
+import_job_heartbeat_thread = None
+
+# 服务器和网络设备的默认资产类型id
+SERVER_ASSET_TYPE_ID = "8fb707d8-b07e-11ef-90c8-44a842237864"
+NETWORK_ASSET_TYPE_ID = "8fbc77f1-b07e-11ef-90c8-44a842237864"
+
+# 资产sheet页的列配置 optional中的分组在模板中可以不存在
+server_sheet_columns = {
+    "basic": asset_basic_info_columns,
+    "extra": asset_basic_info_extra_columns,
+    "manufacture": asset_manufacture_info_columns,
+    "position": asset_position_info_columns,
+    "contract": asset_contract_info_columns,
+    "belong": asset_belong_info_columns,
+    "customer": asset_customer_info_columns,
+    "optional": ("contract", "customer"),
+}
+network_sheet_columns = {
+    "basic": asset_network_basic_info_columns,
+    "extra": asset_network_basic_info_extra_columns,
+    "manufacture": asset_network_manufacture_info_columns,
+    "position": asset_network_position_info_columns,
+    "contract": asset_contract_info_columns,
+    "belong": {},
+    "customer": {},
+    "optional": ("contract",),
+}
+
+# 资产相关的表 按照插入顺序排列
+asset_import_models = (AssetBasicInfo, AssetManufactureRelationInfo, AssetPositionsInfo, AssetContractsInfo,
+                       AssetBelongsInfo, AssetCustomersInfo)
+
+# 网络设备流信息中可以直接导入的字段
+asset_flow_import_keys = ("port", "label", "opposite_port", "opposite_label", "cable_type", "cable_interface_type",
+                          "cable_length", "description")
+
+
+class AssetsImportService:
+
+    # 按照资产模板批量导入excel数据 progress_callback(sheet页名称, 已处理行数, 总行数)
+    def import_assets(self, asset_type, buffer, progress_callback=None):
+        try:
+            # 服务器类型
+            if asset_type == "server":
+                # 一次解析资产和配件两个sheet页
+                sheets = pd.read_excel(buffer, sheet_name=[ASSET_TEMPLATE_ASSET_SHEET, ASSET_TEMPLATE_PART_SHEET])
+                # 1、资产设备sheet
+                server_error_index = self.import_asset_sheet(sheets[ASSET_TEMPLATE_ASSET_SHEET], "SERVER", SERVER_ASSET_TYPE_ID,
+                                                             server_sheet_columns, False, ASSET_TEMPLATE_ASSET_SHEET, progress_callback)
+                if server_error_index:
+                    LOG.error(f"import server failed, error row number:{server_error_index}")
+                    raise Fail("import server data error", params={"sheet": ASSET_TEMPLATE_ASSET_SHEET, "error_rows": server_error_index}, error_message=f"导入服务器失败, sheet[asset]页错误行号:{server_error_index}")
+                # 2、资产配件sheet
+                server_part_error_index = self.import_part_sheet(sheets[ASSET_TEMPLATE_PART_SHEET], ASSET_TEMPLATE_PART_SHEET, progress_callback)
+                if server_part_error_index:
+                    LOG.error(f"import server part failed, error row number:{server_part_error_index}")
+                    raise Fail("import server part data error", params={"sheet": ASSET_TEMPLATE_PART_SHEET, "error_rows": server_part_error_index}, error_message=f"导入服务器失败, sheet[part]页错误行号:{server_part_error_index}")
+            elif asset_type == "network":
+                # 1、网络设备sheet
+                df = pd.read_excel(buffer, sheet_name=ASSET_TEMPLATE_NETWORK_SHEET)
+                network_error_index = self.import_asset_sheet(df, "NETWORK", NETWORK_ASSET_TYPE_ID, network_sheet_columns,
+                                                              True, ASSET_TEMPLATE_NETWORK_SHEET, progress_callback)
+                if network_error_index:
+                    LOG.error(f"import network failed, error row number:{network_error_index}")
+                    raise Fail("import network data error", params={"sheet": ASSET_TEMPLATE_NETWORK_SHEET, "error_rows": network_error_index}, error_message=f"导入网络设备失败, sheet[network]页错误行号:{network_error_index}")
+            elif asset_type == "network_flow":
+                # 1、网络设备流sheet
+                df = pd.read_excel(buffer, sheet_name=ASSET_TEMPLATE_NETWORK_SHEET)
+                network_flow_error_index = self.import_flow_sheet(df, ASSET_TEMPLATE_NETWORK_SHEET, progress_callback)
+                if network_flow_error_index:
+                    LOG.error(f"import network flow failed, error row number:{network_flow_error_index}")
+                    raise Fail("import network flow data error", params={"sheet": ASSET_TEMPLATE_NETWORK_SHEET, "error_rows": network_flow_error_index}, error_message=f"导入网络设备出入口配置失败, sheet[network]页错误行号:{network_flow_error_index}")
+        finally:
+            # 资产数据变化 更新库存版本 导入失败时也可能已经写入了部分数据
+            assets_export_service.bump_inventory_version()
+
+
+    # 导入资产sheet页 返回错误行号列表
+    def import_asset_sheet(self, df, asset_category, default_asset_type_id, sheet_columns, str_basic, sheet_name, progress_callback=None):
+        # 忽略整行为空的数据 保留原始行号
+        df = df.dropna(how="all")
+        # 总行数
+        total = len(df)
+        if total == 0:
+            return []
+        # 模板中必须存在的列 缺少时所有行都无法导入
+        required_columns = [column for group, columns in sheet_columns.items()
+                            if group != "optional" and group not in sheet_columns["optional"] for column in columns.values()]
+        missing_columns = [column for column in required_columns if column not in df.columns]
+        if missing_columns:
+            LOG.error(f"import {asset_category} failed, missing columns:{missing_columns}")
+            return [index + 2 for index in df.index]
+        # 错误行号 excel中第一行是表头
+        error_index = set()
+        # 1、向量化解析和校验
+        # 购买日期统一转换 无法解析的日期记为错误行
+        purchase_date_column = asset_contract_info_columns["purchase_date"]
+        if purchase_date_column in df.columns:
+            purchase_dates = pd.to_datetime(df[purchase_date_column], errors="coerce")
+            error_index.update(index + 2 for index in df.index[df[purchase_date_column].notna() & purchase_dates.isna()])
+            df[purchase_date_column] = purchase_dates
+        # 网络设备的基础信息按照字符串导入
+        if str_basic:
+            for column in sheet_columns["basic"].values():
+                df[column] = df[column].astype(str).where(df[column].notna(), None)
+        # nan统一转换成None 按行转换成dict
+        records = df.astype(object).where(df.notna(), None).to_dict("records")
+        # 2、预加载资产类型、厂商、已存在的资产名称和编号
+        asset_type_list = asset_type_cache.list_asset_type()
+        asset_type_name_dict = {asset_type.asset_type_name: asset_type for asset_type in asset_type_list}
+        asset_type_id_dict = {asset_type.id: asset_type for asset_type in asset_type_list}
+        # 已存在的资产名称以及名称和编号的组合
+        name_column = sheet_columns["basic"]["asset_name"]
+        asset_names = [format_excel_key(record.get(name_column)) or "Default" for record in records]
+        existing_names = set()
+        existing_name_numbers = set()
+        for asset_db in AssetSQL.list_asset_basic_info_by_names(asset_names):
+            existing_names.add(format_excel_key(asset_db.name))
+            existing_name_numbers.add((format_excel_key(asset_db.name), format_excel_key(asset_db.asset_number)))
+        # 3、按行组装数据
+        create_date = datetime.fromtimestamp(datetime.now().timestamp())
+        # 厂商 已存在的从缓存中查询 不存在的预先生成id 与引用它的资产在同一个事务中创建
+        manufacture_column = sheet_columns["manufacture"]["name"]
+        manufacture_names = [format_excel_key(record.get(manufacture_column)) for record in records if record.get(manufacture_column) is not None]
+        manufacture_dict, new_manufactures = manufacture_cache.resolve_manufactures_by_names(manufacture_names, create_date)
+        asset_bundles = []
+        for index, record in zip(df.index, records):
+            # 已经校验失败的行
+            if index + 2 in error_index:
+                continue
+            try:
+                asset_bundle = self.convert_asset_record(record, asset_category, default_asset_type_id, sheet_columns,
+                                                         asset_type_name_dict, asset_type_id_dict, existing_names,
+                                                         existing_name_numbers, manufacture_dict, create_date)
+                asset_bundle["row_number"] = index + 2
+                asset_bundles.append(asset_bundle)
+            except Exception as e:
+                LOG.error(f"import {asset_category} failed, error row number:{index + 2}, error:{e}")
+                error_index.add(index + 2)
+        # 4、分批保存资产数据
+        created_bundles = self.create_bundles_in_chunks(asset_bundles, asset_import_models, error_index, total, sheet_name, progress_callback,
+                                                        {manufacture["id"]: manufacture for manufacture in new_manufactures})
+        # 5、批量记录操作日志
+        try:
+            system_service.create_system_logs([OperateLogApiModel(operate_type="create", resource_type="asset", resource_id=asset_bundle["asset_id"],
+                                                                  resource_name=asset_bundle["asset_name"], operate_flag=True)
+                                               for asset_bundle in created_bundles])
+        except Exception as e:
+            LOG.error(f"import {asset_category} create operate log failed, error:{e}")
+        # 返回错误行号
+        return sorted(error_index)
+
+
+    # excel中的一行资产数据转换成各个表的插入数据
+    def convert_asset_record(self, record, asset_category, default_asset_type_id, sheet_columns, asset_type_name_dict,
+                             asset_type_id_dict, existing_names, existing_name_numbers, manufacture_dict, create_date):
+        # 资产id
+        asset_id = uuid.uuid4().hex
+        # 基础信息
+        basic_values = {key: record.get(column) for key, column in sheet_columns["basic"].items() if record.get(column) is not None}
+        asset_name = basic_values.get("asset_name", "Default")
+        # 重设资产设备分类类型 按照 大类_类型 的名称匹配
+        asset_type_id = default_asset_type_id
+        if basic_values.get("asset_type"):
+            asset_type_db = asset_type_name_dict.get(asset_category + "_" + str(basic_values["asset_type"]))
+            if asset_type_db:
+                asset_type_id = asset_type_db.id
+        asset_type_db = asset_type_id_dict.get(asset_type_id)
+        if not asset_type_db:
+            raise Fail("asset type not exists", error_message="资产类型不存在")
+        # 重名校验 包含数据库中已存在的和当前文件中之前的行
+        name_key = format_excel_key(asset_name)
+        number_key = format_excel_key(basic_values.get("asset_number"))
+        if (number_key is None and name_key in existing_names) or (number_key is not None and (name_key, number_key) in existing_name_numbers):
+            raise Fail("asset exists", error_message="资产名称或编号重复")
+        # 扩展信息
+        extra = {key: record.get(column) for key, column in sheet_columns["extra"].items() if record.get(column) is not None}
+        extra = json.dumps(extra) if extra else None
+        # 合同信息 购买日期与页面创建保持一致的转换方式
+        purchase_date = record.get(sheet_columns["contract"]["purchase_date"])
+        if purchase_date is not None:
+            purchase_date = datetime.fromtimestamp(int(purchase_date.timestamp() * 1000) / 1000)
+        # 数据组装
+        mappings = {
+            AssetBasicInfo: [{"id": asset_id, "asset_type_id": asset_type_id,
+                              "asset_category": asset_type_db.asset_type_name.split("_")[0],
+                              "asset_type": asset_type_db.asset_type_name, "name": asset_name,
+                              "description": basic_values.get("asset_description"),
+                              "equipment_number": basic_values.get("equipment_number"),
+                              "sn_number": basic_values.get("sn_number"), "asset_number": basic_values.get("asset_number"),
+                              "asset_status": "0", "asset_status_description": None, "create_date": create_date,
+                              "extra": extra, "extend_column_extra": None}],
+            AssetPositionsInfo: [{"id": uuid.uuid4().hex, "asset_id": asset_id, "frame_position": None,
+                                  "cabinet_position": self.get_record_value(record, sheet_columns["position"], "cabinet_position"),
+                                  "u_position": self.get_record_value(record, sheet_columns["position"], "u_position"),
+                                  "description": None}],
+            AssetContractsInfo: [{"id": uuid.uuid4().hex, "asset_id": asset_id,
+                                  "contract_number": self.get_record_value(record, sheet_columns["contract"], "contract_number"),
+                                  "purchase_date": purchase_date,
+                                  "batch_number": self.get_record_value(record, sheet_columns["contract"], "batch_number"),
+                                  "description": None}],
+            AssetBelongsInfo: [{"id": uuid.uuid4().hex, "asset_id": asset_id, "department_id": None,
+                                "department_name": self.get_record_value(record, sheet_columns["belong"], "department_name"),
+                                "user_id": None, "user_name": self.get_record_value(record, sheet_columns["belong"], "user_name"),
+                                "tel_number": None, "description": None}],
+            AssetCustomersInfo: [{"id": uuid.uuid4().hex, "asset_id": asset_id, "customer_id": None,
+                                  "customer_name": self.get_record_value(record, sheet_columns["customer"], "customer_name"),
+                                  "rental_duration": self.get_record_value(record, sheet_columns["customer"], "rental_duration"),
+                                  "start_date": None, "end_date": None, "vlan_id": None, "float_ip": None,
+                                  "band_width": None, "description": None}],
+        }
+        # 厂商信息 厂商已经预先创建 直接关联
+        manufacture_name = format_excel_key(record.get(sheet_columns["manufacture"]["name"]))
+        if manufacture_name and manufacture_name in manufacture_dict:
+            mappings[AssetManufactureRelationInfo] = [{"id": uuid.uuid4().hex, "asset_id": asset_id, "manufacture_id": manufacture_dict[manufacture_name]}]
+        # 记录已导入的名称和编号
+        existing_names.add(name_key)
+        existing_name_numbers.add((name_key, number_key))
+        # 返回
+        return {"asset_id": asset_id, "asset_name": asset_name, "mappings": mappings}
+
+
+    # 导入服务器配件sheet页 返回错误行号列表
+    def import_part_sheet(self, df, sheet_name, progress_callback=None):
+        # 忽略整行为空的数据 保留原始行号
+        df = df.dropna(how="all")
+        # 总行数
+        total = len(df)
+        if total == 0:
+            return []
+        # 模板中必须存在的列
+        asset_number_column = "资产编号"
+        required_columns = [asset_number_column] + list(asset_part_info_columns.values())
+        missing_columns = [column for column in required_columns if column not in df.columns]
+        if missing_columns:
+            LOG.error(f"import server part failed, missing columns:{missing_columns}")
+            return [index + 2 for index in df.index]
+        # 错误行号
+        error_index = set()
+        # nan统一转换成None 按行转换成dict
+        records = df.astype(object).where(df.notna(), None).to_dict("records")
+        # 预加载配件所属的资产 按照资产编号精准匹配
+        asset_numbers = [format_excel_key(record.get(asset_number_column)) for record in records if record.get(asset_number_column) is not None]
+        asset_number_dict = {}
+        for asset_db in AssetSQL.list_asset_basic_info_by_asset_numbers(asset_numbers):
+            asset_number_dict.setdefault(format_excel_key(asset_db.asset_number), asset_db)
+        # 按行组装数据 每一个非空的配件列都作为一个配件
+        create_date = datetime.fromtimestamp(datetime.now().timestamp())
+        part_bundles = []
+        for index, record in zip(df.index, records):
+            try:
+                asset_db = asset_number_dict.get(format_excel_key(record.get(asset_number_column)))
+                asset_id = asset_db.id if asset_db else None
+                asset_name = str(asset_db.name) if asset_db else ""
+                part_mappings = []
+                for part_key, part_column in asset_part_info_columns.items():
+                    # 判断excel的数据是非空
+                    if record.get(part_column) is None:
+                        continue
+                    part_mappings.append({"id": uuid.uuid4().hex, "asset_id": asset_id, "manufacturer_id": None,
+                                          "part_type_id": None, "part_type": part_key, "part_brand": None,
+                                          "part_config": record.get(part_column), "part_number": None,
+                                          "personal_used_flag": None, "surplus": None, "name": asset_name + "_" + part_key,
+                                          "create_date": create_date, "description": None, "extra": None})
+                if part_mappings:
+                    part_bundles.append({"row_number": index + 2, "mappings": {AssetPartsInfo: part_mappings}})
+            except Exception as e:
+                LOG.error(f"import server part failed, error row number:{index + 2}, error:{e}")
+                error_index.add(index + 2)
+        # 分批保存
+        self.create_bundles_in_chunks(part_bundles, (AssetPartsInfo,), error_index, total, sheet_name, progress_callback)
+        # 返回错误行号
+        return sorted(error_index)
+
+
+    # 导入网络设备流sheet页 返回错误行号列表
+    def import_flow_sheet(self, df, sheet_name, progress_callback=None):
+        # 忽略整行为空的数据 保留原始行号
+        df = df.dropna(how="all")
+        # 总行数
+        total = len(df)
+        if total == 0:
+            return []
+        # 模板中必须存在的列
+        missing_columns = [column for column in asset_network_flow_info_columns.values() if column not in df.columns]
+        if missing_columns:
+            LOG.error(f"import network flow failed, missing columns:{missing_columns}")
+            return [index + 2 for index in df.index]
+        # 错误行号
+        error_index = set()
+        # nan统一转换成None 按行转换成dict
+        records = df.astype(object).where(df.notna(), None).to_dict("records")
+        # 预加载网络设备 按照名称精准匹配
+        asset_name_column = asset_network_flow_info_columns["asset_name"]
+        opposite_asset_name_column = asset_network_flow_info_columns["opposite_asset_name"]
+        asset_names = [format_excel_key(record.get(column)) for record in records
+                       for column in (asset_name_column, opposite_asset_name_column) if record.get(column) is not None]
+        asset_name_dict = {}
+        for asset_db in AssetSQL.list_asset_basic_info_by_names(asset_names, "NETWORK"):
+            asset_name_dict.setdefault(format_excel_key(asset_db.name), asset_db.id)
+        # 按行组装数据
+        create_date = datetime.fromtimestamp(datetime.now().timestamp())
+        flow_bundles = []
+        for index, record in zip(df.index, records):
+            try:
+                # 端口必填
+                if record.get(asset_network_flow_info_columns["port"]) is None:
+                    raise Fail("asset flow is empty", error_message="网络流入流出端口是空")
+                flow_mapping = {"id": uuid.uuid4().hex,
+                                "asset_id": asset_name_dict.get(format_excel_key(record.get(asset_name_column))),
+                                "opposite_asset_id": asset_name_dict.get(format_excel_key(record.get(opposite_asset_name_column))),
+                                "create_date": create_date, "extra": None}
+                for flow_key in asset_flow_import_keys:
+                    flow_mapping[flow_key] = record.get(asset_network_flow_info_columns[flow_key])
+                flow_bundles.append({"row_number": index + 2, "mappings": {AssetFlowsInfo: [flow_mapping]}})
+            except Exception as e:
+                LOG.error(f"import network flow failed, error row number:{index + 2}, error:{e}")
+                error_index.add(index + 2)
+        # 分批保存
+        self.create_bundles_in_chunks(flow_bundles, (AssetFlowsInfo,), error_index, total, sheet_name, progress_callback)
+        # 返回错误行号
+        return sorted(error_index)
+
+
+    # 分批保存组装好的数据 一批一个事务 批量失败时逐行保存定位错误行 返回保存成功的数据
+    # new_manufacture_dict是需要新建的厂商id到插入数据的字典 每批只创建本批资产关联的厂商
+    def create_bundles_in_chunks(self, bundles, models, error_index, total, sheet_name, progress_callback=None, new_manufacture_dict=None):
+        # 保存成功的数据
+        created_bundles = []
+        # 新建了厂商
+        manufacture_created = False
+        # 已经校验失败的行数
+        skipped = total - len(bundles)
+        # 没有需要保存的数据
+        if not bundles:
+            self.notify_progress(progress_callback, sheet_name, total, total)
+            return created_bundles
+        # 分批
+        for start in range(0, len(bundles), ASSET_IMPORT_CHUNK_SIZE):
+            chunk_bundles = bundles[start:start + ASSET_IMPORT_CHUNK_SIZE]
+            try:
+                manufacture_created |= self.create_bundle_mappings(chunk_bundles, models, new_manufacture_dict)
+                created_bundles.extend(chunk_bundles)
+            except Exception as e:
+                LOG.error(f"import sheet[{sheet_name}] chunk failed, retry row by row, error:{e}")
+                # 逐行保存 定位错误行
+                for bundle in chunk_bundles:
+                    try:
+                        manufacture_created |= self.create_bundle_mappings([bundle], models, new_manufacture_dict)
+                        created_bundles.append(bundle)
+                    except Exception as row_e:
+                        LOG.error(f"import sheet[{sheet_name}] failed, error row number:{bundle['row_number']}, error:{row_e}")
+                        error_index.add(bundle["row_number"])
+            # 通知进度
+            self.notify_progress(progress_callback, sheet_name, skipped + start + len(chunk_bundles), total)
+        # 有新建的厂商 缓存失效
+        if manufacture_created:
+            manufacture_cache.invalidate()
+        # 返回
+        return created_bundles
+
+    # 在一个事务中保存数据 关联了新厂商时加锁 与资产一起创建厂商 返回是否新建了厂商
+    def create_bundle_mappings(self, bundles, models, new_manufacture_dict):
+        model_mappings = self.group_bundle_mappings(bundles, models)
+        new_manufactures = []
+        if new_manufacture_dict:
+            manufacture_ids = {mapping["manufacture_id"] for model, mappings in model_mappings
+                               if model is AssetManufactureRelationInfo for mapping in mappings}
+            new_manufactures = [new_manufacture_dict[manufacture_id] for manufacture_id in manufacture_ids if manufacture_id in new_manufacture_dict]
+        if not new_manufactures:
+            AssetSQL.create_asset_mappings(model_mappings)
+            return False
+        with manufacture_cache.upsert_locked():
+            return bool(AssetSQL.create_asset_mappings(model_mappings, new_manufactures))
+
+    # 按照表合并多行的插入数据
+    def group_bundle_mappings(self, bundles, models):
+        return [(model, [mapping for bundle in bundles for mapping in bundle["mappings"].get(model, [])]) for model in models]
+
+    # 读取excel行中对应列的值 模板中没有该列时返回None
+    def get_record_value(self, record, columns, key):
+        # 列不存在
+        if key not in columns:
+            return None
+        return record.get(columns[key])
+
+    # 通知导入进度
+    def notify_progress(self, progress_callback, sheet_name, processed, total):
+        # 没有回调
+        if progress_callback is None:
+            return
+        try:
+            progress_callback(sheet_name, processed, total)
+        except Exception as e:
+            LOG.error(f"import progress callback failed, error:{e}")
+
+
+# 资产异步导入任务的service 任务状态保存在redis中 进度通过websocket推送
+class AssetsImportJobService:
+
+    # 提交导入任务 立即返回任务id
+    def submit_import_job(self, asset_type, file_name, contents):
+        # 任务id
+        job_id = uuid.uuid4().hex
+        # 初始状态
+        job = {
+            "job_id": job_id,
+            "asset_type": asset_type,
+            "file_name": file_name,
+            "status": "pending",
+            "sheet": None,
+            "processed": 0,
+            "total": 0,
+            "error_sheet": None,
+            "error_rows": [],
+            "error_message": None,
+            "create_time": datetime.now().timestamp() * 1000,
+            "update_time": datetime.now().timestamp() * 1000,
+        }
+        self.save_import_job(job)
+        # 记录未结束的任务 启动心跳
+        with import_job_lock:
+            import_job_active_dict[job_id] = job
+        self.start_import_job_heartbeat()
+        # 提交到线程池执行
+        import_job_executor.submit(self.run_import_job, job, contents)
+        # 返回任务id
+        return job_id
+
+    # 执行导入任务
+    def run_import_job(self, job, contents):
+        try:
+            # 开始执行
+            job["status"] = "running"
+            self.save_import_job(job)
+            # 导入进度回调
+            def progress_callback(sheet_name, processed, total):
+                job["sheet"] = sheet_name
+                job["processed"] = processed
+                job["total"] = total
+                self.save_import_job(job)
+            # 批量导入
+            AssetsImportService().import_assets(job["asset_type"], BytesIO(contents), progress_callback)
+            # 导入成功
+            job["status"] = "success"
+        except Fail as e:
+            # 导入失败 记录错误行号
+            job["status"] = "failed"
+            job["error_message"] = e.error_message
+            if e.params:
+                job["error_sheet"] = e.params.get("sheet")
+                job["error_rows"] = e.params.get("error_rows", [])
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            job["status"] = "failed"
+            job["error_message"] = "导入文件失败"
+        # 保存最终状态 不再刷新心跳
+        with import_job_lock:
+            import_job_active_dict.pop(job["job_id"], None)
+        self.save_import_job(job)
+
+    # 启动心跳线程 已经启动时不重复启动
+    def start_import_job_heartbeat(self):
+        global import_job_heartbeat_thread
+        with import_job_lock:
+            if import_job_heartbeat_thread is not None and import_job_heartbeat_thread.is_alive():
+                return
+            import_job_heartbeat_thread = threading.Thread(target=self.run_import_job_heartbeat, name="asset_import_job_heartbeat", daemon=True)
+            import_job_heartbeat_thread.start()
+
+    # 心跳线程 定期刷新未结束任务的更新时间 没有未结束的任务时退出
+    def run_import_job_heartbeat(self):
+        global import_job_heartbeat_thread
+        while True:
+            time.sleep(ASSET_IMPORT_JOB_HEARTBEAT_SECONDS)
+            with import_job_lock:
+                job_list = list(import_job_active_dict.values())
+                if not job_list:
+                    import_job_heartbeat_thread = None
+                    return
+            for job in job_list:
+                # 心跳只保存状态 不发布进度消息
+                self.save_import_job(job, publish=False)
+
+    # 查询导入任务
+    def get_import_job(self, job_id):
+        # 判空
+        if not job_id:
+            return None
+        # 读取redis
+        job = redis_connection.get_redis_by_key(ASSET_IMPORT_JOB_REDIS_KEY_PREFIX + job_id)
+        if not job:
+            return None
+        job = json.loads(job)
+        # 未结束的任务长时间没有心跳 执行任务的进程已经退出 返回失败
+        if job["status"] in ("pending", "running") and \
+                datetime.now().timestamp() * 1000 - job["update_time"] > ASSET_IMPORT_JOB_STALE_SECONDS * 1000:
+            job["status"] = "failed"
+            job["error_message"] = "导入任务执行中断"
+        # 返回
+        return job
+
+    # 保存导入任务状态到redis 并发布进度消息
+    def save_import_job(self, job, publish=True):
+        try:
+            # 加锁 心跳线程与执行任务的线程按顺序写入
+            with import_job_lock:
+                job["update_time"] = datetime.now().timestamp() * 1000
+                message = json.dumps(job)
+                # 保存状态 到期自动删除
+                redis_connection.set_redis_by_key(ASSET_IMPORT_JOB_REDIS_KEY_PREFIX + job["job_id"], message, ASSET_IMPORT_JOB_EXPIRE_SECONDS)
+            # 发布进度消息
+            if publish:
+                redis_channel_service.publish_channel_message(websocket_type_channels["import_progress"], message)
+        except Exception as e:
+            LOG.error(f"save import job failed, job id:{job['job_id']}, error:{e}")
@@ -0,0 +1,91 @@
+# 大屏指标的并发采集 使用httpx的异步客户端并发查询prometheus
+# 采集在独立的事件循环线程中执行 客户端和连接池在多次采集之间复用
+import asyncio
+import threading
+
+import httpx
+from oslo_log import log
+
+from jobs import CONF
+from services.bigscreens import BigScreensService
+
+LOG = log.getLogger(__name__)
+
+# 通过 n9e 获取数据的指标
+N9E_METRICS_NAMES = ['alert_count', 'gpu_fallen_count']
+
+
+# 解析prometheus查询返回的数据 没有数据时返回0
+def parse_prometheus_value(json_response):
+    if json_response and json_response['status'] == 'success':
+        json_data_result = json_response['data']['result']
+        if json_data_result == []:
+            return 0
+        return json_data_result[0]['value'][1]
+    return None
+
+
+class BigScreenMetricsCollector:
+
+    def __init__(self):
+        # 事件循环以及所在的线程
+        self.loop = None
+        self.lock = threading.Lock()
+        # 异步客户端 在事件循环中创建
+        self.client = None
+
+    # 获取事件循环 第一次使用时启动线程
+    def get_loop(self):
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, name="bigscreen-metrics-collector", daemon=True).start()
+            return self.loop
+
+    # 获取异步客户端 连接池大小与并发数一致
+    def get_client(self):
+        if self.client is None:
+            max_concurrency = CONF.bigscreen.prometheus_max_concurrency
+            self.client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+                timeout=httpx.Timeout(CONF.bigscreen.prometheus_query_timeout, connect=CONF.bigscreen.prometheus_connect_timeout))
+        return self.client
+
+    # 采集指标 使用已经加载的指标配置 返回指标名称到数据的字典 查询失败的指标数据是None
+    def collect(self, metrics_configs):
+        future = asyncio.run_coroutine_threadsafe(self.collect_async(metrics_configs), self.get_loop())
+        return future.result()
+
+    async def collect_async(self, metrics_configs):
+        semaphore = asyncio.Semaphore(CONF.bigscreen.prometheus_max_concurrency)
+        values = await asyncio.gather(*[self.fetch_metrics(metrics_config, semaphore) for metrics_config in metrics_configs])
+        return {metrics_config.name: value for metrics_config, value in zip(metrics_configs, values)}
+
+    # 查询单个指标
+    async def fetch_metrics(self, metrics_config, semaphore):
+        async with semaphore:
+            try:
+                # 通过 n9e 获取数据 同步请求放到线程中执行
+                if metrics_config.name in N9E_METRICS_NAMES:
+                    return await asyncio.to_thread(BigScreensService.fetch_n9e_metrics, metrics_config.name)
+                # 通过 prometheus 获取数据
+                response = await self.get_client().get(CONF.bigscreen.prometheus_query_url + "query", params={"query": metrics_config.query})
+                return parse_prometheus_value(response.json())
+            except Exception as e:
+                LOG.error(f"采集大屏指标失败: {metrics_config.name}, {e!r}")
+                return None
+
+    # 关闭客户端并停止事件循环
+    def close(self):
+        with self.lock:
+            if self.loop is None:
+                return
+            if self.client is not None:
+                asyncio.run_coroutine_threadsafe(self.client.aclose(), self.loop).result()
+                self.client = None
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop = None
+
+
+# 声明大屏指标采集器
+bigscreen_metrics_collector = BigScreenMetricsCollector()
@@ -0,0 +1,124 @@
+# 大屏指标的历史数据 每次采集追加1分钟的数据 定期汇总成5分钟和1小时的数据 按照分辨率清理过期数据
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from jobs import CONF
+from db.models.bigscreen.sql import BigscreenSQL
+
+# 分辨率(秒)以及对应的名称
+RESOLUTION_1M = 60
+RESOLUTION_5M = 300
+RESOLUTION_1H = 3600
+resolution_names = OrderedDict([(RESOLUTION_1M, "1m"), (RESOLUTION_5M, "5m"), (RESOLUTION_1H, "1h")])
+
+# 汇总关系 目标分辨率、来源分辨率以及每次重新汇总的时间段数量(包含当前未结束的时间段)
+rollup_rules = [
+    (RESOLUTION_5M, RESOLUTION_1M, 3),
+    (RESOLUTION_1H, RESOLUTION_5M, 2),
+]
+
+
+# 按照分辨率对齐时间 返回时间段的开始时间
+def align_bucket_time(time, resolution):
+    return datetime.fromtimestamp(int(time.timestamp()) // resolution * resolution)
+
+
+# 指标数据转换成数字 不是数字的数据不保存历史
+def convert_history_value(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class BigScreenMetricsHistoryService:
+
+    # 分辨率的数据保留天数
+    @classmethod
+    def get_retention_days(cls, resolution):
+        return {
+            RESOLUTION_1M: CONF.bigscreen.metrics_history_retention_1m_days,
+            RESOLUTION_5M: CONF.bigscreen.metrics_history_retention_5m_days,
+            RESOLUTION_1H: CONF.bigscreen.metrics_history_retention_1h_days,
+        }[resolution]
+
+    # 追加一次采集的数据 地区到指标数据的字典 写入1分钟的时间段 1分钟内多次采集时保留最后一次
+    @classmethod
+    def append_samples(cls, region_metrics_dict, sample_time):
+        bucket_time = align_bucket_time(sample_time, RESOLUTION_1M)
+        history_list = []
+        for region, metrics_dict in region_metrics_dict.items():
+            for name, data in metrics_dict.items():
+                value = convert_history_value(data)
+                if value is None:
+                    continue
+                history_list.append({"name": name, "region": region or "", "resolution": RESOLUTION_1M, "bucket_time": bucket_time,
+                                     "value_avg": value, "value_min": value, "value_max": value, "sample_count": 1})
+        BigscreenSQL.upsert_bigscreen_metrics_history(history_list)
+
+    # 汇总最近的数据 每次从来源分辨率重新计算最近几个时间段 重复执行结果不变
+    @classmethod
+    def rollup(cls, now=None):
+        now = now or datetime.now()
+        for resolution, source_resolution, bucket_count in rollup_rules:
+            start_time = align_bucket_time(now, resolution) - timedelta(seconds=resolution * (bucket_count - 1))
+            source_list = BigscreenSQL.list_bigscreen_metrics_history(source_resolution, start_time, now + timedelta(seconds=resolution))
+            # 按照指标、地区和目标时间段分组
+            bucket_dict = {}
+            for source in source_list:
+                if source.value_avg is None:
+                    continue
+                key = (source.name, source.region, align_bucket_time(source.bucket_time, resolution))
+                bucket = bucket_dict.get(key)
+                if bucket is None:
+                    bucket_dict[key] = {"total": source.value_avg * source.sample_count, "value_min": source.value_min,
+                                        "value_max": source.value_max, "sample_count": source.sample_count}
+                else:
+                    bucket["total"] += source.value_avg * source.sample_count
+                    bucket["value_min"] = min(bucket["value_min"], source.value_min)
+                    bucket["value_max"] = max(bucket["value_max"], source.value_max)
+                    bucket["sample_count"] += source.sample_count
+            # 按照采样次数加权平均
+            BigscreenSQL.upsert_bigscreen_metrics_history([
+                {"name": name, "region": region, "resolution": resolution, "bucket_time": bucket_time,
+                 "value_avg": bucket["total"] / bucket["sample_count"], "value_min": bucket["value_min"],
+                 "value_max": bucket["value_max"], "sample_count": bucket["sample_count"]}
+                for (name, region, bucket_time), bucket in bucket_dict.items()])
+
+    # 清理过期的数据 返回每个分辨率删除的数量
+    @classmethod
+    def purge(cls, now=None):
+        now = now or datetime.now()
+        return {resolution_name: BigscreenSQL.delete_bigscreen_metrics_history(resolution, now - timedelta(days=cls.get_retention_days(resolution)))
+                for resolution, resolution_name in resolution_names.items()}
+
+    # 选择分辨率 未指定时使用数据仍在保留期内且点数不超过上限的最细分辨率
+    @classmethod
+    def choose_resolution(cls, start_time, end_time, now):
+        for resolution in resolution_names:
+            if start_time < now - timedelta(days=cls.get_retention_days(resolution)):
+                continue
+            if (end_time - start_time).total_seconds() / resolution <= CONF.bigscreen.metrics_history_max_points:
+                return resolution
+        return RESOLUTION_1H
+
+    # 查询历史数据 返回分辨率以及指标名称到[时间戳(毫秒), 平均值, 最小值, 最大值]列表的字典
+    @classmethod
+    def query_history(cls, names, region, start_time=None, end_time=None, resolution_name=None):
+        now = datetime.now()
+        end_time = end_time or now
+        start_time = start_time or end_time - timedelta(days=7)
+        if resolution_name:
+            resolution = {name: resolution for resolution, name in resolution_names.items()}[resolution_name]
+        else:
+            resolution = cls.choose_resolution(start_time, end_time, now)
+        # 未指定地区时查询本地区的数据
+        if region is None:
+            region = CONF.DEFAULT.region_name
+        data = {name: [] for name in names}
+        for history in BigscreenSQL.list_bigscreen_metrics_history(resolution, align_bucket_time(start_time, resolution), end_time,
+                                                                   names, region or ""):
+            data[history.name].append([int(history.bucket_time.timestamp() * 1000), history.value_avg, history.value_min, history.value_max])
+        return {"resolution": resolution_names[resolution], "data": data}
@@ -1,21 +1,19 @@
 # 大屏的service层
 import json
 import urllib
-import uuid
 
 import requests
-from pymemcache.client.base import Client
 from jobs import CONF
 
-from db.models.bigscreen.models import BigscreenMetricsConfig, BigscreenMetrics
+from db.models.bigscreen.models import BigscreenMetricsConfig
 from db.models.bigscreen.sql import BigscreenSQL
+from services.bigscreen_history import BigScreenMetricsHistoryService
+from services.memcached_client import memcached_client
+from services.nightingale_client import nightingale_client
 from utils import datetime
 
 prometheus_query_url = CONF.bigscreen.prometheus_query_url
 region_name = CONF.DEFAULT.region_name
-nightingale_base_url = CONF.bigscreen.nightingale_base_url
-nightingale_username = CONF.bigscreen.nightingale_username
-nightingale_password = CONF.bigscreen.nightingale_password
 
 class BigScreensService:
     @classmethod
@@ -37,17 +35,14 @@ class BigScreensService:
                 return None
             # 通过get请求读取实时监控数据 指标项的查询语句 + / 需要转义
             request_url = prometheus_query_url + "query?query=" + urllib.parse.quote(query)
-            response = requests.get(request_url)
+            response = requests.get(request_url, timeout=(CONF.bigscreen.prometheus_connect_timeout, CONF.bigscreen.prometheus_query_timeout))
             return self.__handle_response(response)
 
         # 通过 memcached 和 mysql 获取数据
-        memcached_client = Client((CONF.bigscreen.memcached_address), timeout=1)
         try:
             memcached_metrics = memcached_client.get(f'{CONF.bigscreen.memcached_key_prefix}{name}')
-            print(f"memcached_metrics: {name} -> {memcached_metrics.decode()}")
-            if memcached_metrics:
-                print("fetch data from cache")
-                return memcached_metrics.decode()
+            if memcached_metrics is not None:
+                return memcached_metrics.decode() if isinstance(memcached_metrics, bytes) else memcached_metrics
         except Exception as e:
             print("fetch data from cache failed")
 
@@ -55,11 +50,45 @@ class BigScreensService:
             region = region_name
         bigscreen_metrics = BigscreenSQL.get_bigscreen_metrics_by_name_and_region(name, region)
         if bigscreen_metrics:
-            print("fetch data from db")
             return bigscreen_metrics.data
         else:
             return None
 
+    # 批量获取大屏指标数据 一次memcached的get_many 未命中的指标一次数据库查询 返回指标名称到数据的字典
+    @classmethod
+    def get_bigscreen_metrics_batch(self, names, sub_class, region):
+        # 指标名称 指定的名称加上分类下的名称 去重后保持顺序
+        metrics_names = list(names or [])
+        if sub_class:
+            metrics_names.extend(BigscreenSQL.list_bigscreen_metrics_config_names_by_sub_class(sub_class))
+        metrics_names = list(dict.fromkeys(metrics_names))
+        result = dict.fromkeys(metrics_names)
+        # 通过 n9e 获取数据
+        for name in metrics_names:
+            if name in ['alert_count', 'gpu_fallen_count']:
+                result[name] = self.fetch_n9e_metrics(name)
+        missing_names = [name for name in metrics_names if name not in ['alert_count', 'gpu_fallen_count']]
+        if not missing_names:
+            return result
+
+        # 通过 memcached 批量获取数据
+        key_prefix = CONF.bigscreen.memcached_key_prefix
+        try:
+            memcached_metrics = memcached_client.get_many([f'{key_prefix}{name}' for name in missing_names])
+            for key, value in memcached_metrics.items():
+                if value is not None:
+                    result[key[len(key_prefix):]] = value.decode() if isinstance(value, bytes) else value
+        except Exception as e:
+            print(f"fetch batch data from cache failed: {e}")
+
+        # 缓存未命中的指标 通过 mysql 一次查询
+        missing_names = [name for name in missing_names if result[name] is None]
+        if region == None:
+            region = region_name
+        for bigscreen_metrics in BigscreenSQL.list_bigscreen_metrics_by_names_and_region(missing_names, region):
+            result[bigscreen_metrics.name] = bigscreen_metrics.data
+        return result
+
     # 解析接口返回的数据
     @classmethod
     def __handle_response(self, response):
@@ -75,105 +104,31 @@ class BigScreensService:
         except Exception as e:
             raise e
 
-    @classmethod
-    def fetch_metrics_with_promql(self, promql, query_range=False, start_time=None, end_time=None, step=None):
-        if query_range:
-            request_url = prometheus_query_url + "query_range?query=" + urllib.parse.quote(promql)
-            start_time = datetime.change_to_utc_time_and_format(start_time)
-            request_url = request_url + "&start=" + start_time
-            if end_time:
-                end_time = datetime.change_to_utc_time_and_format(end_time)
-            else:
-                end_time = datetime.get_now_time_in_timestamp_format()
-            request_url = request_url + "&end=" + end_time
-            if step:
-                request_url = request_url + "&step=" + step
-        else:
-            request_url = prometheus_query_url + "query?query=" + urllib.parse.quote(promql)
-
-        print(f"bigscreen_prom_request_url: {request_url}")
-        response = requests.get(request_url)
-        return response.json()
-
+    # 本地区的指标数据写入数据库
     @classmethod
     def batch_upgrade_metrics_data(self, metrics_dict):
-        for name, data in metrics_dict.items():
-            metrics = BigscreenSQL.get_bigscreen_metrics_by_name_and_region(name, region_name)
-            if metrics:
-                metrics.data = data
-                metrics.last_modified = datetime.get_now_time()
-                BigscreenSQL.update_bigscreen_metrics(metrics)
-            else:
-                metrics = BigscreenMetrics(
-                    id = uuid.uuid4().hex,
-                    name = name,
-                    data = data,
-                    region = region_name,
-                    last_modified = datetime.get_now_time()
-                )
-                BigscreenSQL.create_bigscreen_metrics(metrics)
-
+        self.batch_upgrade_metrics_data_by_region(metrics_dict, region_name)
 
+    # 指定地区的指标数据写入数据库
     @classmethod
     def batch_upgrade_metrics_data_by_region(self, metrics_dict, specify_region):
-        # 遍历
-        for name, data in metrics_dict.items():
-            metrics = BigscreenSQL.get_bigscreen_metrics_by_name_and_region(name, specify_region)
-            if metrics:
-                metrics.data = data
-                metrics.last_modified = datetime.get_now_time()
-                BigscreenSQL.update_bigscreen_metrics(metrics)
-            else:
-                metrics = BigscreenMetrics(
-                    id = uuid.uuid4().hex,
-                    name = name,
-                    data = data,
-                    region = specify_region,
-                    last_modified = datetime.get_now_time()
-                )
-                BigscreenSQL.create_bigscreen_metrics(metrics)
+        self.batch_upgrade_metrics_data_by_regions({specify_region: metrics_dict})
 
+    # 多个地区的指标数据写入数据库 一条语句批量更新或者插入 地区到指标数据的字典
     @classmethod
-    def fetch_n9e_metrics(self, name):
-        access_token = self.login_n9e()
-        if access_token:
-            headers = {
-                "Authorization": f"Bearer {access_token}"
-            }
-            if name == 'alert_count':
-                url = nightingale_base_url + "/api/n9e/alert-cur-events/list"
-                response = requests.get(url, headers=headers)
-
-                if response.status_code == 200:
-                    data = response.json()
-                    return data['dat']['total']
-                else:
-                    print(f"获取告警数失败: {response}")
-            if name == 'gpu_fallen_count':
-                url = nightingale_base_url + "/api/n9e/alert-cur-events/list"
-                params = {"query": "掉卡"}
-                response = requests.get(url, headers=headers, params=params)
-
-                if response.status_code == 200:
-                    data = response.json()
-                    return data['dat']['total']
-                else:
-                    print(f"获取掉卡数失败: {response}")
+    def batch_upgrade_metrics_data_by_regions(self, region_metrics_dict):
+        last_modified = datetime.get_now_time()
+        BigscreenSQL.upsert_bigscreen_metrics([{"name": name, "data": data, "region": specify_region, "last_modified": last_modified}
+                                               for specify_region, metrics_dict in region_metrics_dict.items()
+                                               for name, data in metrics_dict.items()])
+        # 追加到历史数据 历史数据写入失败不影响当前数据
+        try:
+            BigScreenMetricsHistoryService.append_samples(region_metrics_dict, last_modified)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
 
+    # 夜莺的告警数和掉卡数 两个指标共享一次告警列表查询
     @classmethod
-    def login_n9e(self):
-        login_url = nightingale_base_url + "/api/n9e/auth/login"
-        login_payload = {
-            "username": nightingale_username,
-            "password": nightingale_password
-        }
-        login_response = requests.post(login_url, json=login_payload)
-
-        if login_response.status_code == 200:
-            login_data = login_response.json()
-            access_token = login_data["dat"]["access_token"]
-            return access_token
-        else:
-            print(f"夜莺登录失败: {login_response}")
-            return None
-
+    def fetch_n9e_metrics(self, name):
+        return nightingale_client.get_alert_counts().get(name)
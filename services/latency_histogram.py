@@ -0,0 +1,39 @@
+# 操作耗时的延迟直方图 memcached客户端以及mq的发送和消费共用
+import bisect
+import threading
+
+# 延迟统计的分桶上限(毫秒)
+LATENCY_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, float("inf"))
+
+
+# 延迟直方图 按照操作统计次数、总耗时以及各个分桶的次数
+class LatencyHistogram:
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.operations = {}
+
+    # 记录一次操作的耗时
+    def record(self, operation, seconds):
+        milliseconds = seconds * 1000
+        with self.lock:
+            stats = self.operations.setdefault(operation, {"count": 0, "sum_ms": 0.0, "bucket_counts": [0] * len(self.buckets)})
+            stats["count"] += 1
+            stats["sum_ms"] += milliseconds
+            stats["bucket_counts"][bisect.bisect_left(self.buckets, milliseconds)] += 1
+
+    # 查询统计 分桶的次数是累计值 与prometheus的直方图一致
+    def snapshot(self):
+        with self.lock:
+            res = {}
+            for operation, stats in self.operations.items():
+                cumulative_count = 0
+                buckets = {}
+                for bucket, bucket_count in zip(self.buckets, stats["bucket_counts"]):
+                    cumulative_count += bucket_count
+                    buckets["+Inf" if bucket == float("inf") else str(bucket)] = cumulative_count
+                res[operation] = {"count": stats["count"], "sum_ms": round(stats["sum_ms"], 3),
+                                  "avg_ms": round(stats["sum_ms"] / stats["count"], 3) if stats["count"] else 0,
+                                  "buckets": buckets}
+            return res
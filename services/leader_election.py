@@ -0,0 +1,129 @@
+# 定时任务的选主 多个worker以及多个副本中只有一个进程执行任务
+# redis: 带过期时间的锁作为租约 主定期续约 主退出或者续约失败后租约到期 其他进程竞选成为新的主
+# file: 单机部署时使用文件锁 持有锁的进程退出后操作系统自动释放
+# 写入数据前校验仍然持有租约 只能缩小旧的主继续写入的时间窗口 不能完全避免
+# 同步任务写入的是每个指标最新的数据 旧的主写入的数据会被新的主下一次采集覆盖
+import fcntl
+import os
+import socket
+import threading
+import time
+import uuid
+
+from oslo_log import log
+from redis.exceptions import LockError
+
+from jobs import CONF
+from services.redis_connection import redis_connection
+from utils.constant import BIGSCREEN_SYNCER_LEADER_REDIS_KEY_PREFIX
+
+LOG = log.getLogger(__name__)
+
+
+class LeaderElection:
+
+    def __init__(self, name, on_elected=None):
+        # 租约的redis的key
+        self.lock_key = f"{BIGSCREEN_SYNCER_LEADER_REDIS_KEY_PREFIX}{name}"
+        # 当前进程的标识 保存在锁中 便于排查是哪个进程在执行任务
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # 成为主之后的回调
+        self.on_elected = on_elected
+        # redis的锁或者文件锁
+        self.lock = None
+        self.lock_file = None
+        # 是否持有租约
+        self.leader = False
+        # 租约在本地的到期时间 续约失败时到期后不再认为自己是主
+        self.lease_deadline = 0
+        self.mutex = threading.Lock()
+
+    # 是否是主
+    def is_leader(self):
+        return self.leader and time.monotonic() < self.lease_deadline
+
+    # 竞选或者续约 定期执行 返回是否是主
+    def campaign(self):
+        with self.mutex:
+            was_leader = self.is_leader()
+            # 以请求前的时间计算本地的到期时间 比redis中的到期时间早
+            campaign_time = time.monotonic()
+            try:
+                if CONF.bigscreen.leader_election_backend == "file":
+                    leader = self.campaign_file()
+                else:
+                    leader = self.campaign_redis()
+            except Exception as e:
+                # 无法访问redis时保持当前状态 租约到期后不再是主
+                LOG.error(f"定时任务选主失败: {e}")
+                return self.is_leader()
+            self.leader = leader
+            if not leader:
+                return False
+            self.lease_deadline = campaign_time + CONF.bigscreen.leader_election_lease_seconds
+        # 新选出的主
+        if not was_leader:
+            LOG.info(f"定时任务选主成功: {self.holder_id}")
+            if self.on_elected:
+                self.on_elected()
+        return True
+
+    # redis 续约 没有锁或者锁已经被其他进程持有时竞选
+    def campaign_redis(self):
+        if self.lock is not None:
+            try:
+                self.lock.reacquire()
+                return True
+            except LockError:
+                LOG.warning(f"定时任务的租约已经失效: {self.holder_id}")
+                self.lock = None
+        lock = redis_connection.redis_connection.lock(self.lock_key, timeout=CONF.bigscreen.leader_election_lease_seconds,
+                                                      thread_local=False)
+        if not lock.acquire(blocking=False, token=self.holder_id):
+            return False
+        self.lock = lock
+        return True
+
+    # 文件锁 持有期间一直是主 锁文件中保存当前进程的标识
+    def campaign_file(self):
+        if self.lock_file is not None:
+            return True
+        lock_file = open(CONF.bigscreen.leader_election_lock_file, "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(self.holder_id)
+        lock_file.flush()
+        self.lock_file = lock_file
+        return True
+
+    # 写入数据前校验 redis中的锁仍然属于当前进程 校验之后到写入之前租约仍然可能失效
+    def validate(self):
+        if not self.is_leader():
+            return False
+        if self.lock is None:
+            return True
+        try:
+            return self.lock.owned()
+        except Exception as e:
+            LOG.error(f"校验定时任务的租约失败: {e}")
+            return False
+
+    # 主动退出 其他进程不需要等待租约到期
+    def resign(self):
+        with self.mutex:
+            self.leader = False
+            if self.lock is not None:
+                try:
+                    self.lock.release()
+                except Exception as e:
+                    LOG.error(f"释放定时任务的租约失败: {e}")
+                self.lock = None
+            if self.lock_file is not None:
+                fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+                self.lock_file.close()
+                self.lock_file = None
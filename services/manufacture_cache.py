@@ -0,0 +1,219 @@
+# 资产厂商的进程内缓存 保存厂商名称和id的索引 按照版本号失效
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+from oslo_log import log
+
+from db.models.asset.sql import AssetSQL
+from services.redis_connection import redis_connection
+from utils.constant import MANUFACTURE_VERSION_REDIS_KEY, MANUFACTURE_CACHE_CHECK_SECONDS, MANUFACTURE_CACHE_MAX_SIZE, \
+    MANUFACTURE_UPSERT_LOCK_REDIS_KEY, MANUFACTURE_UPSERT_LOCK_TIMEOUT_SECONDS
+
+LOG = log.getLogger(__name__)
+
+# 缓存中的厂商 只保存id和名称
+ManufactureIndexItem = namedtuple("ManufactureIndexItem", ["id", "name"])
+
+
+# 厂商索引 id到厂商以及名称到id 超过最大数量时淘汰最久未使用的厂商
+class ManufactureIndex:
+
+    def __init__(self, manufacture_list, version, max_size):
+        # 加载时的版本以及最近一次检查版本的时间
+        self.version = version
+        self.checked_time = time.time()
+        self.max_size = max_size
+        # 全部厂商都已加载时 索引中不存在的名称就是数据库中不存在
+        self.complete = len(manufacture_list) <= max_size
+        # id到厂商
+        self.id_dict = OrderedDict()
+        # 名称到id
+        self.name_dict = OrderedDict()
+        for manufacture_id, manufacture_name in manufacture_list[:max_size]:
+            self.add(manufacture_id, manufacture_name)
+
+    # 加入索引 名称重复时取第一个 与数据库first()一致
+    def add(self, manufacture_id, manufacture_name):
+        item = self.id_dict.get(manufacture_id)
+        if item is None:
+            item = ManufactureIndexItem(manufacture_id, manufacture_name)
+            self.id_dict[manufacture_id] = item
+        if manufacture_name is not None:
+            self.name_dict.setdefault(manufacture_name, manufacture_id)
+        # 超过最大数量 淘汰最久未使用的厂商 之后索引不再完整
+        while len(self.id_dict) > self.max_size:
+            _, old_item = self.id_dict.popitem(last=False)
+            if self.name_dict.get(old_item.name) == old_item.id:
+                del self.name_dict[old_item.name]
+            self.complete = False
+        return item
+
+    # 根据id查询 未命中返回None
+    def get_by_id(self, manufacture_id):
+        item = self.id_dict.get(manufacture_id)
+        if item is not None:
+            self.id_dict.move_to_end(manufacture_id)
+        return item
+
+    # 根据名称查询 未命中返回None
+    def get_by_name(self, manufacture_name):
+        manufacture_id = self.name_dict.get(manufacture_name)
+        return self.get_by_id(manufacture_id) if manufacture_id is not None else None
+
+
+# 资产厂商缓存 每个进程一份 厂商变化时更新redis中的版本 其他进程定期检查版本后重新加载
+class ManufactureCache:
+
+    def __init__(self, max_size=MANUFACTURE_CACHE_MAX_SIZE):
+        # 当前的索引 None表示缓存是冷的
+        self.index = None
+        self.max_size = max_size
+        # 加载锁 避免并发时重复加载
+        self.lock = threading.Lock()
+        # 创建锁 同一个进程内按名称创建厂商时串行执行
+        self.upsert_lock = threading.Lock()
+
+    # 获取索引
+    def get_index(self):
+        index = self.index
+        # 定期检查版本 版本变化或者无法读取版本时丢弃缓存
+        if index is not None and time.time() - index.checked_time >= MANUFACTURE_CACHE_CHECK_SECONDS:
+            version = self.get_version()
+            if version is None or version != index.version:
+                self.index = index = None
+            else:
+                index.checked_time = time.time()
+        # 缓存可用
+        if index is not None:
+            return index
+        # 加载
+        with self.lock:
+            if self.index is None:
+                # 先读版本再查数据 加载期间的修改会在下次检查时重新加载 多查一条用来判断是否全部加载
+                version = self.get_version()
+                self.index = ManufactureIndex(AssetSQL.list_manufacture_index(self.max_size + 1), version, self.max_size)
+            return self.index
+
+    # 厂商变化后调用 清空当前进程的缓存并更新版本
+    def invalidate(self):
+        self.index = None
+        try:
+            redis_connection.redis_connection.incr(MANUFACTURE_VERSION_REDIS_KEY)
+        except Exception as e:
+            LOG.error(f"更新资产厂商缓存版本失败: {e}")
+
+    # 查询版本 查询失败返回None
+    def get_version(self):
+        try:
+            version = redis_connection.redis_connection.get(MANUFACTURE_VERSION_REDIS_KEY)
+            return int(version) if version else 0
+        except Exception as e:
+            LOG.error(f"查询资产厂商缓存版本失败: {e}")
+            return None
+
+    # 根据id查询厂商 索引不完整且未命中时查询数据库
+    def get_manufacture_by_id(self, manufacture_id):
+        # 判空
+        if not manufacture_id:
+            return None
+        index = self.get_index()
+        item = index.get_by_id(manufacture_id)
+        if item is not None or index.complete:
+            return item
+        manufacture_db = AssetSQL.get_manufacture_by_id(manufacture_id)
+        return index.add(manufacture_db.id, manufacture_db.name) if manufacture_db else None
+
+    # 根据名称查询厂商 索引不完整且未命中时查询数据库
+    def get_manufacture_by_name(self, manufacture_name):
+        # 判空
+        if not manufacture_name:
+            return None
+        index = self.get_index()
+        item = index.get_by_name(manufacture_name)
+        if item is not None or index.complete:
+            return item
+        manufacture_db = AssetSQL.get_manufacture_by_name(manufacture_name)
+        return index.add(manufacture_db.id, manufacture_db.name) if manufacture_db else None
+
+    # 按名称创建厂商时加锁 进程内用线程锁 进程间用redis锁 获取redis锁失败时只用线程锁
+    @contextmanager
+    def upsert_locked(self):
+        with self.upsert_lock:
+            redis_lock = None
+            try:
+                redis_lock = redis_connection.redis_connection.lock(MANUFACTURE_UPSERT_LOCK_REDIS_KEY, timeout=MANUFACTURE_UPSERT_LOCK_TIMEOUT_SECONDS,
+                                                                    blocking_timeout=MANUFACTURE_UPSERT_LOCK_TIMEOUT_SECONDS)
+                if not redis_lock.acquire():
+                    redis_lock = None
+                    LOG.error("获取资产厂商创建锁超时")
+            except Exception as e:
+                redis_lock = None
+                LOG.error(f"获取资产厂商创建锁失败: {e}")
+            try:
+                yield
+            finally:
+                if redis_lock is not None:
+                    try:
+                        redis_lock.release()
+                    except Exception as e:
+                        LOG.error(f"释放资产厂商创建锁失败: {e}")
+
+    # 根据名称批量查询厂商 不创建 返回名称到id的字典以及不存在的厂商的插入数据(预先生成id) 由调用方与资产在同一个事务中创建
+    def resolve_manufactures_by_names(self, manufacture_names, create_date=None):
+        # 名称去重 去掉空名称
+        manufacture_names = [manufacture_name for manufacture_name in dict.fromkeys(manufacture_names) if manufacture_name]
+        # 先从缓存中查询 缓存不完整时未命中的名称查询数据库
+        index = self.get_index()
+        manufacture_dict = {}
+        for manufacture_name in manufacture_names:
+            item = index.get_by_name(manufacture_name)
+            if item is not None:
+                manufacture_dict[manufacture_name] = item.id
+        missing_names = [manufacture_name for manufacture_name in manufacture_names if manufacture_name not in manufacture_dict]
+        if missing_names and not index.complete:
+            manufacture_dict.update(AssetSQL.list_manufacture_ids_by_names(missing_names))
+        # 不存在的厂商
+        new_manufactures = [{"id": uuid.uuid4().hex, "asset_id": None, "name": manufacture_name, "create_date": create_date,
+                             "description": None, "extra": None}
+                            for manufacture_name in manufacture_names if manufacture_name not in manufacture_dict]
+        manufacture_dict.update({manufacture["name"]: manufacture["id"] for manufacture in new_manufactures})
+        # 返回
+        return manufacture_dict, new_manufactures
+
+    # 根据名称批量查询或者创建厂商 返回名称到id的字典
+    def upsert_manufactures_by_names(self, manufacture_names, asset_id=None, description=None):
+        # 名称去重 去掉空名称
+        manufacture_names = [manufacture_name for manufacture_name in dict.fromkeys(manufacture_names) if manufacture_name]
+        if not manufacture_names:
+            return {}
+        # 先从缓存中查询 全部命中时不访问数据库
+        index = self.get_index()
+        manufacture_dict = {}
+        for manufacture_name in manufacture_names:
+            item = index.get_by_name(manufacture_name)
+            if item is not None:
+                manufacture_dict[manufacture_name] = item.id
+        missing_names = [manufacture_name for manufacture_name in manufacture_names if manufacture_name not in manufacture_dict]
+        if not missing_names:
+            return manufacture_dict
+        # 未命中的名称加锁后在一个事务中查询并创建
+        with self.upsert_locked():
+            upsert_dict, new_names = AssetSQL.upsert_manufactures_by_names(missing_names, asset_id, description,
+                                                                            datetime.fromtimestamp(datetime.now().timestamp()))
+        manufacture_dict.update(upsert_dict)
+        # 有新建的厂商 缓存失效 下次访问时重新加载
+        if new_names:
+            self.invalidate()
+        else:
+            for manufacture_name in missing_names:
+                index.add(upsert_dict[manufacture_name], manufacture_name)
+        # 返回
+        return manufacture_dict
+
+
+# 声明资产厂商缓存
+manufacture_cache = ManufactureCache()
@@ -0,0 +1,87 @@
+# 大屏指标的memcached客户端 进程内共享连接池 多个memcached服务按照一致性hash分布
+import struct
+import threading
+import time
+
+from pymemcache.client.hash import HashClient
+
+from jobs import CONF
+from services.latency_histogram import LatencyHistogram
+
+# 数据的类型标记
+FLAG_BYTES = 0
+FLAG_TEXT = 16
+FLAG_FLOAT = 32
+
+
+# 指标数据的序列化 浮点数按照8字节保存 字符串按照utf-8保存
+class MetricsSerde:
+
+    def serialize(self, key, value):
+        if isinstance(value, bytes):
+            return value, FLAG_BYTES
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return struct.pack("!d", value), FLAG_FLOAT
+        return str(value).encode("utf-8"), FLAG_TEXT
+
+    def deserialize(self, key, value, flags):
+        if flags == FLAG_FLOAT:
+            return struct.unpack("!d", value)[0]
+        if flags == FLAG_TEXT:
+            return value.decode("utf-8")
+        # 旧数据没有类型标记 按照原样返回
+        return value
+
+
+# 共享的memcached客户端 第一次使用时创建 记录每次操作的耗时
+class MemcachedClient:
+
+    def __init__(self):
+        self.client = None
+        self.lock = threading.Lock()
+        self.histogram = LatencyHistogram()
+
+    # 获取客户端 未配置多个服务时使用memcached_address
+    def get_client(self):
+        if self.client is None:
+            with self.lock:
+                if self.client is None:
+                    servers = CONF.bigscreen.memcached_servers or [CONF.bigscreen.memcached_address]
+                    self.client = HashClient(servers,
+                                             serde=MetricsSerde(),
+                                             use_pooling=True,
+                                             max_pool_size=CONF.bigscreen.memcached_pool_size,
+                                             connect_timeout=CONF.bigscreen.memcached_connect_timeout,
+                                             timeout=CONF.bigscreen.memcached_timeout,
+                                             retry_attempts=CONF.bigscreen.memcached_retry_attempts,
+                                             retry_timeout=CONF.bigscreen.memcached_retry_timeout,
+                                             dead_timeout=CONF.bigscreen.memcached_dead_timeout)
+        return self.client
+
+    # 执行操作并记录耗时 失败的操作单独统计
+    def execute(self, operation, *args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            result = getattr(self.get_client(), operation)(*args, **kwargs)
+        except Exception:
+            self.histogram.record(f"{operation}_error", time.perf_counter() - start_time)
+            raise
+        self.histogram.record(operation, time.perf_counter() - start_time)
+        return result
+
+    def get(self, key):
+        return self.execute("get", key)
+
+    def get_many(self, keys):
+        return self.execute("get_many", keys)
+
+    def set_many(self, values, expire=0):
+        return self.execute("set_many", values, expire=expire)
+
+    # 查询延迟统计
+    def get_latency_stats(self):
+        return self.histogram.snapshot()
+
+
+# 声明共享的memcached客户端
+memcached_client = MemcachedClient()
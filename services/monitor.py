@@ -7,6 +7,7 @@ from oslo_log import log
 from db.models.monitor.models import MonitorUrlConfig
 from db.models.monitor.sql import MonitorSQL
 from services.custom_exception import Fail
+from services.response_cache import response_cache
 
 LOG = log.getLogger(__name__)
 
@@ -64,6 +65,8 @@ class MonitorService:
             monitor_url_db = self.convert_monitor_url_info_db(monitor_url_config)
             # 数据入库
             MonitorSQL.create_monitor_url_config(monitor_url_db)
+            # 监控url配置变化 接口缓存失效
+            response_cache.bump_generation("monitor_urls")
             # 返回
             return monitor_url_db.id
         except Fail as e:
@@ -101,6 +104,8 @@ class MonitorService:
         # 删除
         try:
             MonitorSQL.delete_monitor_url_by_id(config_id)
+            # 监控url配置变化 接口缓存失效
+            response_cache.bump_generation("monitor_urls")
         except Fail as e:
             raise e
         except Exception as e:
@@ -130,6 +135,8 @@ class MonitorService:
             config_db = self.reset_monitor_url_info_db(config_db, monitor_url_config)
             # 保存对象
             MonitorSQL.update_monitor_url_config(config_db)
+            # 监控url配置变化 接口缓存失效
+            response_cache.bump_generation("monitor_urls")
         except Fail as e:
             raise e
         except Exception as e:
@@ -0,0 +1,167 @@
+# rabbitmq的消息消费 在独立的线程中消费 不占用定时任务的线程
+# 按照prefetch预取消息 多条消息合并成一批处理 处理成功后批量ack 处理失败时逐条重试 进程退出时未ack的消息由broker重新投递
+# 逐条重试仍然失败的消息 同一批中其他消息能处理成功或者投递次数达到上限时认为是无法处理的消息 转入死信队列
+# 否则(可能是数据库等暂时不可用)带上投递次数重新发布到队列 等待时间逐次加倍
+import threading
+import time
+
+import pika
+from oslo_log import log
+
+from jobs import CONF
+from services.latency_histogram import LatencyHistogram
+
+LOG = log.getLogger(__name__)
+
+# 记录投递次数的消息头
+MQ_DELIVERY_COUNT_HEADER = "x-dingoops-delivery-count"
+
+
+class MQConsumer:
+
+    def __init__(self, queue, parameters_factory, batch_handler):
+        # 队列名称、获取连接参数的方法以及批量处理消息的方法 处理失败时抛出异常
+        self.queue = queue
+        # 死信队列 保存无法处理的消息 便于排查后手动重新投递
+        self.dead_letter_queue = queue + ".dead"
+        self.parameters_factory = parameters_factory
+        self.batch_handler = batch_handler
+        # 消费线程以及停止标记 每个线程使用自己的停止标记 停止中的旧线程不影响新启动的线程
+        self.thread = None
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        # 全部消息都失败时重新发布前的等待时间
+        self.retry_backoff = CONF.bigscreen.mq_reconnect_backoff_initial
+        # 统计
+        self.histogram = LatencyHistogram()
+        self.stats = {"connects": 0, "connection_errors": 0, "consumed": 0, "batches": 0, "batch_failures": 0,
+                      "retried": 0, "retry_successes": 0, "requeued": 0, "dead_lettered": 0}
+
+    # 启动消费线程 已经启动且没有停止时不重复启动 旧线程停止中时启动新线程 旧线程处理完当前批次后自行退出
+    def start(self):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive() and not self.stopping.is_set():
+                return
+            self.stopping = threading.Event()
+            self.thread = threading.Thread(target=self.run, args=(self.stopping,), name="bigscreen-mq-consumer", daemon=True)
+            self.thread.start()
+
+    # 消费线程 连接断开后退避重连
+    def run(self, stopping):
+        backoff = CONF.bigscreen.mq_reconnect_backoff_initial
+        while not stopping.is_set():
+            connection = None
+            try:
+                connection = pika.BlockingConnection(self.parameters_factory())
+                channel = connection.channel()
+                # 声明队列和死信队列 设置预取的消息数量
+                channel.queue_declare(queue=self.queue, durable=True)
+                channel.queue_declare(queue=self.dead_letter_queue, durable=True)
+                channel.basic_qos(prefetch_count=CONF.bigscreen.mq_consumer_prefetch)
+                self.stats["connects"] += 1
+                backoff = CONF.bigscreen.mq_reconnect_backoff_initial
+                LOG.info(f"开始消费mq消息: {self.queue}")
+                self.consume(channel, stopping)
+            except Exception as e:
+                LOG.error(f"消费mq消息失败: {e!r}")
+                self.stats["connection_errors"] += 1
+                stopping.wait(backoff)
+                backoff = min(backoff * 2, CONF.bigscreen.mq_reconnect_backoff_max)
+            finally:
+                if connection is not None and connection.is_open:
+                    try:
+                        connection.close()
+                    except Exception as e:
+                        LOG.warning(f"关闭mq连接失败: {e!r}")
+
+    # 消费消息 达到批量大小或者等待超过批量间隔时处理一批
+    def consume(self, channel, stopping):
+        batch_size = CONF.bigscreen.mq_consumer_batch_size
+        batch_interval = CONF.bigscreen.mq_consumer_batch_interval
+        batch = []
+        batch_start_time = 0
+        for method, properties, body in channel.consume(self.queue, inactivity_timeout=batch_interval):
+            if method is not None:
+                if not batch:
+                    batch_start_time = time.monotonic()
+                batch.append((method.delivery_tag, properties, body))
+                self.stats["consumed"] += 1
+            if batch and (len(batch) >= batch_size or method is None or time.monotonic() - batch_start_time >= batch_interval):
+                self.handle_batch(channel, batch, stopping)
+                batch = []
+            if stopping.is_set():
+                break
+        # 停止时处理已经收到的消息 取消消费后预取但未处理的消息由broker重新投递
+        if batch:
+            self.handle_batch(channel, batch, stopping)
+        channel.cancel()
+
+    # 处理一批消息 成功后ack到最后一条 失败时逐条重试
+    def handle_batch(self, channel, batch, stopping):
+        last_delivery_tag = batch[-1][0]
+        start_time = time.perf_counter()
+        try:
+            self.batch_handler([body for _, _, body in batch])
+        except Exception as e:
+            LOG.error(f"批量处理mq消息失败: {e!r}")
+            self.stats["batch_failures"] += 1
+            self.retry_batch(channel, batch, stopping)
+            return
+        self.histogram.record("batch", time.perf_counter() - start_time)
+        self.stats["batches"] += 1
+        self.retry_backoff = CONF.bigscreen.mq_reconnect_backoff_initial
+        channel.basic_ack(delivery_tag=last_delivery_tag, multiple=True)
+
+    # 逐条重试 成功的消息ack 失败的消息在其他消息成功或者投递次数达到上限时转入死信队列 否则重新发布等待后再处理
+    def retry_batch(self, channel, batch, stopping):
+        failed_list = []
+        for delivery_tag, properties, body in batch:
+            self.stats["retried"] += 1
+            try:
+                self.batch_handler([body])
+            except Exception as e:
+                LOG.error(f"处理mq消息失败: {e!r}")
+                failed_list.append((delivery_tag, properties, body))
+                continue
+            self.stats["retry_successes"] += 1
+            channel.basic_ack(delivery_tag=delivery_tag)
+        if not failed_list:
+            self.retry_backoff = CONF.bigscreen.mq_reconnect_backoff_initial
+            return
+        # 有消息处理成功 说明数据库可用 失败的消息无法处理
+        poison = len(failed_list) < len(batch)
+        for delivery_tag, properties, body in failed_list:
+            headers = dict(properties.headers or {}) if properties is not None else {}
+            delivery_count = int(headers.get(MQ_DELIVERY_COUNT_HEADER, 0)) + 1
+            headers[MQ_DELIVERY_COUNT_HEADER] = delivery_count
+            # 先发布再ack 发布失败时连接断开 消息由broker重新投递
+            if poison or delivery_count >= CONF.bigscreen.mq_consumer_max_deliveries:
+                self.stats["dead_lettered"] += 1
+                LOG.warning(f"mq消息无法处理 转入死信队列: {self.dead_letter_queue}, delivery count: {delivery_count}")
+                self.publish(channel, self.dead_letter_queue, properties, headers, body)
+            else:
+                self.stats["requeued"] += 1
+                self.publish(channel, self.queue, properties, headers, body)
+            channel.basic_ack(delivery_tag=delivery_tag)
+        # 全部失败 可能是数据库等暂时不可用 等待后再处理重新发布的消息 等待时间逐次加倍
+        if not poison:
+            stopping.wait(self.retry_backoff)
+            self.retry_backoff = min(self.retry_backoff * 2, CONF.bigscreen.mq_reconnect_backoff_max)
+
+    # 带上投递次数发布消息 保留原消息的属性
+    def publish(self, channel, queue, properties, headers, body):
+        properties = pika.BasicProperties(content_type=properties.content_type if properties is not None else None,
+                                          delivery_mode=pika.DeliveryMode.Persistent, headers=headers)
+        channel.basic_publish(exchange="", routing_key=queue, body=body, properties=properties)
+
+    # 查询统计
+    def get_stats(self):
+        return dict(self.stats, running=self.thread is not None and self.thread.is_alive(), latency=self.histogram.snapshot())
+
+    # 停止消费 等待当前批次处理完成 超时后线程处理完当前批次自行退出 再次启动时使用新的线程
+    def stop(self, timeout=10):
+        with self.lock:
+            self.stopping.set()
+            thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
@@ -0,0 +1,139 @@
+# rabbitmq的消息发送 长连接 开启publisher confirms 消息先放入内存中的发件箱 由发送线程按顺序发送
+# pika的BlockingConnection不是线程安全的 连接只在发送线程中使用 broker不可用时消息留在发件箱中 重连后继续发送
+import threading
+import time
+from collections import deque
+
+import pika
+from oslo_log import log
+
+from jobs import CONF
+from services.latency_histogram import LatencyHistogram
+
+LOG = log.getLogger(__name__)
+
+
+class MQPublisher:
+
+    def __init__(self, queue, parameters_factory):
+        # 队列名称以及获取连接参数的方法 第一次连接时才解析连接信息
+        self.queue = queue
+        self.parameters_factory = parameters_factory
+        # 发件箱 超过最大数量时丢弃最早的消息
+        self.outbox = deque()
+        self.condition = threading.Condition()
+        # 发送线程 第一次发送消息时启动
+        self.thread = None
+        self.stopping = False
+        # 连接和通道 只在发送线程中使用
+        self.connection = None
+        self.channel = None
+        # 统计
+        self.histogram = LatencyHistogram()
+        self.stats = {"connects": 0, "connect_failures": 0, "published": 0, "publish_failures": 0, "dropped": 0}
+
+    # 发送消息 放入发件箱后立即返回
+    def publish(self, message):
+        with self.condition:
+            if len(self.outbox) >= CONF.bigscreen.mq_outbox_max_size:
+                self.outbox.popleft()
+                self.stats["dropped"] += 1
+            self.outbox.append(message)
+            if self.thread is None or not self.thread.is_alive():
+                self.stopping = False
+                self.thread = threading.Thread(target=self.run, name="bigscreen-mq-publisher", daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    # 发送线程 按顺序发送发件箱中的消息 确认后才从发件箱中删除 失败时断开连接 退避后重试
+    def run(self):
+        backoff = CONF.bigscreen.mq_reconnect_backoff_initial
+        while True:
+            with self.condition:
+                # 空闲时等待新消息 超时后处理心跳
+                if not self.outbox and not self.stopping:
+                    self.condition.wait(timeout=CONF.bigscreen.mq_heartbeat / 2)
+                if not self.outbox and self.stopping:
+                    break
+                message = self.outbox[0] if self.outbox else None
+                stopping = self.stopping
+            channel = None
+            try:
+                if message is None:
+                    if self.connection is not None:
+                        self.connection.process_data_events(0)
+                    continue
+                channel = self.get_channel()
+                start_time = time.perf_counter()
+                # 开启confirms后 broker确认之前一直阻塞 拒绝时抛出异常
+                channel.basic_publish(exchange='', routing_key=self.queue, body=message,
+                                      properties=pika.BasicProperties(delivery_mode=2))
+                self.histogram.record("publish", time.perf_counter() - start_time)
+                # 统计与发件箱一起在锁中更新
+                with self.condition:
+                    if self.outbox and self.outbox[0] is message:
+                        self.outbox.popleft()
+                    self.stats["published"] += 1
+                backoff = CONF.bigscreen.mq_reconnect_backoff_initial
+            except Exception as e:
+                LOG.error(f"发送mq消息失败: {e!r}")
+                # 连接失败单独统计
+                if channel is not None:
+                    with self.condition:
+                        self.stats["publish_failures"] += 1
+                self.close_connection()
+                # 停止时不再重试 剩余的消息丢弃
+                if stopping:
+                    break
+                with self.condition:
+                    self.condition.wait(timeout=backoff)
+                backoff = min(backoff * 2, CONF.bigscreen.mq_reconnect_backoff_max)
+        self.close_connection()
+
+    # 获取通道 没有连接时连接并开启publisher confirms
+    def get_channel(self):
+        if self.channel is not None and self.channel.is_open:
+            return self.channel
+        self.close_connection()
+        start_time = time.perf_counter()
+        try:
+            parameters = self.parameters_factory()
+            parameters.heartbeat = CONF.bigscreen.mq_heartbeat
+            parameters.blocked_connection_timeout = CONF.bigscreen.mq_blocked_connection_timeout
+            self.connection = pika.BlockingConnection(parameters)
+            channel = self.connection.channel()
+            channel.confirm_delivery()
+            # 声明队列 每个连接只声明一次
+            channel.queue_declare(queue=self.queue, durable=True)
+        except Exception:
+            with self.condition:
+                self.stats["connect_failures"] += 1
+            raise
+        self.histogram.record("connect", time.perf_counter() - start_time)
+        with self.condition:
+            self.stats["connects"] += 1
+        self.channel = channel
+        return channel
+
+    # 关闭连接 忽略关闭时的异常
+    def close_connection(self):
+        connection, self.connection, self.channel = self.connection, None, None
+        if connection is not None and connection.is_open:
+            try:
+                connection.close()
+            except Exception as e:
+                LOG.warning(f"关闭mq连接失败: {e!r}")
+
+    # 查询统计
+    def get_stats(self):
+        with self.condition:
+            return dict(self.stats, backlog=len(self.outbox), connected=self.channel is not None and self.channel.is_open,
+                        latency=self.histogram.snapshot())
+
+    # 停止发送线程 等待发件箱中的消息发送完成
+    def close(self, timeout=5):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(timeout)
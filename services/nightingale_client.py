@@ -0,0 +1,141 @@
+# 夜莺(n9e)的客户端 复用keep-alive的http连接 缓存登录后的access token
+import base64
+import json
+import threading
+import time
+
+import requests
+from oslo_log import log
+
+from jobs import CONF
+
+LOG = log.getLogger(__name__)
+
+# 夜莺的接口
+N9E_LOGIN_PATH = "/api/n9e/auth/login"
+N9E_REFRESH_PATH = "/api/n9e/auth/refresh"
+N9E_ALERT_CUR_EVENTS_PATH = "/api/n9e/alert-cur-events/list"
+# 掉卡告警的查询条件
+N9E_GPU_FALLEN_QUERY = "掉卡"
+
+
+# 解析jwt中的过期时间 解析失败返回None
+def parse_token_expire_time(access_token):
+    try:
+        payload = access_token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except Exception:
+        return None
+
+
+# 判断告警事件是否匹配夜莺的查询条件 与服务端一致 多个关键字用空格分隔 每个关键字匹配规则名称或者标签
+def match_alert_event(alert_event, query):
+    rule_name = alert_event.get("rule_name") or ""
+    tags = alert_event.get("tags") or []
+    tags = " ".join(tags) if isinstance(tags, list) else str(tags)
+    return all(keyword in rule_name or keyword in tags for keyword in query.split())
+
+
+class NightingaleClient:
+
+    def __init__(self):
+        # keep-alive的http连接
+        self.session = requests.Session()
+        # 登录信息
+        self.access_token = None
+        self.refresh_token = None
+        self.expire_time = 0
+        self.token_lock = threading.Lock()
+        # 告警数 一次列表查询的结果在短时间内共享
+        self.alert_counts = None
+        self.alert_counts_time = 0
+        self.alert_counts_lock = threading.Lock()
+
+    # 获取access token 快过期时提前刷新
+    def get_access_token(self, force=False):
+        with self.token_lock:
+            if force or not self.access_token or time.time() >= self.expire_time - CONF.bigscreen.nightingale_token_refresh_margin:
+                # 优先使用refresh token刷新 失败时重新登录
+                if not force and self.refresh_token and self.refresh():
+                    return self.access_token
+                self.login()
+            return self.access_token
+
+    # 使用用户名和密码登录
+    def login(self):
+        login_payload = {
+            "username": CONF.bigscreen.nightingale_username,
+            "password": CONF.bigscreen.nightingale_password
+        }
+        login_response = self.session.post(CONF.bigscreen.nightingale_base_url + N9E_LOGIN_PATH, json=login_payload,
+                                           timeout=CONF.bigscreen.nightingale_timeout)
+        if login_response.status_code != 200:
+            LOG.error(f"夜莺登录失败: {login_response}")
+            self.access_token = None
+            return False
+        self.set_token(login_response.json()["dat"])
+        return True
+
+    # 使用refresh token刷新
+    def refresh(self):
+        try:
+            refresh_response = self.session.post(CONF.bigscreen.nightingale_base_url + N9E_REFRESH_PATH, json={"refresh_token": self.refresh_token},
+                                                 timeout=CONF.bigscreen.nightingale_timeout)
+            if refresh_response.status_code == 200:
+                self.set_token(refresh_response.json()["dat"])
+                return True
+        except Exception as e:
+            LOG.warning(f"夜莺token刷新失败: {e}")
+        self.refresh_token = None
+        return False
+
+    # 保存token以及过期时间
+    def set_token(self, token_data):
+        self.access_token = token_data["access_token"]
+        self.refresh_token = token_data.get("refresh_token")
+        self.expire_time = parse_token_expire_time(self.access_token) or time.time() + CONF.bigscreen.nightingale_token_expire_seconds
+
+    # 发送请求 返回401时重新登录后重试一次
+    def request(self, method, path, **kwargs):
+        response = None
+        for force in (False, True):
+            access_token = self.get_access_token(force)
+            if not access_token:
+                return response
+            response = self.session.request(method, CONF.bigscreen.nightingale_base_url + path,
+                                            headers={"Authorization": f"Bearer {access_token}"},
+                                            timeout=CONF.bigscreen.nightingale_timeout, **kwargs)
+            if response.status_code != 401:
+                break
+        return response
+
+    # 查询当前告警数和掉卡告警数 一次列表查询在本地按照掉卡条件统计 告警数超过单次查询的数量时单独查询掉卡告警数
+    def get_alert_counts(self):
+        with self.alert_counts_lock:
+            if self.alert_counts is not None and time.time() - self.alert_counts_time < CONF.bigscreen.nightingale_alert_counts_ttl:
+                return self.alert_counts
+            limit = CONF.bigscreen.nightingale_alert_list_limit
+            response = self.request("GET", N9E_ALERT_CUR_EVENTS_PATH, params={"limit": limit, "p": 1})
+            if response is None or response.status_code != 200:
+                LOG.error(f"获取告警数失败: {response}")
+                return {}
+            data = response.json()['dat']
+            alert_events = data.get('list') or []
+            alert_counts = {"alert_count": data['total']}
+            # 已经查询了全部告警 本地统计掉卡告警
+            if len(alert_events) >= data['total']:
+                alert_counts["gpu_fallen_count"] = sum(1 for alert_event in alert_events if match_alert_event(alert_event, N9E_GPU_FALLEN_QUERY))
+            else:
+                response = self.request("GET", N9E_ALERT_CUR_EVENTS_PATH, params={"query": N9E_GPU_FALLEN_QUERY, "limit": 1, "p": 1})
+                if response is not None and response.status_code == 200:
+                    alert_counts["gpu_fallen_count"] = response.json()['dat']['total']
+                else:
+                    LOG.error(f"获取掉卡数失败: {response}")
+            self.alert_counts = alert_counts
+            self.alert_counts_time = time.time()
+            return alert_counts
+
+
+# 声明夜莺客户端
+nightingale_client = NightingaleClient()
@@ -0,0 +1,131 @@
+# 大屏下钻查询的prometheus代理 异步转发请求 相同的查询合并成一次请求 查询结果在进程内缓存
+# 区间查询的开始和结束时间按照step对齐 同一个step内的重复查询命中同一个缓存
+import asyncio
+import re
+import time
+from collections import OrderedDict
+
+import httpx
+from dateutil import parser
+
+from jobs import CONF
+
+# prometheus的时间长度 例如 30s、5m、1h30m
+PROMETHEUS_DURATION_PATTERN = re.compile(r"(\d+)(ms|s|m|h|d|w|y)")
+PROMETHEUS_DURATION_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800, "y": 31536000}
+
+
+# 解析step 支持秒数和prometheus的时间长度 解析失败返回None
+def parse_step_seconds(step):
+    if not step:
+        return None
+    try:
+        return float(step) if float(step) > 0 else None
+    except ValueError:
+        pass
+    parts = PROMETHEUS_DURATION_PATTERN.findall(step)
+    if not parts or "".join(number + unit for number, unit in parts) != step:
+        return None
+    return sum(int(number) * PROMETHEUS_DURATION_SECONDS[unit] for number, unit in parts) or None
+
+
+# 格式化秒数 整数时去掉小数部分
+def format_seconds(seconds):
+    return str(int(seconds)) if float(seconds).is_integer() else repr(float(seconds))
+
+
+# 规范化查询语句 合并多余的空白 写法不同的相同查询命中同一个缓存
+def normalize_promql(promql):
+    return " ".join(promql.split())
+
+
+class PromQLProxy:
+
+    def __init__(self):
+        # 异步客户端 在第一次请求所在的事件循环中创建
+        self.client = None
+        # 查询结果的缓存 key到(过期时间, 结果)
+        self.cache = OrderedDict()
+        # 正在执行的查询 key到task 并发的相同查询等待同一个task
+        self.inflight = {}
+        # 统计
+        self.stats = {"hit": 0, "miss": 0, "coalesced": 0}
+
+    # 获取异步客户端 进程内的下钻查询共享连接池
+    def get_client(self):
+        if self.client is None:
+            max_connections = CONF.bigscreen.promql_proxy_max_connections
+            self.client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                timeout=httpx.Timeout(CONF.bigscreen.prometheus_query_timeout, connect=CONF.bigscreen.prometheus_connect_timeout))
+        return self.client
+
+    # 即时查询
+    async def query(self, promql):
+        params = {"query": normalize_promql(promql)}
+        return await self.fetch("query", params, CONF.bigscreen.promql_proxy_cache_ttl)
+
+    # 区间查询 时间格式: YYYY-MM-DD HH:mm:ss 未指定结束时间时查询到当前时间
+    async def query_range(self, promql, start_time, end_time=None, step=None):
+        start = parser.parse(start_time).timestamp()
+        end = parser.parse(end_time).timestamp() if end_time else time.time()
+        # 开始和结束时间都向前按照step对齐 prometheus只计算不晚于结束时间的step上的点 对齐后返回的点不变
+        # 未指定step时按照配置的时间对齐
+        step_seconds = parse_step_seconds(step)
+        align_seconds = step_seconds or CONF.bigscreen.promql_proxy_align_seconds
+        start = start // align_seconds * align_seconds
+        end = end // align_seconds * align_seconds
+        params = {"query": normalize_promql(promql), "start": format_seconds(start), "end": format_seconds(end)}
+        if step:
+            params["step"] = format_seconds(step_seconds) if step_seconds else step
+        return await self.fetch("query_range", params, CONF.bigscreen.promql_proxy_cache_ttl)
+
+    # 查询缓存 未命中时合并相同的请求 只有成功的结果写入缓存
+    async def fetch(self, path, params, ttl):
+        key = (path,) + tuple(sorted(params.items()))
+        cache_value = self.cache.get(key)
+        if cache_value is not None and cache_value[0] > time.monotonic():
+            self.cache.move_to_end(key)
+            self.stats["hit"] += 1
+            return cache_value[1]
+        # 相同的查询正在执行 等待它的结果
+        task = self.inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(task)
+        self.stats["miss"] += 1
+        task = asyncio.ensure_future(self.request(path, params))
+        self.inflight[key] = task
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            self.inflight.pop(key, None)
+        if ttl > 0 and isinstance(result, dict) and result.get("status") == "success":
+            self.set_cache(key, result, ttl)
+        return result
+
+    # 转发请求给prometheus
+    async def request(self, path, params):
+        response = await self.get_client().get(CONF.bigscreen.prometheus_query_url + path, params=params)
+        return response.json()
+
+    # 写入缓存 超过最大数量时淘汰最久未使用的结果
+    def set_cache(self, key, result, ttl):
+        self.cache[key] = (time.monotonic() + ttl, result)
+        self.cache.move_to_end(key)
+        while len(self.cache) > CONF.bigscreen.promql_proxy_cache_max_size:
+            self.cache.popitem(last=False)
+
+    # 查询统计
+    def get_stats(self):
+        return dict(self.stats, cache_size=len(self.cache), inflight=len(self.inflight))
+
+    # 关闭客户端
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+
+# 声明prometheus代理
+promql_proxy = PromQLProxy()
@@ -25,15 +25,15 @@ class RedisConnection:
             return self.redis_connection.get(redis_key)
 
     # 向redis中写入
-    def set_redis_by_key(self, redis_key:str, redis_value):
+    def set_redis_by_key(self, redis_key:str, redis_value, expire_seconds:int = None):
         # 判空
         if not redis_key:
             return None
         # 更新数据为空
         if not redis_key:
             return None
-        # 返回数据
-        return self.redis_connection.set(redis_key, redis_value)
+        # 返回数据 设置了过期时间的key到期自动删除
+        return self.redis_connection.set(redis_key, redis_value, ex=expire_seconds)
 
 # 声明redis的连接工具
 redis_connection = RedisConnection()
\ No newline at end of file
@@ -0,0 +1,123 @@
+# 热点查询接口的响应缓存 缓存在redis中 多个worker共享
+# 缓存的key由接口名称、资源的版本号以及查询参数的hash组成 资源数据变化时版本号加1 旧的缓存不再命中 到期后自动删除
+import hashlib
+import json
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+from oslo_log import log
+
+from services import CONF
+from services.redis_connection import redis_connection
+from utils.constant import ASSET_INVENTORY_VERSION_REDIS_KEY, ASSET_TYPE_VERSION_REDIS_KEY, ASSET_COLUMN_VERSION_REDIS_KEY, \
+    MONITOR_URL_VERSION_REDIS_KEY, SYSTEM_LOG_VERSION_REDIS_KEY, RESPONSE_CACHE_REDIS_KEY_PREFIX, RESPONSE_CACHE_STATS_REDIS_KEY, \
+    RESOURCE_GENERATION_EPOCH_REDIS_KEY
+
+LOG = log.getLogger(__name__)
+
+# 资源对应的版本号的redis的key 资产和资产类型沿用已有的版本号
+response_cache_generation_keys = {
+    "assets": ASSET_INVENTORY_VERSION_REDIS_KEY,
+    "asset_types": ASSET_TYPE_VERSION_REDIS_KEY,
+    "asset_columns": ASSET_COLUMN_VERSION_REDIS_KEY,
+    "monitor_urls": MONITOR_URL_VERSION_REDIS_KEY,
+    "system_logs": SYSTEM_LOG_VERSION_REDIS_KEY,
+}
+
+# 接口对应的资源以及缓存时间的配置项
+response_cache_endpoints = {
+    "assets": ("assets", "assets_ttl"),
+    "asset_parts": ("assets", "asset_parts_ttl"),
+    "asset_types": ("asset_types", "asset_types_ttl"),
+    "asset_columns": ("asset_columns", "asset_columns_ttl"),
+    "monitor_urls": ("monitor_urls", "monitor_urls_ttl"),
+}
+
+
+class ResponseCache:
+
+    # 查询缓存 未命中时调用loader查询并写入缓存 redis不可用时直接调用loader
+    def get_or_load(self, endpoint, params, loader):
+        # 缓存时间
+        resource, ttl_option = response_cache_endpoints[endpoint]
+        ttl = getattr(CONF.response_cache, ttl_option)
+        if not CONF.response_cache.enabled or ttl <= 0:
+            return loader()
+        # 缓存的key
+        try:
+            cache_key = self.create_cache_key(endpoint, resource, params)
+            cache_value = redis_connection.redis_connection.get(cache_key)
+        except Exception as e:
+            LOG.error(f"查询接口响应缓存失败: {e}")
+            return loader()
+        # 命中
+        if cache_value is not None:
+            self.record_stats(endpoint, "hit")
+            return json.loads(cache_value)
+        # 未命中 查询后写入缓存 转换成json格式保证命中和未命中的返回数据一致
+        self.record_stats(endpoint, "miss")
+        result = jsonable_encoder(loader())
+        # 查询失败时返回None 不缓存
+        if result is None:
+            return result
+        try:
+            redis_connection.redis_connection.set(cache_key, json.dumps(result, ensure_ascii=False), ex=ttl)
+        except Exception as e:
+            LOG.error(f"写入接口响应缓存失败: {e}")
+        return result
+
+    # 缓存的key 查询参数去掉空值后按照key排序再计算hash
+    def create_cache_key(self, endpoint, resource, params):
+        generation = self.get_generation(resource)
+        params = {key: value for key, value in (params or {}).items() if value is not None}
+        params_hash = hashlib.sha1(json.dumps(params, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")).hexdigest()
+        return f"{RESPONSE_CACHE_REDIS_KEY_PREFIX}{endpoint}:{generation}:{params_hash}"
+
+    # 查询资源的版本号
+    def get_generation(self, resource):
+        generation = redis_connection.redis_connection.get(response_cache_generation_keys[resource])
+        return int(generation) if generation else 0
+
+    # 查询版本号的纪元 不存在时用SETNX写入随机值 多个worker并发写入时以第一个为准
+    def get_generation_epoch(self):
+        epoch = redis_connection.redis_connection.get(RESOURCE_GENERATION_EPOCH_REDIS_KEY)
+        if epoch is None:
+            redis_connection.redis_connection.setnx(RESOURCE_GENERATION_EPOCH_REDIS_KEY, uuid.uuid4().hex[:8])
+            epoch = redis_connection.redis_connection.get(RESOURCE_GENERATION_EPOCH_REDIS_KEY)
+        return epoch.decode() if isinstance(epoch, bytes) else epoch
+
+    # 资源数据变化后版本号加1 旧的缓存随之失效
+    def bump_generation(self, resource):
+        try:
+            redis_connection.redis_connection.incr(response_cache_generation_keys[resource])
+        except Exception as e:
+            LOG.error(f"更新接口响应缓存版本失败: {e}")
+
+    # 记录命中和未命中的次数
+    def record_stats(self, endpoint, result):
+        try:
+            redis_connection.redis_connection.hincrby(RESPONSE_CACHE_STATS_REDIS_KEY, f"{endpoint}:{result}", 1)
+        except Exception as e:
+            LOG.error(f"记录接口响应缓存统计失败: {e}")
+
+    # 查询各个接口的命中统计
+    def get_stats(self):
+        stats = {endpoint: {"hit": 0, "miss": 0, "hit_rate": 0} for endpoint in response_cache_endpoints}
+        try:
+            stats_dict = redis_connection.redis_connection.hgetall(RESPONSE_CACHE_STATS_REDIS_KEY)
+        except Exception as e:
+            LOG.error(f"查询接口响应缓存统计失败: {e}")
+            return stats
+        for field, count in stats_dict.items():
+            endpoint, _, result = (field.decode() if isinstance(field, bytes) else field).rpartition(":")
+            if endpoint in stats and result in ("hit", "miss"):
+                stats[endpoint][result] = int(count)
+        # 命中率
+        for endpoint_stats in stats.values():
+            total = endpoint_stats["hit"] + endpoint_stats["miss"]
+            endpoint_stats["hit_rate"] = round(endpoint_stats["hit"] / total, 4) if total else 0
+        return stats
+
+
+# 声明接口响应缓存
+response_cache = ResponseCache()
@@ -4,16 +4,17 @@ import pika
 
 from services.bigscreens import BigScreensService
 from services.bigscreenshovel import SHOVEL_QUEUE, MY_IP, CENTER_REGION_FLAG, TRANSPORT_URL
+from services.mq_consumer import MQConsumer
+from services.mq_publisher import MQPublisher
 
 # 大屏的service
 bigScreensService = BigScreensService()
 
 class BigScreenSyncService:
 
+    # 解析大屏消息 返回地区和指标数据 消息无效时返回None
     @classmethod
-    def handle_big_screen_message(cls, body):
-        # 在这里处理大屏幕消息
-        print(f"Handling big screen message: {body}")
+    def parse_big_screen_message(cls, body):
         # 转换json对象
         big_screen_message = None
         try:
@@ -22,24 +23,34 @@ class BigScreenSyncService:
             import traceback
             traceback.print_exc()
         # 判空
-        if big_screen_message is None:
+        if not isinstance(big_screen_message, dict):
             print("big_screen_message is none, no need to handle")
             return None
-        # 存入数据库
-        metrics_dict = big_screen_message["metrics_dict"] if "metrics_dict" in big_screen_message else None
-        specify_region = big_screen_message["region_name"] if "region_name" in big_screen_message else None
+        metrics_dict = big_screen_message.get("metrics_dict")
+        specify_region = big_screen_message.get("region_name")
         # 判空
         if metrics_dict is None or specify_region is None:
             print("metrics_dict is none, no need to save db. region_name is none, no need to save db")
             return None
-        # 存入数据库
-        bigScreensService.batch_upgrade_metrics_data_by_region(metrics_dict, specify_region)
-        print("metrics_dict save db successfully.")
+        return specify_region, metrics_dict
 
+    # 批量处理大屏消息 同一个地区的多条消息按照顺序合并 所有地区的数据一次写入数据库 写入失败时抛出异常
     @classmethod
-    def callback(cls, ch, method, properties, body):
-        print(f"Received {body}")
-        cls.handle_big_screen_message(body)
+    def handle_big_screen_messages(cls, bodies):
+        region_metrics_dict = {}
+        for body in bodies:
+            big_screen_message = cls.parse_big_screen_message(body)
+            # 无效的消息直接丢弃
+            if big_screen_message is None:
+                continue
+            specify_region, metrics_dict = big_screen_message
+            region_metrics_dict.setdefault(specify_region, {}).update(metrics_dict)
+        # 判空
+        if not region_metrics_dict:
+            return
+        # 存入数据库
+        bigScreensService.batch_upgrade_metrics_data_by_regions(region_metrics_dict)
+        print(f"metrics_dict of {len(bodies)} messages save db successfully.")
 
     @classmethod
     def connect_mq_queue(cls):
@@ -47,18 +58,15 @@ class BigScreenSyncService:
         if CENTER_REGION_FLAG is False:
             print("current region is not center region, no need to connect mq shovel queue")
             return
-        # 连接到当前节点的RabbitMQ的服务器
+        # 在独立的线程中消费 已经启动时不重复启动
+        bigscreen_mq_consumer.start()
+
+    # 当前节点的RabbitMQ的连接参数
+    @classmethod
+    def get_connection_parameters(cls):
         username, password = cls.get_mq_name_password()
         credentials = pika.PlainCredentials(username, password)
-        parameters = pika.ConnectionParameters(MY_IP, 5672, '/', credentials)
-        connection = pika.BlockingConnection(parameters)
-        channel = connection.channel()
-        # 声明队列
-        channel.queue_declare(queue=SHOVEL_QUEUE, durable=True)
-        # 订阅队列并设置回调函数
-        channel.basic_consume(queue=SHOVEL_QUEUE, on_message_callback=cls.callback, auto_ack=True)
-        print('Waiting for messages.')
-        channel.start_consuming()
+        return pika.ConnectionParameters(MY_IP, 5672, '/', credentials)
 
     @classmethod
     def get_mq_name_password(cls):
@@ -93,29 +101,11 @@ class BigScreenSyncService:
         if CENTER_REGION_FLAG is True:
             print("current region is center region, no need to send mq message")
             return
-        try:
-            # 连接到当前节点的RabbitMQ的服务器，连接到队列然后发送消息
-            username, password = cls.get_mq_name_password()
-            credentials = pika.PlainCredentials(username, password)
-            parameters = pika.ConnectionParameters(MY_IP, 5672, '/', credentials)
-            connection = pika.BlockingConnection(parameters)
-            channel = connection.channel()
-            # 声明队列
-            channel.queue_declare(queue=SHOVEL_QUEUE, durable=True)
-            # 发送消息
-            channel.basic_publish(
-                exchange='',
-                routing_key=SHOVEL_QUEUE,
-                body=message,
-                properties=pika.BasicProperties(
-                    delivery_mode=2,
-                )
-            )
-            print("send mq message success")
-            print(f"message: {message}")
-            # 关闭连接
-            connection.close()
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return None
\ No newline at end of file
+        # 放入发件箱 由发送线程通过长连接发送 broker不可用时重连后继续发送
+        bigscreen_mq_publisher.publish(message)
+
+
+# 声明大屏指标的mq消息发送 复用当前节点的RabbitMQ的连接参数
+bigscreen_mq_publisher = MQPublisher(SHOVEL_QUEUE, BigScreenSyncService.get_connection_parameters)
+# 声明大屏指标的mq消息消费 中心region批量写入各个地区的数据
+bigscreen_mq_consumer = MQConsumer(SHOVEL_QUEUE, BigScreenSyncService.get_connection_parameters, BigScreenSyncService.handle_big_screen_messages)
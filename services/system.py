@@ -7,6 +7,7 @@ from oslo_log import log
 
 from db.models.system.models import OperateLog
 from db.models.system.sql import SystemSQL
+from services.response_cache import response_cache
 
 LOG = log.getLogger(__name__)
 
@@ -65,6 +66,8 @@ class SystemService:
             log_id = system_log_info_db.id
             # 保存日志
             SystemSQL.create_operate_log(system_log_info_db)
+            # 操作日志变化 更新版本
+            response_cache.bump_generation("system_logs")
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -73,6 +76,27 @@ class SystemService:
         return log_id
 
 
+    # 批量创建操作日志 一个事务中保存
+    def create_system_logs(self, system_logs):
+        # 空
+        if not system_logs:
+            return []
+        # 保存
+        try:
+            # 数据转换
+            system_log_info_dbs = [self.convert_system_log_info_db(system_log) for system_log in system_logs]
+            # 批量保存日志
+            SystemSQL.create_operate_logs(system_log_info_dbs)
+            # 操作日志变化 更新版本
+            response_cache.bump_generation("system_logs")
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            raise e
+        # 成功返回日志id列表
+        return [system_log_info_db.id for system_log_info_db in system_log_info_dbs]
+
+
     # 日志创建时基础对象数据转换
     def convert_system_log_info_db(self, system_log):
         # 数据转化为db对象
@@ -9,7 +9,7 @@ from jobs import CONF
 from services.custom_exception import Fail
 from services.redis_channel import redis_channel_service, redis_client_instance
 from services.websocket_connection_manager import websocket_connection_manager
-from utils.constant import websocket_data_type, websocket_type_channels
+from utils.constant import websocket_data_type, websocket_type_channels, websocket_type_poll_seconds
 
 # 当前region名称
 REGION_NAME = CONF.DEFAULT.region_name
@@ -59,7 +59,8 @@ class WebSocketService:
             raise Fail("send redis channel message fail", error_message="发送redis频道测试消息失败")
 
     # 处理redis的频道消息 适合操作类触发的websocket消息
-    async def subscribe_redis_channel_ws(self, websocket_type:str, websocket: WebSocket):
+    # job_id非空时只推送该任务的消息
+    async def subscribe_redis_channel_ws(self, websocket_type:str, websocket: WebSocket, job_id=None):
         try:
             # 类型为空或者类型不合法
             if websocket_type is None or websocket_type not in websocket_data_type or websocket_type not in websocket_type_channels:
@@ -71,13 +72,15 @@ class WebSocketService:
             publisher.subscribe(websocket_type_channels[websocket_type])
             # 循环
             while True:
-                # 读取消息
-                message = publisher.get_message(ignore_subscribe_messages=True, timeout=1)
-                # 非空
-                if message:
-                    await self.broadcast_redis_message_4ws(websocket_type, websocket, message)
-                # 休息
-                await asyncio.sleep(5)
+                # 读取消息 不阻塞事件循环
+                message = publisher.get_message(ignore_subscribe_messages=True)
+                # 非空时一次推送所有积压的消息 避免导入进度等连续消息延迟
+                while message:
+                    if self.match_job_id(message, job_id):
+                        await self.broadcast_redis_message_4ws(websocket_type, websocket, message)
+                    message = publisher.get_message(ignore_subscribe_messages=True)
+                # 休息 导入进度的间隔较短
+                await asyncio.sleep(websocket_type_poll_seconds.get(websocket_type, 5))
         except Fail as e:
             raise e
         except Exception as e:
@@ -85,6 +88,15 @@ class WebSocketService:
             traceback.print_exc()
             raise Fail("subscribe redis channel fail", error_message="订阅redis频道失败")
 
+    # 消息是否属于指定的任务 未指定任务时推送所有消息
+    def match_job_id(self, message, job_id):
+        if not job_id:
+            return True
+        try:
+            return json.loads(message['data']).get("job_id") == job_id
+        except Exception:
+            return False
+
     # 处理redis的频道消息 适合操作类触发的websocket消息
     async def subscribe_redis_channel(self, websocket_type:str):
         try:
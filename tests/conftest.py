@@ -0,0 +1,29 @@
+# 单元测试的公共配置 数据库使用sqlite的临时文件 每个测试重新建表
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import CONF
+
+# 在创建数据库连接之前替换数据库地址
+CONF.set_override("connection", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "dingoops_test.db"), group="database")
+
+from db.engines.mysql import get_engine
+from db.models.asset import models as asset_models
+from db.models.bigscreen import models as bigscreen_models
+
+test_models = (asset_models, bigscreen_models)
+
+
+@pytest.fixture(autouse=True)
+def database():
+    engine = get_engine()
+    for models in test_models:
+        models.Base.metadata.create_all(engine)
+    yield engine
+    for models in test_models:
+        models.Base.metadata.drop_all(engine)
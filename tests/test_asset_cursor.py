@@ -0,0 +1,104 @@
+# 资产列表游标分页的测试
+from datetime import datetime, timedelta
+
+import pytest
+
+from db.engines.mysql import get_session
+from db.models.asset.models import AssetBasicInfo, AssetBelongsInfo
+from db.models.asset.sql import AssetSQL
+from utils.common import encode_page_cursor, decode_page_cursor
+
+
+# 创建资产 每个资产一条归属信息 duplicate_ids中的资产有两条归属信息
+def create_assets(count, duplicate_ids=(), same_create_date=False):
+    base_time = datetime(2025, 1, 1)
+    session = get_session()
+    with session.begin():
+        for i in range(count):
+            asset_id = f"asset-{i:03d}"
+            create_date = base_time if same_create_date else base_time + timedelta(minutes=i)
+            session.add(AssetBasicInfo(id=asset_id, name=f"name-{i:03d}", create_date=create_date))
+            session.add(AssetBelongsInfo(id=f"belong-{i:03d}", asset_id=asset_id, department_name=f"dept-{i % 3}"))
+            if asset_id in duplicate_ids:
+                session.add(AssetBelongsInfo(id=f"belong-{i:03d}-2", asset_id=asset_id, department_name="dept-x"))
+
+
+# 按照游标逐页查询 游标经过编码和解析 与接口的处理一致 返回每页的资产id
+def list_all_pages(page_size, sort_keys=None, sort_dirs=None, query_params=None):
+    pages = []
+    cursor = None
+    while True:
+        cursor_value, cursor_id = None, None
+        if cursor:
+            cursor_data = decode_page_cursor(cursor)
+            cursor_value, cursor_id = cursor_data["value"], cursor_data["id"]
+        _, data = AssetSQL.list_asset_by_cursor(query_params or {}, cursor_value, cursor_id, page_size, sort_keys, sort_dirs)
+        page = data[:page_size]
+        pages.append([row.id for row in page])
+        if len(data) <= page_size:
+            return pages
+        last = page[-1]
+        cursor = encode_page_cursor({"sort_keys": sort_keys, "sort_dirs": sort_dirs, "value": last.cursor_sort_value, "id": last.id})
+
+
+def test_cursor_round_trip_default_sort():
+    create_assets(7)
+    pages = list_all_pages(3)
+    assert pages == [["asset-006", "asset-005", "asset-004"], ["asset-003", "asset-002", "asset-001"], ["asset-000"]]
+
+
+def test_cursor_exact_page_boundary_has_no_next_page():
+    create_assets(6)
+    pages = list_all_pages(3)
+    assert [len(page) for page in pages] == [3, 3]
+
+
+def test_cursor_empty_result():
+    assert list_all_pages(3) == [[]]
+
+
+def test_cursor_ties_on_sort_value_use_id():
+    create_assets(5, same_create_date=True)
+    pages = list_all_pages(2)
+    assert sum(pages, []) == ["asset-004", "asset-003", "asset-002", "asset-001", "asset-000"]
+
+
+@pytest.mark.parametrize("sort_dirs", ["ascend", "descend"])
+def test_cursor_duplicate_side_rows_are_not_skipped(sort_dirs):
+    # 有两条归属信息的资产在分页边界上 不能重复也不能丢失
+    create_assets(9, duplicate_ids=("asset-001", "asset-002", "asset-005"))
+    pages = list_all_pages(2, sort_keys="department_name", sort_dirs=sort_dirs)
+    asset_ids = sum(pages, [])
+    assert sorted(asset_ids) == [f"asset-{i:03d}" for i in range(9)]
+    assert len(asset_ids) == len(set(asset_ids))
+    assert all(len(page) == 2 for page in pages[:-1])
+
+
+def test_cursor_with_total_counts_assets_not_rows():
+    create_assets(4, duplicate_ids=("asset-001",))
+    count, data = AssetSQL.list_asset_by_cursor({}, page_size=10, with_total=True)
+    assert count == 4
+    assert len(data) == 4
+    count, _ = AssetSQL.list_asset_by_cursor({}, page_size=10)
+    assert count is None
+
+
+def test_cursor_keeps_query_filters():
+    create_assets(6)
+    pages = list_all_pages(2, query_params={"department_name": "dept-1"})
+    assert pages == [["asset-004", "asset-001"]]
+
+
+def test_page_cursor_encoding():
+    value = datetime(2025, 1, 2, 3, 4, 5)
+    cursor = encode_page_cursor({"sort_keys": None, "sort_dirs": None, "value": value, "id": "asset-001"})
+    assert decode_page_cursor(cursor) == {"sort_keys": None, "sort_dirs": None, "value": value, "id": "asset-001"}
+    assert decode_page_cursor("not-a-cursor") is None
+    assert decode_page_cursor(encode_page_cursor({"value": 1})) is None
+
+
+def test_cursor_side_table_filters_and_sort():
+    # 附属表的条件和排序字段使用关联子查询 有多条归属信息时按照排在最前的值排序
+    create_assets(6, duplicate_ids=("asset-004",))
+    pages = list_all_pages(2, sort_keys="department_name", sort_dirs="descend", query_params={"department_name": "dept"})
+    assert sum(pages, []) == ["asset-004", "asset-005", "asset-002", "asset-001", "asset-003", "asset-000"]
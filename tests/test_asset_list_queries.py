@@ -0,0 +1,48 @@
+# 资产列表每页的sql语句数量的测试 语句数量与每页的资产数量无关
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+import api  # noqa: F401 services.assets与api循环引用 先加载api
+from db.engines.mysql import get_engine, get_session
+from db.models.asset.models import AssetBasicInfo, AssetPartsInfo
+from services.assets import AssetsService
+
+
+# 创建资产 每个资产两个配件
+def create_assets(start, count):
+    base_time = datetime(2025, 1, 1)
+    session = get_session()
+    with session.begin():
+        for i in range(start, start + count):
+            asset_id = f"asset-{i:03d}"
+            session.add(AssetBasicInfo(id=asset_id, name=f"name-{i:03d}", create_date=base_time + timedelta(minutes=i)))
+            for k in range(2):
+                session.add(AssetPartsInfo(id=f"part-{i:03d}-{k}", asset_id=asset_id, name=f"part-{k}"))
+
+
+# 查询一页资产 返回执行的sql语句数量以及结果
+def count_list_assets_statements(page_size):
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    engine = get_engine()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = AssetsService().list_assets({}, 1, page_size, None, None)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return len(statements), result
+
+
+def test_list_assets_statement_count_is_constant():
+    create_assets(0, 5)
+    # 预热进程内的缓存
+    count_list_assets_statements(5)
+    small_count, small_result = count_list_assets_statements(5)
+    create_assets(5, 45)
+    large_count, large_result = count_list_assets_statements(50)
+    assert len(small_result["data"]) == 5
+    assert len(large_result["data"]) == 50
+    assert all(len(asset["asset_part"]) == 2 for asset in large_result["data"])
+    assert small_count == large_count
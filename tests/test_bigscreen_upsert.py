@@ -0,0 +1,51 @@
+# 大屏指标批量更新或者插入的测试
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import mysql
+
+from db.models.bigscreen.models import BigscreenMetrics, BigscreenMetricsHistory
+from db.models.bigscreen.sql import BigscreenSQL
+from services.custom_exception import Fail
+
+HISTORY_INDEX_ELEMENTS = ["name", "region", "resolution", "bucket_time"]
+HISTORY_UPDATE_COLUMNS = ["value_avg", "value_min", "value_max", "sample_count"]
+
+
+# 历史数据
+def create_history(name, value, region="RegionOne", bucket_time=datetime(2025, 1, 1, 0, 0)):
+    return {"name": name, "region": region, "resolution": 60, "bucket_time": bucket_time,
+            "value_avg": value, "value_min": value, "value_max": value, "sample_count": 1}
+
+
+def test_sqlite_upsert_history_inserts_and_updates():
+    BigscreenSQL.upsert_bigscreen_metrics_history([create_history("cpu", 1.0), create_history("mem", 2.0)])
+    BigscreenSQL.upsert_bigscreen_metrics_history([create_history("cpu", 3.0), create_history("disk", 4.0)])
+    history_list = BigscreenSQL.list_bigscreen_metrics_history(60, datetime(2025, 1, 1), datetime(2025, 1, 2))
+    assert {history.name: history.value_avg for history in history_list} == {"cpu": 3.0, "mem": 2.0, "disk": 4.0}
+
+
+def test_sqlite_upsert_metrics_with_and_without_region():
+    now = datetime(2025, 1, 1)
+    BigscreenSQL.upsert_bigscreen_metrics([{"name": "cpu", "region": "RegionOne", "data": 1.0, "last_modified": now},
+                                           {"name": "cpu", "region": None, "data": 2.0, "last_modified": now}])
+    BigscreenSQL.upsert_bigscreen_metrics([{"name": "cpu", "region": "RegionOne", "data": 3.0, "last_modified": now},
+                                           {"name": "cpu", "region": None, "data": 4.0, "last_modified": now}])
+    metrics_list = BigscreenSQL.list_bigscreen_metrics_by_names_and_region(["cpu"], "RegionOne")
+    assert [metrics.data for metrics in metrics_list] == [3.0]
+    assert BigscreenSQL.get_bigscreen_metrics_by_name_and_region("cpu", None).data == 4.0
+
+
+def test_mysql_upsert_statement_compiles():
+    statement = BigscreenSQL.create_upsert_statement("mysql", BigscreenMetricsHistory, [create_history("cpu", 1.0)],
+                                                     HISTORY_INDEX_ELEMENTS, HISTORY_UPDATE_COLUMNS)
+    sql = str(statement.compile(dialect=mysql.dialect()))
+    assert sql.startswith("INSERT INTO ops_bigscreen_metrics_history")
+    assert "ON DUPLICATE KEY UPDATE" in sql
+    update_sql = sql.split("ON DUPLICATE KEY UPDATE", 1)[1]
+    assert [column.strip().split(" = ")[0] for column in update_sql.split(",")] == HISTORY_UPDATE_COLUMNS
+
+
+def test_upsert_statement_unsupported_dialect():
+    with pytest.raises(Fail):
+        BigscreenSQL.create_upsert_statement("postgresql", BigscreenMetrics, [{"name": "cpu"}], ["name", "region"], ["data"])
@@ -1,4 +1,10 @@
 # 常用处理方法
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+
 
 def format_excel_str(origin:str):
     # 判空
@@ -7,4 +13,67 @@ def format_excel_str(origin:str):
     # 去除两端的两端的空白字符
     new_value = origin.strip()
     # 返回
-    return new_value
\ No newline at end of file
+    return new_value
+
+def format_excel_key(value):
+    # 判空
+    if value is None:
+        return None
+    # excel中的整数可能被读取成浮点数 统一转换成整数
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    # 转换成字符串并去除两端的空白字符 用于数据匹配
+    return format_excel_str(str(value))
+
+def encode_page_cursor(cursor_data:dict):
+    # 时间类型的值转换成带标记的字符串 解析时还原
+    data = {}
+    for key, value in cursor_data.items():
+        if isinstance(value, datetime):
+            value = {"__datetime__": value.isoformat()}
+        data[key] = value
+    # json序列化后base64编码 对调用方不透明
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+def decode_page_cursor(cursor:str):
+    # 解析失败返回None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+        if not isinstance(data, dict) or not data.get("id"):
+            return None
+        # 还原时间类型的值
+        for key, value in data.items():
+            if isinstance(value, dict) and "__datetime__" in value:
+                data[key] = datetime.fromisoformat(value["__datetime__"])
+        # 返回
+        return data
+    except Exception:
+        return None
+
+def flatten_export_dict(data:dict, prefix:str=""):
+    # 嵌套的dict展开成一层 key使用.连接 列表转换成json字符串 用于导出csv
+    ret = {}
+    for key, value in data.items():
+        column = prefix + str(key)
+        if isinstance(value, dict):
+            ret.update(flatten_export_dict(value, column + "."))
+        elif isinstance(value, (list, tuple)):
+            ret[column] = json.dumps(value, ensure_ascii=False, default=str)
+        else:
+            ret[column] = value
+    # 返回
+    return ret
+
+def format_csv_rows(rows:list, columns:list, write_header:bool=False):
+    # 多行数据转换成csv文本 列头不存在的值写空
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
+    if write_header:
+        writer.writeheader()
+    writer.writerows(rows)
+    # 返回
+    return buffer.getvalue()
+
+def format_ndjson_rows(rows:list):
+    # 多行数据转换成ndjson文本 每行一个json对象
+    return "".join(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows)
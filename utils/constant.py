@@ -3,6 +3,43 @@ import uuid
 
 # excel的目录文件
 EXCEL_TEMP_DIR = "/home/dingoops/temp_excel/"
+# excel临时文件的最长保留时间(秒)以及临时目录的最大容量(字节)
+EXCEL_TEMP_FILE_EXPIRE_SECONDS = 3600
+EXCEL_TEMP_DIR_MAX_SIZE = 1024 * 1024 * 1024
+# 资产导出文件的缓存目录 最大容量(字节)以及最长保留时间(秒)
+EXCEL_EXPORT_CACHE_DIR = EXCEL_TEMP_DIR + "cache/"
+EXCEL_EXPORT_CACHE_MAX_SIZE = 512 * 1024 * 1024
+EXCEL_EXPORT_CACHE_EXPIRE_SECONDS = 86400
+# 资产库存版本的redis的key 资产数据每次变化都会加1
+ASSET_INVENTORY_VERSION_REDIS_KEY = "dingoOps:asset_inventory_version"
+# 资产类型缓存版本的redis的key 资产类型每次变化都会加1
+ASSET_TYPE_VERSION_REDIS_KEY = "dingoOps:asset_type_version"
+# 资产类型缓存检查版本的间隔(秒) 其他进程修改类型后最多经过这个时间重新加载
+ASSET_TYPE_CACHE_CHECK_SECONDS = 5
+# 资产扩展字段版本的redis的key 扩展字段每次变化都会加1
+ASSET_COLUMN_VERSION_REDIS_KEY = "dingoOps:asset_column_version"
+# 监控url配置版本的redis的key 监控url配置每次变化都会加1
+MONITOR_URL_VERSION_REDIS_KEY = "dingoOps:monitor_url_version"
+# 系统操作日志版本的redis的key 操作日志每次写入都会加1
+SYSTEM_LOG_VERSION_REDIS_KEY = "dingoOps:system_log_version"
+# 版本号纪元的redis的key 不存在时写入一个随机值 redis数据被清空后纪元随之变化 避免版本号从0重新计数后ETag与旧的相同
+RESOURCE_GENERATION_EPOCH_REDIS_KEY = "dingoOps:resource_generation_epoch"
+# 接口响应缓存的redis的key前缀
+RESPONSE_CACHE_REDIS_KEY_PREFIX = "dingoOps:response_cache:"
+# 接口响应缓存命中统计的redis的key
+RESPONSE_CACHE_STATS_REDIS_KEY = "dingoOps:response_cache_stats"
+# 资产厂商缓存版本的redis的key 厂商每次变化都会加1
+MANUFACTURE_VERSION_REDIS_KEY = "dingoOps:manufacture_version"
+# 资产厂商缓存检查版本的间隔(秒)
+MANUFACTURE_CACHE_CHECK_SECONDS = 5
+# 资产厂商缓存最多保存的厂商数量
+MANUFACTURE_CACHE_MAX_SIZE = 10000
+# 资产厂商按名称创建时分布式锁的redis的key 避免多个进程重复创建同名厂商
+MANUFACTURE_UPSERT_LOCK_REDIS_KEY = "dingoOps:manufacture_upsert_lock"
+# 资产厂商按名称创建时分布式锁的超时时间(秒)
+MANUFACTURE_UPSERT_LOCK_TIMEOUT_SECONDS = 30
+# 大屏指标同步任务选主的redis的key前缀 后面拼接地区名称 每个地区只有一个进程执行同步任务
+BIGSCREEN_SYNCER_LEADER_REDIS_KEY_PREFIX = "dingoOps:bigscreen_syncer_leader:"
 # 资产-服务器模板文件
 ASSET_SERVER_TEMPLATE_FILE_DIR = "/api/template/server_template.xlsx"
 # 资产-网络模板文件
@@ -17,6 +54,20 @@ ASSET_TEMPLATE_ASSET_SHEET = "asset"
 ASSET_TEMPLATE_PART_SHEET = "part"
 # 资产网络sheet页名称
 ASSET_TEMPLATE_NETWORK_SHEET = "network"
+# 资产批量导入时每个事务插入的行数
+ASSET_IMPORT_CHUNK_SIZE = 500
+# 资产导出excel时每次从数据库读取的行数
+ASSET_EXPORT_CHUNK_SIZE = 1000
+# 资产流式导出支持的格式以及对应的媒体类型
+ASSET_STREAM_EXPORT_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+# 资产异步导入任务的线程数
+ASSET_IMPORT_JOB_WORKERS = 2
+# 资产异步导入任务状态的redis的key前缀以及过期时间(秒)
+ASSET_IMPORT_JOB_REDIS_KEY_PREFIX = "dingoOps:asset_import_job:"
+ASSET_IMPORT_JOB_EXPIRE_SECONDS = 86400
+# 资产异步导入任务的心跳间隔(秒) 未结束的任务超过过期时间没有心跳时认为执行任务的进程已经退出 任务失败
+ASSET_IMPORT_JOB_HEARTBEAT_SECONDS = 30
+ASSET_IMPORT_JOB_STALE_SECONDS = 300
 
 # 资产设备状态 0：空闲、1：备机、2：分配、3：故障
 asset_status_dict = ([(0, "空闲"), (0, "备机"), (2, "分配"), (3, "故障")])
@@ -50,7 +101,9 @@ asset_network_contract_info_columns = {"contract_number":"采购合同号"}
 # 资产-网络设备流信息列名对应表的列
 asset_network_flow_info_columns = {"asset_name":"设备名称","cabinet_position":"机柜","u_position":"U位","port":"端口","opposite_asset_name":"对端设备名称","opposite_cabinet_position":"对端机柜","opposite_u_position":"对端U位","opposite_port":"对端端口","cable_type":"线缆类型","cable_interface_type":"线缆接口类型","cable_length":"线缆长度","label":"标签","opposite_label":"对端标签","description":"备注"}
 # websocket目前接受的数据类型
-websocket_data_type = {"big_screen"}
+websocket_data_type = {"big_screen", "import_progress"}
 # websocket的频道以及与数据类型的对应关系
-websocket_channels = ["dingoOps:big_screen_websocket_channel"]
-websocket_type_channels = {"big_screen":"dingoOps:big_screen_websocket_channel"}
+websocket_channels = ["dingoOps:big_screen_websocket_channel", "dingoOps:import_progress_websocket_channel"]
+websocket_type_channels = {"big_screen":"dingoOps:big_screen_websocket_channel", "import_progress":"dingoOps:import_progress_websocket_channel"}
+# websocket读取频道消息的间隔(秒) 导入进度需要及时推送
+websocket_type_poll_seconds = {"big_screen": 5, "import_progress": 0.2}